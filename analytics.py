@@ -0,0 +1,215 @@
+# Модуль с колоночной аналитикой продаж книжного магазина
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # необязательная зависимость для аналитики
+    np = None
+
+from classes import datetime_to_micros, micros_to_datetime
+
+# Колонки аналитики и соответствующие им поля продажи
+_COLUMNS = ('sale_id', 'book_id', 'customer_id', 'employee_id', 'quantity', 'total_price', 'sale_time')
+_SALE_FIELDS = ('sale_id', 'book_id', 'customer_id', 'employee_id', 'quantity', 'total_price', 'sale_date')
+
+_HOUR = 3_600_000_000  # микросекунд в часе
+_DAY = 24 * _HOUR
+
+# Группировки по ID продажи: ключ -> колонка
+_ID_KEYS = {'book': 'book_id', 'customer': 'customer_id', 'employee': 'employee_id'}
+# Группировки по атрибуту книги: ключ -> поле Book
+_BOOK_KEYS = {'genre': 'genre', 'author': 'author'}
+# Группировки по времени: ключ - начало часа, дня, недели, месяца или года
+_TIME_KEYS = ('hour', 'day', 'week', 'month', 'year')
+
+GROUP_KEYS = tuple(_ID_KEYS) + tuple(_BOOK_KEYS) + _TIME_KEYS
+
+
+def _require_numpy() -> None:
+    """Проверка наличия модуля numpy"""
+    if np is None:
+        raise ValueError("для аналитики продаж требуется пакет numpy")
+
+
+class SalesAnalytics:
+    """Колоночные массивы продаж NumPy для векторных агрегатов
+
+    Колонки строятся один раз и затем дополняются новыми продажами
+    при каждом refresh(): история продаж только растет, поэтому
+    досчитываются продажи с ID больше последнего учтенного.
+    """
+
+    def __init__(self, bookstore, capacity: int = 1024):
+        _require_numpy()
+        self._bookstore = bookstore
+        self._capacity = max(capacity, 1)
+        self._size = 0
+        self._last_sale_id = 0  # последний просмотренный ID продажи
+        self._columns: Dict[str, Any] = {}
+        self._allocate(self._capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _allocate(self, capacity: int) -> None:
+        """Выделение колонок заданной емкости с копированием уже накопленных данных"""
+        columns = {}
+        for name in _COLUMNS:
+            dtype = np.float64 if name == 'total_price' else np.int64
+            column = np.empty(capacity, dtype=dtype)
+            if name in self._columns:
+                column[:self._size] = self._columns[name][:self._size]
+            columns[name] = column
+        self._columns = columns
+        self._capacity = capacity
+
+    def _append(self, rows: List[tuple]) -> None:
+        """Добавление строк (поля продажи в порядке _SALE_FIELDS) в колонки"""
+        if not rows:
+            return
+        needed = self._size + len(rows)
+        if needed > self._capacity:
+            # Удвоение емкости дает амортизированно O(1) на добавление
+            self._allocate(max(needed, 2 * self._capacity))
+        end = self._size + len(rows)
+        for name, values in zip(_COLUMNS, zip(*rows)):
+            if name == 'sale_time':
+                values = [datetime_to_micros(value) for value in values]
+            self._columns[name][self._size:end] = values
+        self._size = end
+
+    def rebuild(self) -> int:
+        """Построение колонок заново по всем продажам магазина"""
+        self._size = 0
+        self._last_sale_id = 0
+        bookstore = self._bookstore
+        # Полный проход берет значения полей без лишних обращений по ID
+        self._append(list(bookstore._sale_rows(*_SALE_FIELDS)))
+        self._last_sale_id = bookstore._next_sale_id - 1
+        return self._size
+
+    def refresh(self) -> int:
+        """Дополнение колонок продажами, появившимися после прошлого вызова
+
+        Возвращает количество добавленных продаж. Если магазин был
+        перезагружен (продаж стало меньше), колонки строятся заново.
+        """
+        bookstore = self._bookstore
+        next_sale_id = bookstore._next_sale_id
+        if self._last_sale_id == 0 or next_sale_id <= self._last_sale_id or len(bookstore.sales) < self._size:
+            return self.rebuild()
+
+        sales = bookstore.sales
+        rows = []
+        for sale_id in range(self._last_sale_id + 1, next_sale_id):
+            # Пропуски в нумерации возможны (например, после загрузки снимка)
+            sale = sales.get(sale_id)
+            if sale is not None:
+                rows.append((sale.sale_id, sale.book_id, sale.customer_id, sale.employee_id,
+                             sale.quantity, sale.total_price, sale.sale_date))
+        self._append(rows)
+        self._last_sale_id = next_sale_id - 1
+        return len(rows)
+
+    def column(self, name: str):
+        """Представление колонки без копирования (только заполненная часть)"""
+        return self._columns[name][:self._size]
+
+    def _mask(self, since: Optional[datetime], until: Optional[datetime]):
+        """Отбор продаж в интервале [since, until) или None без ограничений"""
+        if since is None and until is None:
+            return None
+        times = self.column('sale_time')
+        mask = np.ones(self._size, dtype=bool)
+        if since is not None:
+            mask &= times >= datetime_to_micros(since)
+        if until is not None:
+            mask &= times < datetime_to_micros(until)
+        return mask
+
+    def _bucket_starts(self, times, unit: str):
+        """Начало интервала времени для каждой продажи в микросекундах"""
+        if unit == 'hour':
+            return times - times % _HOUR
+        if unit == 'day':
+            return times - times % _DAY
+        if unit == 'week':
+            # Недели начинаются с понедельника; 1970-01-01 - четверг
+            days = times // _DAY
+            return (days - (days + 3) % 7) * _DAY
+        numpy_unit = 'M' if unit == 'month' else 'Y'
+        return times.view('datetime64[us]').astype(f'datetime64[{numpy_unit}]') \
+            .astype('datetime64[us]').view(np.int64)
+
+    def group_by(self, key: str, since: datetime = None, until: datetime = None) -> Dict[Any, Dict[str, float]]:
+        """Выручка, количество экземпляров и число продаж по группам
+
+        key - 'book', 'customer', 'employee' (ключ - ID), 'genre', 'author'
+        (ключ - значение поля книги; для удаленных книг - None) или
+        'hour', 'day', 'week', 'month', 'year' (ключ - начало интервала).
+        since/until ограничивают продажи интервалом [since, until).
+        """
+        if key not in GROUP_KEYS:
+            raise ValueError(f"неизвестная группировка: {key}")
+
+        mask = self._mask(since, until)
+
+        def select(name: str):
+            column = self.column(name)
+            return column if mask is None else column[mask]
+
+        if key in _ID_KEYS:
+            codes = select(_ID_KEYS[key])
+        elif key in _BOOK_KEYS:
+            codes = select('book_id')
+        else:
+            codes = self._bucket_starts(select('sale_time'), key)
+
+        groups, inverse = np.unique(codes, return_inverse=True)
+        revenue = np.bincount(inverse, weights=select('total_price'), minlength=len(groups))
+        quantity = np.bincount(inverse, weights=select('quantity'), minlength=len(groups))
+        counts = np.bincount(inverse, minlength=len(groups))
+
+        if key in _BOOK_KEYS:
+            return self._group_books(groups, revenue, quantity, counts, _BOOK_KEYS[key])
+
+        if key in _TIME_KEYS:
+            labels = [micros_to_datetime(value) for value in groups.tolist()]
+        else:
+            labels = groups.tolist()
+        return {label: {'revenue': float(r), 'quantity': int(q), 'sales': int(c)}
+                for label, r, q, c in zip(labels, revenue.tolist(), quantity.tolist(), counts.tolist())}
+
+    def _group_books(self, book_ids, revenue, quantity, counts, field: str) -> Dict[Any, Dict[str, float]]:
+        """Свертка итогов по книгам в итоги по полю книги"""
+        books = self._bookstore.books
+        result: Dict[Any, Dict[str, float]] = {}
+        # Книг на порядки меньше, чем продаж, поэтому здесь достаточно цикла Python
+        for book_id, r, q, c in zip(book_ids.tolist(), revenue.tolist(), quantity.tolist(), counts.tolist()):
+            book = books.get(book_id)
+            label = getattr(book, field) if book is not None else None
+            totals = result.get(label)
+            if totals is None:
+                result[label] = {'revenue': r, 'quantity': int(q), 'sales': c}
+            else:
+                totals['revenue'] += r
+                totals['quantity'] += int(q)
+                totals['sales'] += c
+        return result
+
+    def top(self, key: str, n: int = 10, by: str = 'revenue',
+            since: datetime = None, until: datetime = None) -> List[Tuple[Any, Dict[str, float]]]:
+        """N групп с наибольшим значением by ('revenue', 'quantity' или 'sales')"""
+        groups = self.group_by(key, since, until)
+        return sorted(groups.items(), key=lambda item: item[1][by], reverse=True)[:n]
+
+    def total(self, since: datetime = None, until: datetime = None) -> Dict[str, float]:
+        """Общие итоги продаж за интервал"""
+        mask = self._mask(since, until)
+        prices = self.column('total_price')
+        quantities = self.column('quantity')
+        if mask is not None:
+            prices, quantities = prices[mask], quantities[mask]
+        return {'revenue': float(prices.sum()), 'quantity': int(quantities.sum()), 'sales': len(prices)}
@@ -0,0 +1,747 @@
+# Модуль с замерами производительности горячих путей книжного магазина
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from bookstore import Bookstore
+from classes import Book, Customer, Employee, Sale
+from sharding import ShardedBookstore
+
+_WORDS = ["мастер", "война", "мир", "тайна", "город", "ночь", "море", "сад",
+          "дорога", "время", "звезда", "остров", "зима", "дом", "река", "свет"]
+_GENRES = ["Роман", "Фэнтези", "Детектив", "Антиутопия", "Поэзия", "Драма"]
+
+
+def generate_bookstore(books: int = 5000, customers: int = 1000, employees: int = 50,
+                       sales: int = 0, seed: int = 42, **options) -> Bookstore:
+    """Создание магазина с синтетическими данными
+
+    Продажи ссылаются на существующие книги, клиентов и сотрудников,
+    остатков хватает на дальнейшие продажи, поэтому на сгенерированных
+    данных работают все операции. Одинаковый seed дает одинаковые данные.
+    options передаются конструктору Bookstore (например, thread_safe).
+    """
+    rng = random.Random(seed)
+    catalog = [Book(book_id, " ".join(rng.choice(_WORDS) for _ in range(3)).capitalize(),
+                    f"Автор {rng.randint(1, books // 10 + 1)}", rng.choice(_GENRES),
+                    float(rng.randint(100, 2000)), rng.randint(10 ** 5, 10 ** 6), rng.randint(1900, 2020))
+               for book_id in range(1, books + 1)]
+    staff = [Employee(emp_id, f"Сотрудник {emp_id}", "Продавец", float(rng.randint(30_000, 90_000)))
+             for emp_id in range(1, employees + 1)]
+    clients = [Customer(cust_id, f"Клиент {cust_id}", f"client{cust_id}@example.com",
+                        f"+7{rng.randint(10 ** 9, 10 ** 10 - 1)}")
+               for cust_id in range(1, customers + 1)]
+
+    def history():
+        # Продажи в порядке ID равномерно распределены по 2020 году
+        start = datetime(2020, 1, 1)
+        step = timedelta(seconds=365 * 86400 / max(sales, 1))
+        for sale_id in range(1, sales + 1):
+            book = catalog[rng.randrange(books)]
+            quantity = rng.randint(1, 3)
+            yield Sale(sale_id, book.book_id, rng.randint(1, customers), rng.randint(1, employees),
+                       quantity, book.price * quantity, start + step * sale_id)
+
+    bookstore = Bookstore("Бенчмарк", **options)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        bookstore.load_entities(catalog, staff, clients, history())
+    return bookstore
+
+
+def _time_per_call(func: Callable[[int], object], keys: List[int]) -> float:
+    """Среднее время одного вызова в секундах"""
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys)
+
+
+def bench_sales_lookup(sizes: List[int], lookups: int = 100) -> None:
+    """Сравнение выборки продаж по индексу и полным перебором"""
+    print(f"{'продаж':>10} | {'индекс, мкс':>12} | {'перебор, мкс':>13} | {'ускорение':>9}")
+    for size in sizes:
+        bookstore = generate_bookstore(sales=size)
+        keys = [random.Random(size).randint(1, 1000) for _ in range(lookups)]
+
+        def scan(customer_id: int) -> List[Sale]:
+            return [s for s in bookstore.sales.values() if s.customer_id == customer_id]
+
+        # Перебор на больших объемах медленный, поэтому делаем меньше повторов
+        scan_keys = keys[:max(1, lookups * 10_000 // size)]
+        indexed = _time_per_call(bookstore.get_sales_by_customer, keys)
+        scanned = _time_per_call(scan, scan_keys)
+        print(f"{size:>10} | {indexed * 1e6:>12.1f} | {scanned * 1e6:>13.1f} | "
+              f"{scanned / indexed:>8.0f}x")
+
+
+def bench_search(books_count: int, lookups: int = 200) -> None:
+    """Сравнение поиска книг по текстовому индексу и полным перебором"""
+    bookstore = generate_bookstore(books=books_count, customers=0, employees=0)
+    rng = random.Random(books_count)
+    queries = [f"{rng.choice(_WORDS)} {rng.choice(_WORDS)}" for _ in range(lookups)]
+
+    def scan(title: str) -> List[Book]:
+        return [b for b in bookstore.books.values() if title.lower() in b.title.lower()]
+
+    indexed = _time_per_call(lambda q: bookstore.search_books(title=q), queries)
+    scanned = _time_per_call(scan, queries[:20])
+    print(f"Поиск по названию среди {books_count} книг: индекс {indexed * 1e6:.1f} мкс, "
+          f"перебор {scanned * 1e6:.1f} мкс ({scanned / indexed:.0f}x)")
+
+
+def bench_bulk_insert(sizes: List[int], seed: int = 42) -> None:
+    """Замер вставки книг без ID: время на одну вставку не должно расти с объемом"""
+    print(f"{'книг':>10} | {'всего, с':>9} | {'на книгу, мкс':>14}")
+    for size in sizes:
+        rng = random.Random(seed)
+        books = [Book(0, f"{rng.choice(_WORDS)} {i}", f"Автор {i % 1000}", rng.choice(_GENRES),
+                      float(rng.randint(100, 2000)), 1, rng.randint(1900, 2020))
+                 for i in range(size)]
+        bookstore = Bookstore("Бенчмарк")
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for book in books:
+                bookstore.add_book(book)
+            elapsed = time.perf_counter() - start
+        print(f"{size:>10} | {elapsed:>9.2f} | {elapsed / size * 1e6:>14.1f}")
+
+
+def bench_bulk_import(size: int, seed: int = 42) -> None:
+    """Замер массового импорта книг из генератора словарей"""
+    rng = random.Random(seed)
+    rows = ({'book_id': 0, 'title': f"{rng.choice(_WORDS)} {i}", 'author': f"Автор {i % 1000}",
+             'genre': rng.choice(_GENRES), 'price': float(rng.randint(100, 2000)),
+             'quantity': 1, 'year': rng.randint(1900, 2020)}
+            for i in range(size))
+    bookstore = Bookstore("Бенчмарк")
+    start = time.perf_counter()
+    summary = bookstore.add_books_bulk(rows)
+    elapsed = time.perf_counter() - start
+    print(f"Массовый импорт {size} книг: {elapsed:.2f} с "
+          f"({elapsed / size * 1e6:.1f} мкс на книгу, добавлено {summary['added']})")
+
+
+def _save_xml_elementtree(bookstore: Bookstore, filename: str) -> None:
+    """Прежняя запись XML через дерево ElementTree - эталон для сравнения"""
+    root = ET.Element('bookstore')
+    ET.SubElement(root, 'name').text = bookstore.name
+    for section, tag, entities in (('books', 'book', bookstore.books),
+                                   ('employees', 'employee', bookstore.employees),
+                                   ('customers', 'customer', bookstore.customers),
+                                   ('sales', 'sale', bookstore.sales)):
+        section_elem = ET.SubElement(root, section)
+        for entity in entities.values():
+            elem = ET.SubElement(section_elem, tag)
+            for key, value in entity.to_dict().items():
+                ET.SubElement(elem, key).text = str(value)
+    ET.ElementTree(root).write(filename, encoding='utf-8', xml_declaration=True)
+
+
+def _measure(func: Callable[[], object]) -> tuple:
+    """Время выполнения и пиковый прирост памяти"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_xml_save(sales_count: int, filename: str = 'bench_store.xml') -> None:
+    """Сравнение потоковой записи XML с построением дерева ElementTree"""
+    bookstore = generate_bookstore(sales=sales_count)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        streamed = _measure(lambda: bookstore.save_to_xml(filename))
+    tree = _measure(lambda: _save_xml_elementtree(bookstore, filename))
+    os.remove(filename)
+    print(f"Запись XML, {sales_count} продаж: потоково {streamed[0]:.2f} с / {streamed[1] / 1e6:.1f} МБ, "
+          f"ElementTree {tree[0]:.2f} с / {tree[1] / 1e6:.1f} МБ")
+
+
+def bench_snapshot_load(sales_count: int, prefix: str = 'bench_store') -> None:
+    """Сравнение загрузки двоичного снимка и JSON с проверкой совпадения данных"""
+    bookstore = generate_bookstore(sales=sales_count)
+    json_file, binary_file, check_file = f"{prefix}.json", f"{prefix}.bin", f"{prefix}_check.json"
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        bookstore.save_to_json(json_file, compact=True)
+        bookstore.save_to_binary(binary_file)
+        from_json = Bookstore("JSON")
+        start = time.perf_counter()
+        from_json.load_from_json(json_file)
+        json_time = time.perf_counter() - start
+        from_binary = Bookstore("Двоичный")
+        start = time.perf_counter()
+        from_binary.load_from_binary(binary_file)
+        binary_time = time.perf_counter() - start
+        from_binary.save_to_json(check_file, compact=True)
+    with open(json_file, 'rb') as expected, open(check_file, 'rb') as actual:
+        same = expected.read() == actual.read()
+    sizes = os.path.getsize(json_file), os.path.getsize(binary_file)
+    for filename in (json_file, binary_file, check_file):
+        os.remove(filename)
+    print(f"Загрузка {sales_count} продаж: JSON {json_time:.2f} с / {sizes[0] / 1e6:.1f} МБ, "
+          f"двоичный {binary_time:.2f} с / {sizes[1] / 1e6:.1f} МБ, "
+          f"данные {'совпадают' if same else 'РАЗЛИЧАЮТСЯ'}")
+
+
+def bench_sales_archive(sales_count: int, filename: str = 'bench_sales.bin') -> None:
+    """Память под историю продаж до и после переноса в архив, отображенный в память"""
+    tracemalloc.start()
+    bookstore = generate_bookstore(sales=sales_count)
+    in_memory = tracemalloc.get_traced_memory()[0]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        bookstore.archive_sales(filename)
+    archived = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    customer = random.Random(sales_count).randint(1, 1000)
+    lookup = _time_per_call(bookstore.get_sales_by_customer, [customer] * 20)
+    bookstore.close()
+    os.remove(filename)
+    print(f"История {sales_count} продаж: в памяти {in_memory / 1e6:.1f} МБ, "
+          f"в архиве {archived / 1e6:.1f} МБ; выборка по клиенту {lookup * 1e3:.2f} мс")
+
+
+class _PlainEntity:
+    """Прежнее представление сущности: атрибуты в словаре экземпляра"""
+
+    def __init__(self, **fields):
+        for field, value in fields.items():
+            setattr(self, field, value)
+
+
+# Отдельный класс на каждую сущность, как было до перехода на слоты
+_PlainBook = type('_PlainBook', (_PlainEntity,), {})
+_PlainEmployee = type('_PlainEmployee', (_PlainEntity,), {})
+_PlainCustomer = type('_PlainCustomer', (_PlainEntity,), {})
+_PlainSale = type('_PlainSale', (_PlainEntity,), {})
+
+
+def _bytes_per_entity(make: Callable[[int], object], count: int) -> float:
+    """Средний объем памяти на один экземпляр по данным tracemalloc"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = [make(i) for i in range(1, count + 1)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # Не учитываем сам список ссылок на экземпляры
+    return (used - sys.getsizeof(entities)) / len(entities)
+
+
+def bench_entity_memory(count: int) -> None:
+    """Память на одну сущность: слоты против словаря экземпляра"""
+    makers = {
+        'Book': (lambda i: Book(i, "Название", "Автор", "Роман", 100.0 + i, i % 50, 2000),
+                 lambda i: _PlainBook(book_id=i, title="Название", author="Автор", genre="Роман",
+                                        price=100.0 + i, quantity=i % 50, year=2000)),
+        'Employee': (lambda i: Employee(i, "Имя", "Продавец", 30000.0 + i),
+                     lambda i: _PlainEmployee(emp_id=i, name="Имя", position="Продавец",
+                                            salary=30000.0 + i)),
+        'Customer': (lambda i: Customer(i, "Имя", "mail@mail.com", "+7-000"),
+                     lambda i: _PlainCustomer(cust_id=i, name="Имя", email="mail@mail.com",
+                                            phone="+7-000")),
+        'Sale': (lambda i: Sale(i, i % 5000 + 1, i % 1000 + 1, i % 50 + 1, 1, 100.0 + i,
+                                datetime.fromtimestamp(1_700_000_000 + i)),
+                 lambda i: _PlainSale(sale_id=i, book_id=i % 5000 + 1, customer_id=i % 1000 + 1,
+                                        employee_id=i % 50 + 1, quantity=1, total_price=100.0 + i,
+                                        sale_date=datetime.fromtimestamp(1_700_000_000 + i))),
+    }
+    print(f"{'сущность':>10} | {'слоты, Б':>9} | {'словарь, Б':>11} | {'экономия':>8}")
+    for name, (compact, plain) in makers.items():
+        compact_size = _bytes_per_entity(compact, count)
+        plain_size = _bytes_per_entity(plain, count)
+        print(f"{name:>10} | {compact_size:>9.0f} | {plain_size:>11.0f} | "
+              f"{1 - compact_size / plain_size:>7.0%}")
+
+
+def bench_analytics(sales_count: int) -> None:
+    """Сравнение группировки выручки по дням через NumPy и циклом Python"""
+    bookstore = generate_bookstore(sales=sales_count)
+    start = time.perf_counter()
+    analytics = bookstore.get_sales_analytics()
+    build = time.perf_counter() - start
+
+    def loop() -> dict:
+        revenue = {}
+        for sale in bookstore.sales.values():
+            day = sale.sale_date.date()
+            revenue[day] = revenue.get(day, 0.0) + sale.total_price
+        return revenue
+
+    print(f"Аналитика {sales_count} продаж: построение колонок {build:.2f} с")
+    for key in ('day', 'genre', 'employee', 'month'):
+        vectorized = _time_per_call(lambda _: analytics.group_by(key), [0] * 5)
+        print(f"  группировка по {key}: {vectorized * 1e3:.1f} мс")
+    scanned = _time_per_call(lambda _: loop(), [0])
+    print(f"  цикл Python по дням: {scanned * 1e3:.1f} мс")
+
+
+def bench_checkout(baskets: int, basket_size: int = 20, seed: int = 42) -> None:
+    """Сравнение продажи корзины одним вызовом checkout и поштучными sell_book"""
+    rng = random.Random(seed)
+    items = [[(rng.randint(1, 1000), 1) for _ in range(basket_size)] for _ in range(baskets)]
+    timings = {}
+    for mode in ('sell_book', 'checkout'):
+        # Остатков (от 10^5 экземпляров) хватает на все корзины
+        bookstore = generate_bookstore(books=1000, customers=1, employees=1)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for basket in items:
+                if mode == 'checkout':
+                    bookstore.checkout(basket, 1, 1)
+                else:
+                    for book_id, quantity in basket:
+                        bookstore.sell_book(book_id, quantity, 1, 1)
+            timings[mode] = (time.perf_counter() - start) / baskets
+    print(f"Корзина из {basket_size} книг: checkout {timings['checkout'] * 1e6:.0f} мкс, "
+          f"sell_book {timings['sell_book'] * 1e6:.0f} мкс "
+          f"({timings['sell_book'] / timings['checkout']:.1f}x)")
+
+
+def bench_concurrent_sales(thread_counts: List[int], sales_per_thread: int = 5000,
+                           books: int = 1000, seed: int = 42) -> None:
+    """Пропускная способность продаж в режиме thread_safe при разном числе потоков
+
+    Корзины составляют пятую часть операций. Корректность параллельных
+    продаж проверяется в tests/test_concurrency.py.
+    """
+    print("  потоков |  продаж/с")
+    for threads in thread_counts:
+        bookstore = generate_bookstore(books=books, customers=100, employees=10, seed=seed, thread_safe=True)
+
+        def worker(index: int) -> None:
+            rng = random.Random(seed + index)
+            for _ in range(sales_per_thread):
+                if rng.random() < 0.2:
+                    basket = [(rng.randint(1, books), 1) for _ in range(3)]
+                    bookstore.checkout(basket, rng.randint(1, 100), rng.randint(1, 10))
+                else:
+                    bookstore.sell_book(rng.randint(1, books), 1, rng.randint(1, 100), rng.randint(1, 10))
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+            start = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        print(f"{threads:>9} | {len(bookstore.sales) / elapsed:>9.0f}")
+
+
+def bench_background_save(sales_count: int, filename: str = 'bench_background.json') -> None:
+    """Продажи во время фонового сохранения в сравнении с обычным
+
+    Обычное сохранение останавливает продажи на все время записи;
+    фоновое - только на снятие копии данных. Проверяется, что снимок
+    содержит ровно продажи на момент запуска.
+    """
+    bookstore = generate_bookstore(sales=sales_count)
+    expected = len(bookstore.sales)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        book = Book(0, "Книга", "Автор", "Роман", 100.0, 10 ** 9, 2000)
+        bookstore.add_book(book)
+        bookstore.add_customer(Customer(0, "Покупатель", "buyer@mail.com", "+7-000"))
+        bookstore.add_employee(Employee(0, "Продавец", "Кассир", 30000.0))
+
+        start = time.perf_counter()
+        bookstore.save_to_json(filename, compact=True)
+        blocking = time.perf_counter() - start
+
+        start = time.perf_counter()
+        future = bookstore.save_in_background(filename, compact=True)
+        pause = time.perf_counter() - start
+        sold = 0
+        while not future.done():
+            bookstore.sell_book(book.book_id, 1, 1, 1)
+            sold += 1
+        future.result()
+        background = time.perf_counter() - start
+
+        check = Bookstore("Проверка")
+        check.load_from_json(filename)
+    os.remove(filename)
+    assert len(check.sales) == expected, "снимок не совпадает с данными на момент запуска"
+    print(f"Сохранение {sales_count} продаж: обычное {blocking:.2f} с без продаж, "
+          f"фоновое {background:.2f} с с паузой {pause * 1e3:.0f} мс и {sold} продажами во время записи")
+
+
+def bench_sharding(shard_counts: List[int], orders: int = 200_000, books: int = 1000, seed: int = 42) -> None:
+    """Пропускная способность продаж и запросов по шардам в рабочих процессах"""
+    rng = random.Random(seed)
+    batch = [(rng.randint(1, books), 1, rng.randint(1, 100), 1) for _ in range(orders)]
+    baseline = None
+    for shards in shard_counts:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                ShardedBookstore("Сеть", shards, processes=True) as network:
+            for book_id in range(1, books + 1):
+                network.add_book(Book(book_id, f"Книга {book_id}", "Автор", "Роман", 100.0, orders, 2000))
+            for cust_id in range(1, 101):
+                network.add_customer(Customer(cust_id, f"Клиент {cust_id}", f"c{cust_id}@mail.com", "+7-000"))
+            network.add_employee(Employee(1, "Продавец", "Кассир", 30000.0))
+
+            start = time.perf_counter()
+            summary = network.sell_many(batch)
+            elapsed = time.perf_counter() - start
+            assert summary['sold'] == orders
+
+            customers = [rng.randint(1, 100) for _ in range(20)]
+            query = _time_per_call(network.get_sales_by_customer, customers)
+        baseline = baseline or elapsed
+        print(f"Шардов {shards}: {orders / elapsed:,.0f} продаж/с ({baseline / elapsed:.1f}x), "
+              f"продажи клиента {query * 1e3:.1f} мс")
+
+
+def bench_parallel_load(sales_count: int, worker_counts: List[int], filename: str = 'bench_parallel.json') -> None:
+    """Загрузка JSON в одном процессе и в пуле процессов с проверкой совпадения данных"""
+    bookstore = generate_bookstore(sales=sales_count)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        bookstore.save_to_json(filename, compact=True)
+    reference = None
+    timings = []
+    for workers in [1] + worker_counts:
+        loaded = Bookstore("Загрузка")
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            loaded.load_from_json(filename, workers=workers)
+            timings.append((workers, time.perf_counter() - start))
+        state = [sale.to_dict() for sale in loaded.sales.values()]
+        reference = reference or state
+        assert state == reference, f"{workers} процессов: данные отличаются от загрузки в одном процессе"
+    os.remove(filename)
+    serial = timings[0][1]
+    print(f"Загрузка JSON, {sales_count} продаж: " + ", ".join(
+        f"{workers} проц. {elapsed:.2f} с ({serial / elapsed:.1f}x)" for workers, elapsed in timings))
+
+
+def bench_trusted_load(sales_count: int, filename: str = 'bench_trusted.json') -> None:
+    """Загрузка JSON с проверкой каждой сущности и без нее с отдельной проверкой по колонкам"""
+    bookstore = generate_bookstore(sales=sales_count)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        bookstore.save_to_json(filename, compact=True)
+        timings = {}
+        for validate in (True, False):
+            loaded = Bookstore("Загрузка")
+            start = time.perf_counter()
+            loaded.load_from_json(filename, validate=validate)
+            timings[validate] = time.perf_counter() - start
+        start = time.perf_counter()
+        checked = loaded.verify_data()
+        verify = time.perf_counter() - start
+    os.remove(filename)
+    print(f"Загрузка {sales_count} продаж: с проверкой {timings[True]:.2f} с, "
+          f"без проверки {timings[False]:.2f} с, verify_data ({checked} записей) {verify:.2f} с")
+
+
+def bench_metrics_overhead(sales_count: int, lookups: int = 10_000) -> None:
+    """Замер накладных расходов учета метрик на быстром вызове"""
+    bookstore = generate_bookstore(sales=sales_count)
+    keys = [random.Random(sales_count).randint(1, 1000) for _ in range(lookups)]
+    disabled = _time_per_call(bookstore.get_sales_by_customer, keys)
+    bookstore.enable_metrics()
+    enabled = _time_per_call(bookstore.get_sales_by_customer, keys)
+    bookstore.disable_metrics()
+    restored = _time_per_call(bookstore.get_sales_by_customer, keys)
+    print(f"Метрики на выборке продаж: выключены {disabled * 1e6:.2f} мкс, "
+          f"включены {enabled * 1e6:.2f} мкс, после отключения {restored * 1e6:.2f} мкс")
+
+
+# Набор замеров горячих путей с результатами в JSON
+
+# Версия формата файла результатов
+RESULTS_VERSION = 1
+
+
+class Case(NamedTuple):
+    """Замер одной операции
+
+    prepare(bookstore, rng, workdir) возвращает функцию, выполняющую calls
+    вызовов операции за один прогон.
+    """
+    name: str
+    calls: int
+    prepare: Callable[[Bookstore, random.Random, str], Callable[[], None]]
+
+
+def _sell_book(bookstore: Bookstore, rng: random.Random, workdir: str) -> Callable[[], None]:
+    """Продажи случайных книг случайным клиентам"""
+    books, customers, employees = list(bookstore.books), list(bookstore.customers), list(bookstore.employees)
+    orders = [(rng.choice(books), 1, rng.choice(customers), rng.choice(employees)) for _ in range(1000)]
+
+    def run() -> None:
+        for order in orders:
+            bookstore.sell_book(*order)
+    return run
+
+
+def _search_books(bookstore: Bookstore, rng: random.Random, workdir: str) -> Callable[[], None]:
+    """Поиск по названию, жанру и диапазону цен"""
+    queries = [{'title': rng.choice(_WORDS)} for _ in range(40)]
+    queries += [{'genre': rng.choice(_GENRES), 'max_price': 500} for _ in range(40)]
+    queries += [{'min_price': 1000, 'max_price': 1010} for _ in range(20)]
+
+    def run() -> None:
+        for query in queries:
+            bookstore.search_books(**query)
+    return run
+
+
+def _sales_lookup(method: str, ids: str) -> Callable[[Bookstore, random.Random, str], Callable[[], None]]:
+    """Выборка продаж по ID из указанной коллекции магазина"""
+    def prepare(bookstore: Bookstore, rng: random.Random, workdir: str) -> Callable[[], None]:
+        lookup = getattr(bookstore, method)
+        candidates = list(getattr(bookstore, ids))
+        keys = [rng.choice(candidates) for _ in range(100)]
+
+        def run() -> None:
+            for key in keys:
+                lookup(key)
+        return run
+    return prepare
+
+
+def _save(fmt: str) -> Callable[[Bookstore, random.Random, str], Callable[[], None]]:
+    """Сохранение всего магазина в файл"""
+    def prepare(bookstore: Bookstore, rng: random.Random, workdir: str) -> Callable[[], None]:
+        filename = os.path.join(workdir, f"save.{fmt}")
+        save = getattr(bookstore, f"save_to_{fmt}")
+        return lambda: save(filename)
+    return prepare
+
+
+def _load(fmt: str) -> Callable[[Bookstore, random.Random, str], Callable[[], None]]:
+    """Загрузка магазина из файла в новый экземпляр"""
+    def prepare(bookstore: Bookstore, rng: random.Random, workdir: str) -> Callable[[], None]:
+        filename = os.path.join(workdir, f"load.{fmt}")
+        getattr(bookstore, f"save_to_{fmt}")(filename)
+
+        def run() -> None:
+            loaded = Bookstore("Загрузка")
+            getattr(loaded, f"load_from_{fmt}")(filename)
+            loaded.close()
+        return run
+    return prepare
+
+
+CASES = (
+    Case('sell_book', 1000, _sell_book),
+    Case('search_books', 100, _search_books),
+    Case('get_sales_by_customer', 100, _sales_lookup('get_sales_by_customer', 'customers')),
+    Case('get_sales_by_employee', 100, _sales_lookup('get_sales_by_employee', 'employees')),
+    Case('get_book_sales', 100, _sales_lookup('get_book_sales', 'books')),
+    Case('save_to_json', 1, _save('json')),
+    Case('load_from_json', 1, _load('json')),
+    Case('save_to_xml', 1, _save('xml')),
+    Case('load_from_xml', 1, _load('xml')),
+)
+
+
+def _measure_case(case: Case, bookstore: Bookstore, seed: int, workdir: str,
+                  repeats: int) -> Dict[str, Any]:
+    """Время одного вызова (медиана и минимум по прогонам) и пик памяти операции"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        run = case.prepare(bookstore, random.Random(seed), workdir)
+        run()  # прогрев: кэши, ленивые индексы, файловый кэш ОС
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+
+        # Память меряется отдельным прогоном: трассировка замедляет выполнение
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'calls': case.calls,
+        'repeats': repeats,
+        'per_call_us': statistics.median(timings) / case.calls * 1e6,
+        'min_us': min(timings) / case.calls * 1e6,
+        'peak_kb': peak / 1024,
+    }
+
+
+def run_suite(books: int = 10_000, customers: int = 1000, employees: int = 50,
+              sales: int = 100_000, seed: int = 42, repeats: int = 5,
+              operations: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Выполнение набора замеров с результатом в виде словаря для JSON
+
+    operations - имена замеров из CASES (по умолчанию все). Каждый замер
+    выполняется на свежем магазине, чтобы продажи одного замера не влияли
+    на выборки другого.
+    """
+    cases = [case for case in CASES if operations is None or case.name in operations]
+    unknown = set(operations or ()) - {case.name for case in CASES}
+    if unknown:
+        raise ValueError(f"Неизвестные замеры: {', '.join(sorted(unknown))}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix='bookstore-bench-') as workdir:
+        for case in cases:
+            bookstore = generate_bookstore(books, customers, employees, sales, seed)
+            try:
+                results[case.name] = _measure_case(case, bookstore, seed, workdir, repeats)
+            finally:
+                bookstore.close()
+            result = results[case.name]
+            print(f"{case.name:<24} {result['per_call_us']:>12.1f} мкс {result['peak_kb']:>12.1f} КБ")
+
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'config': {'books': books, 'customers': customers, 'employees': employees,
+                   'sales': sales, 'seed': seed, 'repeats': repeats},
+        'environment': {'python': platform.python_version(),
+                        'implementation': platform.python_implementation(),
+                        'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+        'results': results,
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any],
+                    tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """Сравнение результатов с базовой линией
+
+    Возвращает список регрессий: операции, у которых время вызова или пик
+    памяти выросли больше чем на долю tolerance. Операции, которых нет
+    в одном из наборов, пропускаются.
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric in ('per_call_us', 'peak_kb'):
+            if base[metric] > 0 and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append({'operation': name, 'metric': metric,
+                                    'baseline': base[metric], 'current': result[metric],
+                                    'change': result[metric] / base[metric] - 1})
+    return regressions
+
+
+def _print_comparison(current: Dict[str, Any], baseline: Dict[str, Any],
+                      regressions: List[Dict[str, Any]]) -> None:
+    """Вывод таблицы сравнения с базовой линией"""
+    if current['config'] != baseline['config']:
+        print("Внимание: параметры данных отличаются от базовой линии, сравнение неточное")
+    flagged = {(r['operation'], r['metric']) for r in regressions}
+    print(f"{'операция':<24} | {'было, мкс':>11} | {'стало, мкс':>11} | {'время':>7} | {'память':>7}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<24} | {'-':>11} | {result['per_call_us']:>11.1f} | {'новая':>7} |")
+            continue
+        changes = []
+        for metric in ('per_call_us', 'peak_kb'):
+            change = result[metric] / base[metric] - 1 if base[metric] else 0.0
+            mark = '!' if (name, metric) in flagged else ' '
+            changes.append(f"{change:>+6.0%}{mark}")
+        print(f"{name:<24} | {base['per_call_us']:>11.1f} | {result['per_call_us']:>11.1f} | "
+              f"{changes[0]:>7} | {changes[1]:>7}")
+
+
+def suite_main(argv: List[str]) -> int:
+    """Набор замеров с записью JSON и сравнением с базовой линией
+
+    Код возврата 1 означает найденные регрессии, что удобно для CI.
+    """
+    parser = argparse.ArgumentParser(prog='benchmark.py suite',
+                                     description="Набор замеров горячих путей книжного магазина")
+    parser.add_argument('--books', type=int, default=10_000, help="Количество книг")
+    parser.add_argument('--customers', type=int, default=1000, help="Количество клиентов")
+    parser.add_argument('--employees', type=int, default=50, help="Количество сотрудников")
+    parser.add_argument('--sales', type=int, default=100_000, help="Количество продаж")
+    parser.add_argument('--seed', type=int, default=42, help="Начальное значение генератора данных")
+    parser.add_argument('--repeats', type=int, default=5, help="Количество прогонов каждой операции")
+    parser.add_argument('--operations', nargs='+', choices=[case.name for case in CASES],
+                        help="Замеряемые операции (по умолчанию все)")
+    parser.add_argument('--json', metavar='FILE', help="Файл для записи результатов")
+    parser.add_argument('--baseline', metavar='FILE', help="Файл результатов для сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Допустимый рост времени и памяти (доля, по умолчанию 0.2)")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.books, args.customers, args.employees, args.sales,
+                        args.seed, args.repeats, args.operations)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(current, file, ensure_ascii=False, indent=2)
+        print(f"Результаты записаны в {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare_results(current, baseline, args.tolerance)
+        _print_comparison(current, baseline, regressions)
+        if regressions:
+            print(f"Найдено регрессий: {len(regressions)} (допуск {args.tolerance:.0%})")
+            return 1
+        print("Регрессий не найдено")
+    return 0
+
+
+def main() -> int:
+    """Точка входа: `benchmark.py suite ...` - набор замеров для сравнения, иначе исследовательские замеры"""
+    if sys.argv[1:2] == ['suite']:
+        return suite_main(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description="Замеры производительности книжного магазина")
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7],
+                        help="Количество продаж для замеров")
+    parser.add_argument('--books', type=int, default=300_000,
+                        help="Количество книг для замеров поиска")
+    parser.add_argument('--inserts', type=int, nargs='+',
+                        default=[10 ** 4, 10 ** 5, 10 ** 6],
+                        help="Количество книг для замеров массовой вставки")
+    parser.add_argument('--xml-sales', type=int, default=10 ** 6,
+                        help="Количество продаж для замера записи XML")
+    parser.add_argument('--snapshot-sales', type=int, default=10 ** 6,
+                        help="Количество продаж для замера загрузки снимков")
+    parser.add_argument('--entities', type=int, default=10 ** 6,
+                        help="Количество экземпляров для замера памяти сущностей")
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="Количество шардов для замера масштабирования")
+    parser.add_argument('--load-workers', type=int, nargs='+', default=[2, 4, 8],
+                        help="Количество процессов для замера параллельной загрузки")
+    args = parser.parse_args()
+
+    bench_sales_lookup(args.sizes)
+    bench_search(args.books)
+    bench_bulk_insert(args.inserts)
+    bench_bulk_import(max(args.inserts))
+    bench_xml_save(args.xml_sales)
+    bench_snapshot_load(args.snapshot_sales)
+    bench_sales_archive(args.snapshot_sales)
+    bench_entity_memory(args.entities)
+    bench_analytics(args.snapshot_sales)
+    bench_checkout(1000)
+    bench_background_save(args.snapshot_sales)
+    bench_sharding(args.shards)
+    bench_parallel_load(args.snapshot_sales, args.load_workers)
+    bench_trusted_load(args.snapshot_sales)
+    bench_metrics_overhead(args.snapshot_sales)
+    bench_concurrent_sales([1, 4, 8])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
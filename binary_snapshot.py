@@ -0,0 +1,217 @@
+# Модуль с двоичным колоночным форматом снимков книжного магазина
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import islice
+from operator import lt
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from classes import datetime_to_micros
+
+# Формат файла:
+#   преамбула: сигнатура, версия, смещение и длина метаданных;
+#   колонки - массивы фиксированной ширины, выровненные по 8 байт;
+#   таблица строк - смещения (q) и общий блок UTF-8;
+#   метаданные JSON в конце файла: таблицы, колонки, их типы и смещения.
+MAGIC = b'BKSTORE\x00'
+VERSION = 1
+_PREAMBLE = struct.Struct('<8sIIQQ')  # сигнатура, версия, резерв, смещение и длина метаданных
+_ALIGN = 8
+
+# Вид колонки -> код типа array: целые, вещественные, индексы строк,
+# даты в микросекундах от начала эпохи (наивное время)
+KINDS = {'int': 'q', 'float': 'd', 'str': 'i', 'datetime': 'q'}
+
+class _StringTable:
+    """Таблица уникальных строк, на которые ссылаются строковые колонки"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+
+    def id(self, text: str) -> int:
+        """Номер строки в таблице (строка добавляется при первом обращении)"""
+        index = self._ids.get(text)
+        if index is None:
+            index = self._ids[text] = len(self._ids)
+        return index
+
+    def encode(self) -> Tuple[array, bytes]:
+        """Смещения строк и общий блок байт UTF-8"""
+        blob = bytearray()
+        offsets = array('q', [0])
+        for text in self._ids:
+            blob += text.encode('utf-8')
+            offsets.append(len(blob))
+        return offsets, bytes(blob)
+
+
+def _pad(f, position: int) -> int:
+    """Дописать нули до границы выравнивания; возвращает новую позицию"""
+    padding = -position % _ALIGN
+    f.write(b'\x00' * padding)
+    return position + padding
+
+
+def write_binary_snapshot(filename: str, name: str, counters: Dict[str, int],
+                          tables: Iterable[Tuple[str, int, Iterable[Tuple[str, str, Iterable[Any]]]]],
+                          extras: Dict[str, Any] = None) -> None:
+    """Запись двоичного снимка
+
+    tables - кортежи (имя таблицы, число строк, колонки), колонки - кортежи
+    (имя, вид из KINDS, значения). Колонки пишутся по одной, поэтому
+    в памяти одновременно находится только один массив. Для первой колонки
+    таблицы (ID) отмечается, упорядочена ли она по возрастанию.
+
+    Снимок пишется во временный файл и затем атомарно заменяет прежний,
+    поэтому перезапись файла, отображенного в память, безопасна.
+    """
+    strings = _StringTable()
+    metadata: Dict[str, Any] = {
+        'name': name,
+        'counters': counters,
+        'extras': extras or {},
+        'byteorder': sys.byteorder,
+        'tables': {}
+    }
+
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, 0, 0, 0))
+        position = _PREAMBLE.size
+
+        def write_array(values: array) -> Dict[str, int]:
+            nonlocal position
+            position = _pad(f, position)
+            data = values.tobytes()
+            f.write(data)
+            block = {'offset': position, 'length': len(data)}
+            position += len(data)
+            return block
+
+        for table, count, columns in tables:
+            table_meta: Dict[str, Any] = {'count': count, 'columns': {}}
+            for column, kind, values in columns:
+                if kind == 'str':
+                    values = map(strings.id, values)
+                elif kind == 'datetime':
+                    values = map(datetime_to_micros, values)
+                data = array(KINDS[kind], values)
+                if len(data) != count:
+                    raise ValueError(f"в колонке {table}.{column} {len(data)} значений вместо {count}")
+                if not table_meta['columns']:
+                    table_meta['sorted'] = all(map(lt, data, islice(data, 1, None)))
+                table_meta['columns'][column] = {'kind': kind, **write_array(data)}
+            metadata['tables'][table] = table_meta
+
+        offsets, blob = strings.encode()
+        metadata['strings'] = {'count': len(offsets) - 1, 'offsets': write_array(offsets)}
+        position = _pad(f, position)
+        f.write(blob)
+        metadata['strings']['blob'] = {'offset': position, 'length': len(blob)}
+        position += len(blob)
+
+        meta_bytes = json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+        f.write(meta_bytes)
+        f.seek(0)
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, 0, position, len(meta_bytes)))
+    os.replace(temp_filename, filename)
+
+
+class BinarySnapshot:
+    """Двоичный снимок, отображенный в память
+
+    Колонки возвращаются как memoryview над файлом без копирования;
+    строковые колонки - как списки строк. Все полученные колонки
+    становятся недействительными после close().
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._views: List[memoryview] = [self._view]
+        self._strings: Optional[List[str]] = None
+
+        try:
+            if len(self._mmap) < _PREAMBLE.size:
+                raise ValueError("файл слишком короткий для двоичного снимка")
+            magic, version, _, meta_offset, meta_length = _PREAMBLE.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise ValueError("файл не является двоичным снимком магазина")
+            if version != VERSION:
+                raise ValueError(f"неподдерживаемая версия двоичного снимка: {version}")
+            self.metadata: Dict[str, Any] = json.loads(
+                self._mmap[meta_offset:meta_offset + meta_length].decode('utf-8'))
+        except Exception:
+            self.close()
+            raise
+        self._swap = self.metadata['byteorder'] != sys.byteorder
+
+    def _array(self, block: Dict[str, int], typecode: str) -> Sequence:
+        """Массив фиксированной ширины по смещению и длине блока"""
+        start = block['offset']
+        raw = self._view[start:start + block['length']]
+        self._views.append(raw)
+        if self._swap:
+            # Снимок записан на машине с другим порядком байт - нужна копия
+            values = array(typecode)
+            values.frombytes(raw)
+            values.byteswap()
+            return values
+        values = raw.cast(typecode)
+        self._views.append(values)
+        return values
+
+    def count(self, table: str) -> int:
+        """Количество строк таблицы"""
+        return self.metadata['tables'][table]['count']
+
+    def has_table(self, table: str) -> bool:
+        """Есть ли таблица в снимке"""
+        return table in self.metadata['tables']
+
+    def is_sorted(self, table: str) -> bool:
+        """Упорядочена ли первая колонка (ID) таблицы по возрастанию"""
+        return self.metadata['tables'][table].get('sorted', False)
+
+    def kind(self, table: str, column: str) -> str:
+        """Вид колонки из KINDS"""
+        return self.metadata['tables'][table]['columns'][column]['kind']
+
+    def strings(self) -> List[str]:
+        """Таблица строк снимка (декодируется при первом обращении)"""
+        if self._strings is None:
+            meta = self.metadata['strings']
+            offsets = self._array(meta['offsets'], 'q')
+            start = meta['blob']['offset']
+            blob = self._mmap[start:start + meta['blob']['length']]
+            self._strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+                             for i in range(meta['count'])]
+        return self._strings
+
+    def column(self, table: str, column: str) -> Sequence:
+        """Значения колонки; даты возвращаются в микросекундах от начала эпохи"""
+        meta = self.metadata['tables'][table]['columns'][column]
+        values = self._array(meta, KINDS[meta['kind']])
+        if meta['kind'] == 'str':
+            strings = self.strings()
+            return [strings[index] for index in values]
+        return values
+
+    def close(self) -> None:
+        """Освобождение отображения файла в память"""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+
+    def __enter__(self) -> 'BinarySnapshot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
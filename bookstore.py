@@ -1,83 +1,641 @@
 # Модуль с основным классом книжного магазина и операциями с файлами
 
 
+import copy
+import io
 import json
+import math
+import multiprocessing
+import os
+import threading
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+from operator import attrgetter
 import xml.etree.ElementTree as ET
-from typing import List, Dict
-from classes import Book, Employee, Customer, Sale
+from typing import (Any, Callable, ContextManager, Iterable, Iterator, List, Dict, Mapping, MutableMapping,
+                    NamedTuple, Optional, Set, Tuple, Union)
+from binary_snapshot import BinarySnapshot, write_binary_snapshot
+from classes import (Book, Employee, Customer, Sale, entities_from_columns, entity_columns,
+                     micros_to_datetime)
 from exceptions import *
+from indexes import TextIndex, SortedIndex
+from journal import Journal, read_journal, sync_directory
+from locking import StripedLock
+from metrics import Metrics, instrument, public_methods, uninstrument
+from sales_history import FrozenPrefix, TieredSales
+from storage import MemoryStorage
+from validation import entity_rule_columns, first_invalid
+from streaming import (JsonSnapshotReader, open_compressed, open_decompressed,
+                       write_json_snapshot, write_xml_snapshot)
+
+class _StoreView(NamedTuple):
+    """Данные магазина для записи снимка: живые контейнеры или их снимок"""
+    name: str
+    counters: Dict[str, int]
+    extras: Dict[str, int]  # необязательные счетчики (LSN журнала)
+    books: Mapping[int, Book]
+    employees: Mapping[int, Employee]
+    customers: Mapping[int, Customer]
+    sales: Mapping[int, Sale]
+
+
+# Записи разделов параллельной загрузки: процессы пула, созданные через fork,
+# получают их без передачи по каналу. Блокировка не дает одновременным
+# загрузкам в одном процессе подменить записи друг друга
+_LOAD_RECORDS: List[List[Dict[str, Any]]] = []
+_LOAD_RECORDS_LOCK = threading.Lock()
+
+
+def _build_entity_columns(entity_cls: type, records: Union[List[Dict[str, Any]], Tuple[int, int, int]],
+                          types: Dict[str, Callable] = None, validate: bool = True) -> List[List[Any]]:
+    """Создание и проверка сущностей в процессе пула загрузки
+
+    records - словари записей или (номер раздела, начало, конец) в _LOAD_RECORDS;
+    types - преобразования типов полей для записей XML, где все значения - строки.
+    Возвращает колонки значений слотов (см. entity_columns).
+    """
+    if isinstance(records, tuple):
+        section, start, end = records
+        records = _LOAD_RECORDS[section][start:end]
+    entities = []
+    for data in records:
+        if types:
+            for field, convert in types.items():
+                data[field] = convert(data[field])
+        entities.append(entity_cls.from_dict(data, validate))
+    return entity_columns(entity_cls, entities)
+
 
 class Bookstore:
     """Основной класс книжного магазина"""
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, storage=None, thread_safe: bool = False):
         self.name = name
-        self.books: Dict[int, Book] = {}  # book_id -> Book
-        self.employees: Dict[int, Employee] = {}  # emp_id -> Employee
-        self.customers: Dict[int, Customer] = {}  # cust_id -> Customer
-        self.sales: Dict[int, Sale] = {}  # sale_id -> Sale
+        # Хранилище данных: по умолчанию словари в памяти, либо SQLiteStorage
+        self._storage = storage if storage is not None else MemoryStorage()
+        self.books: MutableMapping[int, Book] = self._storage.books  # book_id -> Book
+        self.employees: MutableMapping[int, Employee] = self._storage.employees  # emp_id -> Employee
+        self.customers: MutableMapping[int, Customer] = self._storage.customers  # cust_id -> Customer
+        self.sales: MutableMapping[int, Sale] = self._storage.sales  # sale_id -> Sale
         self._next_book_id = 1
         self._next_emp_id = 1
         self._next_cust_id = 1
         self._next_sale_id = 1
+        # Нумерация продаж start, start + step, ... (шаг больше 1 - у шардов)
+        self._sale_id_start = 1
+        self._sale_id_step = 1
+
+        # Вторичные индексы продаж: ключ -> массив ID продаж в порядке добавления
+        self._sales_by_customer: Dict[int, array] = {}  # cust_id -> [sale_id]
+        self._sales_by_employee: Dict[int, array] = {}  # emp_id -> [sale_id]
+        self._sales_by_book: Dict[int, array] = {}  # book_id -> [sale_id]
+
+        # Индексы книг: текстовый поиск и порядок добавления для стабильной выдачи
+        self._text_index = TextIndex(('title', 'author', 'genre'))
+        self._book_order: Dict[int, int] = {}  # book_id -> порядковый номер
+        self._book_seq = 0
+        self._price_index = SortedIndex()  # цена -> book_id
+        self._year_index = SortedIndex()  # год издания -> book_id
+
+        # Накопительные агрегаты, обновляемые при каждом изменении за O(1)
+        self._total_revenue = 0.0
+        self._inventory_value = 0.0
+
+        # Журнал предзаписи: номер последней записи (LSN), учтенной в данных
+        self._journal: Optional[Journal] = None
+        self._journal_lsn = 0
+
+        # Колоночная аналитика продаж (создается при первом обращении)
+        self._analytics = None
+
+        # Режим для параллельной работы: остатки книг защищаются блокировками
+        # по полосам book_id, а общее состояние (счетчики ID, продажи, индексы,
+        # агрегаты, журнал) - короткой общей блокировкой
+        self.thread_safe = thread_safe
+        self._book_locks = StripedLock() if thread_safe else None
+        self._state_lock = threading.RLock() if thread_safe else nullcontext()
+
+        # Фоновые снимки пишет один рабочий поток, по очереди
+        self._snapshot_executor: Optional[ThreadPoolExecutor] = None
+        self._pending_snapshots: Set[Future] = set()
+
+        # Реестр метрик вызовов (учет включается явно через enable_metrics)
+        self.metrics: Optional[Metrics] = None
+
+        # Хранилище может уже содержать данные (например, открытая база SQLite)
+        self._finish_load()
+
+    def _lock_books(self, *book_ids: int) -> ContextManager:
+        """Блокировка остатков книг (ничего не делает вне режима thread_safe)"""
+        if self._book_locks is None:
+            return nullcontext()
+        return self._book_locks.hold(book_ids)
+
+    @contextmanager
+    def _quiesce(self) -> Iterator[None]:
+        """Остановка всех изменений: блокируются остатки всех книг и общее состояние
+
+        Продажи в памяти публикуются под блокировкой книги уже после выхода
+        из общей блокировки, поэтому согласованную картину (снимок, LSN,
+        пересчет) дает только захват всех полос.
+        """
+        if self._book_locks is None:
+            with self._state_lock:
+                yield
+            return
+        with self._book_locks.hold_all(), self._state_lock:
+            yield
+
+    # Счетчики и агрегаты, которые восстанавливаются при откате транзакции хранилища
+    _ROLLBACK_STATE = ('_next_book_id', '_next_emp_id', '_next_cust_id', '_next_sale_id',
+                       '_total_revenue', '_inventory_value')
+
+    @contextmanager
+    def _batch(self) -> Iterator[None]:
+        """Группа изменений хранилища (вызывается под общей блокировкой)
+
+        Если хранилище откатывает группу при ошибке, счетчики ID и агрегаты
+        возвращаются к значениям на ее начало.
+        """
+        if not self._storage.transactional:
+            with self._storage.batch():
+                yield
+            return
+        state = [getattr(self, attr) for attr in self._ROLLBACK_STATE]
+        try:
+            with self._storage.batch():
+                yield
+        except BaseException:
+            for attr, value in zip(self._ROLLBACK_STATE, state):
+                setattr(self, attr, value)
+            raise
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Группа изменений в одной транзакции хранилища
+
+        Блокировки всегда берутся в порядке: книги, общее состояние,
+        хранилище. Транзакция останавливает все остальные изменения,
+        поэтому ее нельзя открывать под блокировкой отдельной книги.
+        После отката хранилища индексы поиска строятся заново по его данным.
+        """
+        with self._quiesce():
+            try:
+                with self._batch():
+                    yield
+            except BaseException:
+                if self._storage.transactional:
+                    self._rebuild_indexes()
+                raise
+
+    @contextmanager
+    def _reload(self) -> Iterator[None]:
+        """Замена всех данных магазина в одной транзакции
+
+        По завершении счетчики, индексы и агрегаты согласуются с загруженными
+        данными. Если загрузка прервалась, хранилище SQLite откатывается
+        к прежним данным, а в памяти остается часть снимка, прочитанная
+        до сбоя, - производные структуры строятся по ней.
+        """
+        with self._transaction():
+            try:
+                yield
+            except BaseException:
+                if not self._storage.transactional:
+                    self._finish_load()
+                raise
+            self._finish_load()
+
+    def close(self) -> None:
+        """Закрытие хранилища данных"""
+        if self._snapshot_executor is not None:
+            self._snapshot_executor.shutdown(wait=True)
+            self._snapshot_executor = None
+        if isinstance(self.sales, TieredSales):
+            self.sales.close()
+        self._storage.close()
 
     def _get_next_book_id(self) -> int:
         """Получить следующий доступный ID для книги"""
-        # Если есть книги, находим максимальный ID и добавляем 1
-        if self.books:
-            max_id = max(self.books.keys())
-            return max_id + 1
-        return 1
+        return self._next_book_id
 
     def _get_next_emp_id(self) -> int:
         """Получить следующий доступный ID для сотрудника"""
-        if self.employees:
-            max_id = max(self.employees.keys())
-            return max_id + 1
-        return 1
+        return self._next_emp_id
 
     def _get_next_cust_id(self) -> int:
         """Получить следующий доступный ID для клиента"""
-        if self.customers:
-            max_id = max(self.customers.keys())
-            return max_id + 1
-        return 1
+        return self._next_cust_id
+
+    def _sync_id_counters(self) -> None:
+        """Согласование счетчиков ID с загруженными данными"""
+        # Счетчики из файла могут отсутствовать или отставать от реальных ID
+        max_id = self._storage.max_id
+        self._next_book_id = max(self._next_book_id, max_id('books') + 1)
+        self._next_emp_id = max(self._next_emp_id, max_id('employees') + 1)
+        self._next_cust_id = max(self._next_cust_id, max_id('customers') + 1)
+        self._next_sale_id = self._align_sale_id(max(self._next_sale_id, max_id('sales') + 1))
+
+    def _align_sale_id(self, sale_id: int) -> int:
+        """Ближайший ID продажи не меньше sale_id из последовательности магазина"""
+        return sale_id + (self._sale_id_start - sale_id) % self._sale_id_step
+
+    def configure_sale_ids(self, start: int, step: int) -> None:
+        """Нумерация новых продаж start, start + step, ...
+
+        Магазины с одинаковым step и разными start (от 1 до step) выдают
+        непересекающиеся ID продаж - так шарды получают глобально уникальные ID.
+        """
+        if step < 1 or not 1 <= start <= step:
+            raise ValueError(f"некорректная нумерация продаж: start={start}, step={step}")
+        with self._state_lock:
+            self._sale_id_start, self._sale_id_step = start, step
+            self._next_sale_id = self._align_sale_id(self._next_sale_id)
+
+    def _reserve_lsn(self) -> int:
+        """Выдача следующего LSN (вызывается под общей блокировкой)"""
+        self._journal_lsn += 1
+        return self._journal_lsn
+
+    def _release_lsn(self, lsn: Optional[int]) -> None:
+        """Возврат LSN записи, не попавшей в журнал, если следующий еще не выдан"""
+        with self._state_lock:
+            if lsn is not None and self._journal_lsn == lsn:
+                self._journal_lsn -= 1
+
+    def _log(self, op: str, **payload) -> None:
+        """Добавление записи об изменении в журнал предзаписи"""
+        # Выдача LSN и запись идут под общей блокировкой, в одном порядке
+        with self._state_lock:
+            try:
+                self._journal.append({'lsn': self._reserve_lsn(), 'op': op, **payload})
+            except BaseException:
+                # Запись не попала в журнал: ее LSN получит следующая
+                self._journal_lsn -= 1
+                raise
+
+    def attach_journal(self, journal: Journal) -> None:
+        """Подключение журнала: далее все изменения записываются в него"""
+        self._journal = journal
+
+    def detach_journal(self) -> Optional[Journal]:
+        """Отключение журнала; возвращает ранее подключенный журнал"""
+        journal, self._journal = self._journal, None
+        return journal
+
+    def enable_metrics(self, metrics: Metrics = None) -> Metrics:
+        """Включение учета вызовов, задержек и ошибок публичных методов"""
+        methods = [name for name in public_methods(self)
+                   if name not in ('enable_metrics', 'disable_metrics')]
+        self.metrics = instrument(self, metrics, methods)
+        return self.metrics
+
+    def disable_metrics(self) -> Optional[Metrics]:
+        """Отключение учета; возвращает ранее подключенный реестр"""
+        metrics, self.metrics = self.metrics, None
+        uninstrument(self)
+        return metrics
+
+    def _replay(self, record: Dict[str, Any]) -> None:
+        """Повтор одной записи журнала без проверок и вывода сообщений"""
+        op = record['op']
+        if op == 'add_book':
+            self._insert_book(Book.from_dict(record['book']))
+        elif op == 'remove_book':
+            self._apply_removal(self.books[record['book_id']], record['quantity'])
+        elif op == 'sell':
+            sale = Sale.from_dict(record['sale'])
+            self._apply_sale(self.books[sale.book_id], sale)
+        elif op == 'checkout':
+            for sale_data in record['sales']:
+                sale = Sale.from_dict(sale_data)
+                self._apply_sale(self.books[sale.book_id], sale)
+        elif op == 'set_price':
+            self._apply_price(self.books[record['book_id']], record['price'])
+        elif op == 'add_employee':
+            self._insert_employee(Employee.from_dict(record['employee']))
+        elif op == 'add_customer':
+            self._insert_customer(Customer.from_dict(record['customer']))
+        else:
+            raise ValueError(f"неизвестная операция журнала: {op}")
+
+    def recover(self, journal_filename: str, snapshot_filename: str = None) -> int:
+        """Восстановление после сбоя: загрузка снимка и повтор журнала поверх него
+
+        Записи журнала, уже учтенные в снимке (по LSN), пропускаются.
+        Продажи разных книг пишутся в журнал без общей блокировки, поэтому
+        их LSN в файле могут идти не по порядку; записи одной книги всегда
+        упорядочены. Возвращает количество примененных записей.
+        """
+        if snapshot_filename is not None:
+            if snapshot_filename.endswith('.xml'):
+                self.load_from_xml(snapshot_filename)
+            else:
+                self.load_from_json(snapshot_filename)
 
-    def add_book(self, book: Book) -> None:
-        """Добавление книги в магазин"""
+        journal = self.detach_journal()
+        applied = 0
+        lsn = None
+        try:
+            with self._transaction():
+                snapshot_lsn = self._journal_lsn
+                for record in read_journal(journal_filename):
+                    lsn = record['lsn']
+                    if lsn <= snapshot_lsn:
+                        continue
+                    self._replay(record)
+                    self._journal_lsn = max(self._journal_lsn, lsn)
+                    applied += 1
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при восстановлении из журнала (LSN {lsn}): {e}")
+        finally:
+            self._journal = journal
+
+        print(f"Из журнала {journal_filename} применено записей: {applied}")
+        return applied
+
+    def checkpoint(self, filename: str, **options) -> None:
+        """Сохранение полного снимка JSON и очистка журнала
+
+        Снимок пишется во временный файл, синхронизируется на диск и только
+        затем заменяет прежний, поэтому сбой во время записи не оставит
+        магазин без снимка. Из журнала удаляются только записи, учтенные
+        в снимке; изменения, сделанные во время записи, в журнале остаются.
+        """
         try:
+            if isinstance(self._storage, MemoryStorage):
+                # Данные и LSN фиксируются вместе, запись идет без блокировки
+                view = self._frozen_view()
+                self._replace_file('_write_json', view, filename, options)
+            else:
+                # Хранилище на диске не дает копии данных: изменения ждут записи
+                with self._quiesce():
+                    view = self._live_view()
+                    self._replace_file('_write_json', view, filename, options)
+            if self._journal is not None:
+                self._journal.truncate(view.extras['journal_lsn'])
+            print(f"Контрольная точка сохранена в {filename}")
+
+        except BookstoreError:
+            raise
+        except Exception as e:
+            raise FileOperationError(f"Ошибка при сохранении контрольной точки: {e}")
+
+    def _index_book(self, book: Book) -> None:
+        """Добавление книги в индексы поиска"""
+        self._book_order[book.book_id] = self._book_seq
+        self._book_seq += 1
+        self._text_index.add(book.book_id, {
+            'title': book.title,
+            'author': book.author,
+            'genre': book.genre
+        })
+        self._price_index.add(book.book_id, book.price)
+        self._year_index.add(book.book_id, book.year)
+
+    def _unindex_book(self, book: Book) -> None:
+        """Удаление книги из индексов поиска"""
+        del self._book_order[book.book_id]
+        self._text_index.remove(book.book_id)
+        self._price_index.remove(book.book_id)
+        self._year_index.remove(book.book_id)
+
+    def _index_books_bulk(self, books: List[Book]) -> None:
+        """Добавление множества книг в индексы поиска за один проход"""
+        if not books:
+            return
+        for book in books:
+            self._book_order[book.book_id] = self._book_seq
+            self._book_seq += 1
+            self._text_index.add(book.book_id, {
+                'title': book.title,
+                'author': book.author,
+                'genre': book.genre
+            })
+        # Упорядоченные индексы строим одной сортировкой, а не вставками
+        self._price_index.load((book.book_id, book.price) for book in books)
+        self._year_index.load((book.book_id, book.year) for book in books)
+
+    def _rebuild_indexes(self) -> None:
+        """Перестроение всех индексов после загрузки данных"""
+        self._text_index.clear()
+        self._book_order.clear()
+        self._price_index.clear()
+        self._year_index.clear()
+        self._index_books_bulk(list(self.books.values()))
+        self._rebuild_sale_indexes()
+
+    def _index_sale(self, sale: Sale) -> None:
+        """Добавление продажи во вторичные индексы"""
+        if self._storage.indexes_sales:
+            return
+        self._index_sale_row(sale.sale_id, sale.customer_id, sale.employee_id, sale.book_id)
+
+    def _index_sale_row(self, sale_id: int, customer_id: int, employee_id: int, book_id: int) -> None:
+        """Добавление продажи во вторичные индексы по значениям полей"""
+        for index, key in ((self._sales_by_customer, customer_id),
+                           (self._sales_by_employee, employee_id),
+                           (self._sales_by_book, book_id)):
+            # Массивы ID занимают 8 байт на продажу вместо объекта int в списке;
+            # setdefault атомарен, поэтому параллельные продажи не теряют массив
+            sale_ids = index.get(key)
+            if sale_ids is None:
+                sale_ids = index.setdefault(key, array('q'))
+            sale_ids.append(sale_id)
+
+    def _rebuild_sale_indexes(self) -> None:
+        """Перестроение вторичных индексов продаж с нуля"""
+        self._sales_by_customer.clear()
+        self._sales_by_employee.clear()
+        self._sales_by_book.clear()
+        if self._storage.indexes_sales:
+            return
+        # Поля читаем без создания объектов Sale (важно для архива продаж)
+        for row in self._sale_rows('sale_id', 'customer_id', 'employee_id', 'book_id'):
+            self._index_sale_row(*row)
+
+    def _sale_rows(self, *fields: str, sales: Mapping[int, Sale] = None) -> Iterable[Any]:
+        """Значения полей всех продаж; для архива - прямо из колонок файла"""
+        sales = self.sales if sales is None else sales
+        if isinstance(sales, TieredSales):
+            return sales.rows(*fields)
+        return map(attrgetter(*fields), sales.values())
+
+    def _sales_from_index(self, index: Dict[int, array], column: str, key: int) -> List[Sale]:
+        """Получение продаж по списку ID из вторичного индекса"""
+        if self._storage.indexes_sales:
+            # Хранилище само ведет индексы по внешним ключам продаж
+            return self._storage.find_sales(column, key)
+        sales = self.sales
+        return [sales[sale_id] for sale_id in index.get(key, ())]
+
+    def _insert_book(self, book: Book, index: bool = True) -> str:
+        """Добавление книги без вывода сообщений; возвращает 'added' или 'merged'"""
+        with self._state_lock:
+            next_book_id = self._next_book_id
             # Если ID не установлен (0 или отрицательный), назначаем следующий доступный
             if book.book_id <= 0:
                 book.book_id = self._get_next_book_id()
 
             if book.book_id in self.books:
                 # Если книга уже есть, увеличиваем количество
-                self.books[book.book_id].quantity += book.quantity
-                print(f"Количество книги '{book.title}' увеличено. Теперь в наличии: {self.books[book.book_id].quantity}")
+                existing = self.books[book.book_id]
+                existing.quantity += book.quantity
+                self.books[existing.book_id] = existing
+                self._inventory_value += existing.price * book.quantity
+                status = 'merged'
             else:
                 self.books[book.book_id] = book
+                if index:
+                    self._index_book(book)
+                self._inventory_value += book.price * book.quantity
                 # Обновляем счетчик следующего ID
                 if book.book_id >= self._next_book_id:
                     self._next_book_id = book.book_id + 1
+                status = 'added'
+
+            if self._journal is not None:
+                try:
+                    self._log('add_book', book=book.to_dict())
+                except BaseException:
+                    # Изменение без записи в журнале не пережило бы сбой - отменяем его
+                    if status == 'merged':
+                        existing.quantity -= book.quantity
+                        self.books[existing.book_id] = existing
+                        self._inventory_value -= existing.price * book.quantity
+                    else:
+                        del self.books[book.book_id]
+                        if index:
+                            self._unindex_book(book)
+                        self._inventory_value -= book.price * book.quantity
+                        self._next_book_id = next_book_id
+                    raise
+            return status
+
+    def add_book(self, book: Book) -> None:
+        """Добавление книги в магазин"""
+        try:
+            # Пополнение существующей книги меняет остаток, как и продажа
+            with self._lock_books(book.book_id):
+                status = self._insert_book(book)
+            if status == 'merged':
+                print(f"Количество книги '{book.title}' увеличено. Теперь в наличии: {self.books[book.book_id].quantity}")
+            else:
                 print(f"Книга '{book.title}' успешно добавлена с ID: {book.book_id}")
         except Exception as e:
             raise BookstoreError(f"Ошибка при добавлении книги: {e}")
 
-    def remove_book(self, book_id: int, quantity: int = 1) -> None:
-        """Удаление книги из магазина"""
+    def _bulk_insert(self, items: Iterable[Union[Any, Dict]], entity_cls: type,
+                     insert: Callable[[Any], str], max_errors: int) -> Dict[str, Any]:
+        """Общий цикл массового добавления с подсчетом итогов"""
+        summary: Dict[str, Any] = {'added': 0, 'merged': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+        for position, item in enumerate(items):
+            try:
+                entity = item if isinstance(item, entity_cls) else entity_cls.from_dict(item)
+                summary[insert(entity)] += 1
+            except (KeyError, TypeError, ValueError, BookstoreError) as e:
+                # Некорректные записи пропускаем, запоминая первые ошибки
+                summary['failed'] += 1
+                if len(summary['errors']) < max_errors:
+                    summary['errors'].append((position, f"{type(e).__name__}: {e}"))
+        return summary
+
+    def add_books_bulk(self, books: Iterable[Union[Book, Dict]], max_errors: int = 100) -> Dict[str, Any]:
+        """Массовое добавление книг из объектов Book или словарей
+
+        Возвращает итог: added, merged, failed и список первых ошибок
+        (позиция, сообщение). Индексы новых книг строятся одним проходом.
+        """
+        new_books: List[Book] = []
+
+        def insert(book: Book) -> str:
+            status = self._insert_book(book, index=False)
+            if status == 'added':
+                new_books.append(book)
+            return status
+
         try:
-            if book_id not in self.books:
-                raise BookNotFoundError(f"Книга с ID {book_id} не найдена")
+            with self._transaction():
+                return self._bulk_insert(books, Book, insert, max_errors)
+        except Exception as e:
+            if self._storage.transactional:
+                # Хранилище откатило добавление, индексы уже построены по его данным
+                new_books.clear()
+            raise BookstoreError(f"Ошибка при массовом добавлении книг: {e}")
+        finally:
+            # Индексируем добавленное даже при прерывании, чтобы не рассогласовать поиск
+            with self._state_lock:
+                self._index_books_bulk(new_books)
+
+    def add_employees_bulk(self, employees: Iterable[Union[Employee, Dict]],
+                           max_errors: int = 100) -> Dict[str, Any]:
+        """Массовое добавление сотрудников из объектов Employee или словарей"""
+        try:
+            with self._transaction():
+                return self._bulk_insert(employees, Employee, self._insert_employee, max_errors)
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при массовом добавлении сотрудников: {e}")
 
-            book = self.books[book_id]
-            if book.quantity < quantity:
-                raise InsufficientQuantityError(
-                    f"Недостаточно книг. В наличии: {book.quantity}, запрошено: {quantity}"
-                )
+    def add_customers_bulk(self, customers: Iterable[Union[Customer, Dict]],
+                           max_errors: int = 100) -> Dict[str, Any]:
+        """Массовое добавление клиентов из объектов Customer или словарей"""
+        try:
+            with self._transaction():
+                return self._bulk_insert(customers, Customer, self._insert_customer, max_errors)
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при массовом добавлении клиентов: {e}")
+
+    def _apply_removal(self, book: Book, quantity: int) -> None:
+        """Списание экземпляров книги с удалением ее при нулевом остатке"""
+        book.quantity -= quantity
+        self._inventory_value -= book.price * quantity
+        if book.quantity == 0:
+            del self.books[book.book_id]
+            self._unindex_book(book)
+            if not self.books:
+                # Сбрасываем накопленную погрешность округления
+                self._inventory_value = 0.0
+        else:
+            self.books[book.book_id] = book
+
+    def _undo_removal(self, book: Book, quantity: int, order: int) -> None:
+        """Возврат списанных экземпляров (обратная к _apply_removal)
+
+        order - прежнее место книги в порядке выдачи поиска (_book_order).
+        """
+        removed = book.book_id not in self.books
+        book.quantity += quantity
+        self._inventory_value += book.price * quantity
+        self.books[book.book_id] = book
+        if removed:
+            self._index_book(book)
+            self._book_order[book.book_id] = order
 
-            book.quantity -= quantity
+    def remove_book(self, book_id: int, quantity: int = 1) -> None:
+        """Удаление книги из магазина"""
+        try:
+            with self._lock_books(book_id):
+                if book_id not in self.books:
+                    raise BookNotFoundError(f"Книга с ID {book_id} не найдена")
+
+                book = self.books[book_id]
+                if book.quantity < quantity:
+                    raise InsufficientQuantityError(
+                        f"Недостаточно книг. В наличии: {book.quantity}, запрошено: {quantity}"
+                    )
+
+                with self._state_lock:
+                    book = self.books[book_id]
+                    order = self._book_order.get(book_id)
+                    self._apply_removal(book, quantity)
+                    if self._journal is not None:
+                        try:
+                            self._log('remove_book', book_id=book_id, quantity=quantity)
+                        except BaseException:
+                            self._undo_removal(book, quantity, order)
+                            raise
             if book.quantity == 0:
-                del self.books[book_id]
                 print(f"Книга '{book.title}' полностью удалена из магазина")
             else:
                 print(f"Удалено {quantity} экз. книги '{book.title}'. Осталось: {book.quantity}")
@@ -87,6 +645,88 @@ class Bookstore:
         except Exception as e:
             raise BookstoreError(f"Ошибка при удалении книги: {e}")
 
+    def _account_sale(self, book: Book, sale: Sale, sign: int = 1) -> None:
+        """Учет продажи в накопительных агрегатах (sign=-1 - отмена учета)"""
+        self._inventory_value -= sign * book.price * sale.quantity
+        self._total_revenue += sign * sale.total_price
+
+    def _publish_sale(self, book: Book, sale: Sale) -> None:
+        """Списание экземпляров и добавление продажи в данные и индексы
+
+        Общая блокировка не нужна: остаток защищен блокировкой книги,
+        а продажа с уже выданным ID только добавляется в словарь и индексы.
+        При ошибке сделанные шаги отменяются: продажа либо опубликована
+        целиком, либо не опубликована вовсе.
+        """
+        self.sales[sale.sale_id] = sale
+        restock = False
+        try:
+            self._index_sale(sale)
+            book.quantity -= sale.quantity
+            restock = True
+            self.books[book.book_id] = book
+        except BaseException:
+            self._retract_sale(book, sale, restock)
+            raise
+
+    def _apply_sale(self, book: Book, sale: Sale) -> None:
+        """Списание проданных экземпляров и регистрация продажи"""
+        self._publish_sale(book, sale)
+        self._account_sale(book, sale)
+        if sale.sale_id >= self._next_sale_id:
+            self._next_sale_id = sale.sale_id + self._sale_id_step
+
+    def _retract_sale(self, book: Book, sale: Sale, restock: bool = True) -> None:
+        """Отмена публикации продажи (обратная к _publish_sale)"""
+        self.sales.pop(sale.sale_id, None)
+        if not self._storage.indexes_sales:
+            with self._state_lock:
+                for index, key in ((self._sales_by_customer, sale.customer_id),
+                                   (self._sales_by_employee, sale.employee_id),
+                                   (self._sales_by_book, sale.book_id)):
+                    # Параллельные продажи могли добавить свои ID после отменяемой;
+                    # пустой массив не удаляем - его уже могла получить другая продажа
+                    sale_ids = index.get(key, ())
+                    for position in range(len(sale_ids) - 1, -1, -1):
+                        if sale_ids[position] == sale.sale_id:
+                            del sale_ids[position]
+                            break
+        if restock:
+            book.quantity += sale.quantity
+            self.books[book.book_id] = book
+
+    def _release_sales(self, books: Dict[int, Book], sales: List[Sale]) -> None:
+        """Снятие учета продаж в агрегатах и возврат их ID
+
+        ID возвращаются, только если следующие за ними еще никому не выданы.
+        """
+        with self._state_lock:
+            for sale in reversed(sales):
+                self._account_sale(books[sale.book_id], sale, -1)
+                if self._next_sale_id == sale.sale_id + self._sale_id_step:
+                    self._next_sale_id = sale.sale_id
+
+    def _reserve_sales(self, books: Dict[int, Book], sales: List[Sale]) -> Optional[int]:
+        """Выдача ID продажам и их учет в агрегатах; возвращает LSN записи журнала
+
+        Это вся работа продажи под общей блокировкой при хранении в памяти:
+        остальное выполняется под блокировкой книг (см. _publish_sale).
+        """
+        with self._state_lock:
+            accounted: List[Sale] = []
+            try:
+                for sale in sales:
+                    self._account_sale(books[sale.book_id], sale)
+                    accounted.append(sale)
+            except BaseException:
+                for sale in reversed(accounted):
+                    self._account_sale(books[sale.book_id], sale, -1)
+                raise
+            for sale in sales:
+                sale.sale_id = self._next_sale_id
+                self._next_sale_id += self._sale_id_step
+            return self._reserve_lsn() if self._journal is not None else None
+
     def sell_book(self, book_id: int, quantity: int, customer_id: int, employee_id: int) -> Sale:
         """Продажа книги клиенту с возвратом объекта Sale"""
         try:
@@ -99,28 +739,58 @@ class Bookstore:
             if employee_id not in self.employees:
                 raise EmployeeNotFoundError(f"Сотрудник с ID {employee_id} не найден")
 
-
-            book = self.books[book_id]
-            if book.quantity < quantity:
-                raise InsufficientQuantityError(
-                    f"Недостаточно книг для продажи. В наличии: {book.quantity}"
+            # Проверка остатка и списание выполняются под блокировкой книги,
+            # чтобы параллельные продажи не продали больше, чем есть
+            with self._lock_books(book_id):
+                book = self.books.get(book_id)
+                if book is None:
+                    raise BookNotFoundError(f"Книга с ID {book_id} не найдена")
+                if book.quantity < quantity:
+                    raise InsufficientQuantityError(
+                        f"Недостаточно книг для продажи. В наличии: {book.quantity}"
+                    )
+
+                total_price = book.price * quantity
+
+                # Создаем запись о продаже до изменения остатков, чтобы ошибка
+                # валидации не оставила магазин в промежуточном состоянии;
+                # окончательный ID выдается вместе с учетом продажи
+                sale = Sale(
+                    sale_id=self._next_sale_id,
+                    book_id=book_id,
+                    customer_id=customer_id,
+                    employee_id=employee_id,
+                    quantity=quantity,
+                    total_price=total_price
                 )
 
-            total_price = book.price * quantity
-            book.quantity -= quantity
-
-            # Создаем запись о продаже
-            sale = Sale(
-                sale_id=self._next_sale_id,
-                book_id=book_id,
-                customer_id=customer_id,
-                employee_id=employee_id,
-                quantity=quantity,
-                total_price=total_price
-            )
-
-            self.sales[self._next_sale_id] = sale
-            self._next_sale_id += 1
+                if isinstance(self._storage, MemoryStorage):
+                    lsn = self._reserve_sales({book_id: book}, [sale])
+                    published = False
+                    try:
+                        self._publish_sale(book, sale)
+                        published = True
+                        if lsn is not None:
+                            self._journal.append({'lsn': lsn, 'op': 'sell', 'sale': sale.to_dict()})
+                    except BaseException:
+                        # Продажа без записи в журнале не пережила бы сбой - отменяем ее
+                        self._cancel_sales({book_id: book}, [sale] if published else [], [sale])
+                        self._release_lsn(lsn)
+                        raise
+                else:
+                    # Хранилище на диске используется одним потоком за раз
+                    with self._state_lock, self._batch():
+                        # Перечитываем книгу: хранилище SQLite возвращает новый
+                        # объект при каждом чтении
+                        book = self.books[book_id]
+                        sale.sale_id = self._next_sale_id
+                        self._apply_sale(book, sale)
+                        if self._journal is not None:
+                            try:
+                                self._log('sell', sale=sale.to_dict())
+                            except BaseException:
+                                self._cancel_sales({book_id: book}, [sale], [sale])
+                                raise
 
             customer = self.customers[customer_id]
             employee = self.employees[employee_id]
@@ -136,41 +806,194 @@ class Bookstore:
         except Exception as e:
             raise BookstoreError(f"Ошибка при продаже книги: {e}")
 
-    def add_employee(self, employee: Employee) -> None:
-        """Добавление сотрудника"""
+    def checkout(self, items: Iterable[Tuple[int, int]], customer_id: int, employee_id: int) -> List[Sale]:
+        """Продажа корзины книг одной операцией: все позиции или ни одной
+
+        items - пары (ID книги, количество). Клиент, сотрудник и наличие
+        проверяются один раз для всей корзины (повторы книги суммируются),
+        записи о продажах создаются до изменения остатков, а при сбое
+        во время списания уже примененные позиции откатываются.
+        Возвращает список продаж в порядке позиций корзины.
+        """
         try:
+            lines = list(items)
+            if not lines:
+                raise ValueError("корзина пуста")
+
+            if customer_id not in self.customers:
+                raise CustomerNotFoundError(f"Клиент с ID {customer_id} не найден")
+
+            if employee_id not in self.employees:
+                raise EmployeeNotFoundError(f"Сотрудник с ID {employee_id} не найден")
+
+            # Суммируем количество по книгам, чтобы проверить остаток один раз
+            requested: Dict[int, int] = {}
+            for book_id, quantity in lines:
+                requested[book_id] = requested.get(book_id, 0) + quantity
+
+            # Остатки всех книг корзины блокируются сразу (в порядке полос)
+            with self._lock_books(*requested):
+                books: Dict[int, Book] = {}
+                for book_id, quantity in requested.items():
+                    book = self.books.get(book_id)
+                    if book is None:
+                        raise BookNotFoundError(f"Книга с ID {book_id} не найдена")
+                    if book.quantity < quantity:
+                        raise InsufficientQuantityError(
+                            f"Недостаточно книги '{book.title}' для продажи. "
+                            f"В наличии: {book.quantity}, в корзине: {quantity}"
+                        )
+                    books[book_id] = book
+
+                # Создаем все записи о продажах до изменения остатков
+                # (окончательные ID выдаются вместе с учетом продаж)
+                sales = [
+                    Sale(
+                        sale_id=self._next_sale_id,
+                        book_id=book_id,
+                        customer_id=customer_id,
+                        employee_id=employee_id,
+                        quantity=quantity,
+                        total_price=books[book_id].price * quantity
+                    )
+                    for book_id, quantity in lines
+                ]
+
+                if isinstance(self._storage, MemoryStorage):
+                    lsn = self._reserve_sales(books, sales)
+                    try:
+                        self._apply_checkout(books, sales, reserved=True)
+                    except BaseException:
+                        self._release_lsn(lsn)
+                        raise
+                    if lsn is not None:
+                        try:
+                            self._journal.append({'lsn': lsn, 'op': 'checkout',
+                                                  'sales': [sale.to_dict() for sale in sales]})
+                        except BaseException:
+                            # Продажи без записи в журнале не пережили бы сбой - отменяем их
+                            self._cancel_sales(books, sales, sales)
+                            self._release_lsn(lsn)
+                            raise
+                else:
+                    # Хранилище на диске используется одним потоком за раз
+                    with self._state_lock:
+                        books = {book_id: self.books[book_id] for book_id in books}
+                        for position, sale in enumerate(sales):
+                            sale.sale_id = self._next_sale_id + position * self._sale_id_step
+                        with self._batch():
+                            self._apply_checkout(books, sales, reserved=False)
+                            if self._journal is not None:
+                                try:
+                                    self._log('checkout', sales=[sale.to_dict() for sale in sales])
+                                except BaseException:
+                                    self._cancel_sales(books, sales, sales)
+                                    raise
+
+            total_price = sum(sale.total_price for sale in sales)
+            print(f"Продажа успешно завершена: {len(sales)} поз. "
+                  f"({sum(requested.values())} экз.) клиенту {self.customers[customer_id].name} "
+                  f"за {total_price} руб. (Продавец: {self.employees[employee_id].name})")
+
+            return sales
+
+        except (BookNotFoundError, CustomerNotFoundError, EmployeeNotFoundError, InsufficientQuantityError):
+            raise
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при оформлении покупки: {e}")
+
+    def _apply_checkout(self, books: Dict[int, Book], sales: List[Sale], reserved: bool) -> None:
+        """Применение продаж корзины с откатом всех позиций при сбое
+
+        reserved - продажи уже учтены в _reserve_sales и только публикуются.
+        Каждая позиция публикуется целиком или не публикуется вовсе, поэтому
+        откат снимает опубликованные позиции и учет всех учтенных.
+        """
+        apply = self._publish_sale if reserved else self._apply_sale
+        applied: List[Sale] = []
+        try:
+            for sale in sales:
+                apply(books[sale.book_id], sale)
+                applied.append(sale)
+        except Exception:
+            self._cancel_sales(books, applied, sales if reserved else applied)
+            raise
+
+    def _cancel_sales(self, books: Dict[int, Book], published: List[Sale], accounted: List[Sale]) -> None:
+        """Отмена продаж: снятие опубликованных и учета учтенных"""
+        for sale in reversed(published):
+            self._retract_sale(books[sale.book_id], sale)
+        self._release_sales(books, accounted)
+
+    def _insert_employee(self, employee: Employee) -> str:
+        """Добавление сотрудника без вывода сообщений; возвращает 'added' или 'skipped'"""
+        with self._state_lock:
             # Если ID не установлен (0 или отрицательный), назначаем следующий доступный
             if employee.emp_id <= 0:
                 employee.emp_id = self._get_next_emp_id()
 
             if employee.emp_id in self.employees:
-                print(f"Сотрудник с ID {employee.emp_id} уже существует")
-                return
+                return 'skipped'
 
+            next_id = self._next_emp_id
             self.employees[employee.emp_id] = employee
             # Обновляем счетчик следующего ID
             if employee.emp_id >= self._next_emp_id:
                 self._next_emp_id = employee.emp_id + 1
+            if self._journal is not None:
+                try:
+                    self._log('add_employee', employee=employee.to_dict())
+                except BaseException:
+                    # Изменение без записи в журнале не пережило бы сбой - отменяем его
+                    del self.employees[employee.emp_id]
+                    self._next_emp_id = next_id
+                    raise
+            return 'added'
+
+    def add_employee(self, employee: Employee) -> None:
+        """Добавление сотрудника"""
+        try:
+            if self._insert_employee(employee) == 'skipped':
+                print(f"Сотрудник с ID {employee.emp_id} уже существует")
+                return
+
             print(f"Сотрудник {employee.name} успешно добавлен с ID: {employee.emp_id}")
 
         except Exception as e:
             raise BookstoreError(f"Ошибка при добавлении сотрудника: {e}")
 
-    def add_customer(self, customer: Customer) -> None:
-        """Добавление клиента"""
-        try:
+    def _insert_customer(self, customer: Customer) -> str:
+        """Добавление клиента без вывода сообщений; возвращает 'added' или 'skipped'"""
+        with self._state_lock:
             # Если ID не установлен (0 или отрицательный), назначаем следующий доступный
             if customer.cust_id <= 0:
                 customer.cust_id = self._get_next_cust_id()
 
             if customer.cust_id in self.customers:
-                print(f"Клиент с ID {customer.cust_id} уже существует")
-                return
+                return 'skipped'
 
+            next_id = self._next_cust_id
             self.customers[customer.cust_id] = customer
             # Обновляем счетчик следующего ID
             if customer.cust_id >= self._next_cust_id:
                 self._next_cust_id = customer.cust_id + 1
+            if self._journal is not None:
+                try:
+                    self._log('add_customer', customer=customer.to_dict())
+                except BaseException:
+                    # Изменение без записи в журнале не пережило бы сбой - отменяем его
+                    del self.customers[customer.cust_id]
+                    self._next_cust_id = next_id
+                    raise
+            return 'added'
+
+    def add_customer(self, customer: Customer) -> None:
+        """Добавление клиента"""
+        try:
+            if self._insert_customer(customer) == 'skipped':
+                print(f"Клиент с ID {customer.cust_id} уже существует")
+                return
+
             print(f"Клиент {customer.name} успешно добавлен с ID: {customer.cust_id}")
 
         except Exception as e:
@@ -179,266 +1002,827 @@ class Bookstore:
     def search_books(self, **kwargs) -> List[Book]:
         """Поиск книг по различным критериям"""
         try:
-            results = list(self.books.values())
-
-            if 'title' in kwargs and kwargs['title']:
-                results = [b for b in results if kwargs['title'].lower() in b.title.lower()]
-            if 'author' in kwargs and kwargs['author']:
-                results = [b for b in results if kwargs['author'].lower() in b.author.lower()]
-            if 'genre' in kwargs and kwargs['genre']:
-                results = [b for b in results if kwargs['genre'].lower() in b.genre.lower()]
-            if 'max_price' in kwargs and kwargs['max_price']:
-                results = [b for b in results if b.price <= kwargs['max_price']]
+            min_price = kwargs.get('min_price') or None
+            max_price = kwargs.get('max_price') or None
+            min_year = kwargs.get('min_year') or None
+            max_year = kwargs.get('max_year') or None
+            has_price = min_price is not None or max_price is not None
+            has_year = min_year is not None or max_year is not None
+
+            # Индексы меняются под общей блокировкой (добавление и удаление
+            # книг, цены), поэтому и читаются под ней
+            with self._state_lock:
+                # Текстовые критерии отбираем по индексу и пересекаем множества ID
+                matched: Optional[Set[int]] = None
+                for field in ('title', 'author', 'genre'):
+                    if field in kwargs and kwargs[field]:
+                        found = self._text_index.search(field, kwargs[field])
+                        matched = found if matched is None else matched & found
+
+                if matched is None and (has_price or has_year):
+                    # Без текстовых критериев берем самый узкий диапазон из индексов
+                    ranges = []
+                    if has_price:
+                        ranges.append((self._price_index.count(min_price, max_price),
+                                       self._price_index, min_price, max_price))
+                    if has_year:
+                        ranges.append((self._year_index.count(min_year, max_year),
+                                       self._year_index, min_year, max_year))
+                    _, index, low, high = min(ranges, key=lambda item: item[0])
+                    matched = set(index.range(low, high))
+
+                if matched is None:
+                    results = list(self.books.values())
+                else:
+                    # Сохраняем порядок выдачи, как при переборе self.books
+                    results = [self.books[book_id]
+                               for book_id in sorted(matched, key=self._book_order.__getitem__)]
+
+            if has_price:
+                results = [b for b in results if self._in_range(b.price, min_price, max_price)]
+            if has_year:
+                results = [b for b in results if self._in_range(b.year, min_year, max_year)]
 
             return results
 
         except Exception as e:
             raise BookstoreError(f"Ошибка при поиске книг: {e}")
 
+    @staticmethod
+    def _in_range(value: float, low: Optional[float], high: Optional[float]) -> bool:
+        """Проверка попадания значения в диапазон [low, high]"""
+        return (low is None or value >= low) and (high is None or value <= high)
+
+    def find_books_by_price(self, min_price: float = None, max_price: float = None) -> List[Book]:
+        """Книги в диапазоне цен, отсортированные по возрастанию цены"""
+        try:
+            with self._state_lock:
+                return [self.books[book_id] for book_id in self._price_index.range(min_price, max_price)]
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при поиске книг по цене: {e}")
+
+    def find_books_by_year(self, min_year: int = None, max_year: int = None) -> List[Book]:
+        """Книги в диапазоне годов издания, отсортированные по году"""
+        try:
+            with self._state_lock:
+                return [self.books[book_id] for book_id in self._year_index.range(min_year, max_year)]
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при поиске книг по году: {e}")
+
+    def get_cheapest_books(self, n: int) -> List[Book]:
+        """N самых дешевых книг по возрастанию цены"""
+        try:
+            with self._state_lock:
+                return [self.books[book_id] for book_id in self._price_index.first(n)]
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при получении самых дешевых книг: {e}")
+
+    def get_most_expensive_books(self, n: int) -> List[Book]:
+        """N самых дорогих книг по убыванию цены"""
+        try:
+            with self._state_lock:
+                return [self.books[book_id] for book_id in self._price_index.last(n)]
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при получении самых дорогих книг: {e}")
+
 
     def get_sales_by_customer(self, customer_id: int) -> List[Sale]:
         """Получение всех продаж для конкретного клиента"""
         try:
-            return [sale for sale in self.sales.values() if sale.customer_id == customer_id]
+            return self._sales_from_index(self._sales_by_customer, 'customer_id', customer_id)
         except Exception as e:
             raise BookstoreError(f"Ошибка при получении продаж клиента: {e}")
 
     def get_sales_by_employee(self, employee_id: int) -> List[Sale]:
         """Получение всех продаж для конкретного сотрудника"""
         try:
-            return [sale for sale in self.sales.values() if sale.employee_id == employee_id]
+            return self._sales_from_index(self._sales_by_employee, 'employee_id', employee_id)
         except Exception as e:
             raise BookstoreError(f"Ошибка при получении продаж сотрудника: {e}")
 
     def get_book_sales(self, book_id: int) -> List[Sale]:
         """Получение всех продаж конкретной книги"""
         try:
-            return [sale for sale in self.sales.values() if sale.book_id == book_id]
+            return self._sales_from_index(self._sales_by_book, 'book_id', book_id)
         except Exception as e:
             raise BookstoreError(f"Ошибка при получении продаж книги: {e}")
 
-    def get_total_revenue(self) -> float:
-        """Получение общей выручки магазина"""
+    def get_sales_analytics(self) -> 'SalesAnalytics':
+        """Колоночная аналитика продаж, дополненная последними продажами
+
+        Требует numpy; колонки строятся при первом вызове и далее
+        только дополняются новыми продажами.
+        """
+        try:
+            if self._analytics is None:
+                from analytics import SalesAnalytics
+                self._analytics = SalesAnalytics(self)
+            # Продажи с выданными, но еще не опубликованными ID пропускать нельзя
+            with self._quiesce():
+                self._analytics.refresh()
+            return self._analytics
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при подготовке аналитики продаж: {e}")
+
+    def _apply_price(self, book: Book, price: float) -> None:
+        """Изменение цены книги с обновлением индекса и стоимости инвентаря"""
+        self._inventory_value += (price - book.price) * book.quantity
+        book.price = price
+        self.books[book.book_id] = book
+        self._price_index.update(book.book_id, price)
+
+    def update_book_price(self, book_id: int, price: float) -> None:
+        """Изменение цены книги"""
         try:
-            return sum(sale.total_price for sale in self.sales.values())
+            if price <= 0:
+                raise InvalidPriceError("Цена должна быть положительной")
+
+            with self._lock_books(book_id):
+                if book_id not in self.books:
+                    raise BookNotFoundError(f"Книга с ID {book_id} не найдена")
+
+                with self._state_lock:
+                    book = self.books[book_id]
+                    old_price = book.price
+                    self._apply_price(book, price)
+                    if self._journal is not None:
+                        try:
+                            self._log('set_price', book_id=book_id, price=price)
+                        except BaseException:
+                            self._apply_price(book, old_price)
+                            raise
+            print(f"Цена книги '{book.title}' изменена на {price} руб.")
+
+        except (BookNotFoundError, InvalidPriceError):
+            raise
         except Exception as e:
-            raise BookstoreError(f"Ошибка при расчете выручки: {e}")
+            raise BookstoreError(f"Ошибка при изменении цены книги: {e}")
+
+    def get_total_revenue(self) -> float:
+        """Получение общей выручки магазина"""
+        return self._total_revenue
 
     def get_inventory_value(self) -> float:
         """Получение общей стоимости инвентаря"""
+        return self._inventory_value
+
+    def _compute_aggregates(self) -> Tuple[float, float]:
+        """Расчет выручки и стоимости инвентаря средствами хранилища"""
+        return self._storage.totals()
+
+    def _recompute_aggregates(self) -> None:
+        """Пересчет накопительных агрегатов с нуля"""
+        self._total_revenue, self._inventory_value = self._compute_aggregates()
+
+    def verify_aggregates(self) -> bool:
+        """Проверка накопительных агрегатов против полного пересчета"""
         try:
-            return sum(book.price * book.quantity for book in self.books.values())
+            revenue, inventory = self._compute_aggregates()
+            return (math.isclose(self._total_revenue, revenue, rel_tol=1e-9, abs_tol=1e-6) and
+                    math.isclose(self._inventory_value, inventory, rel_tol=1e-9, abs_tol=1e-6))
         except Exception as e:
-            raise BookstoreError(f"Ошибка при расчете стоимости инвентаря: {e}")
+            raise BookstoreError(f"Ошибка при проверке агрегатов: {e}")
+
+    def verify_data(self) -> int:
+        """Проверка всех сущностей по правилам validation
+
+        Нужна после загрузки с validate=False. Правила проверяются по колонкам
+        полей сразу для всего раздела; для первой неверной записи возбуждается
+        та же ошибка, что и при ее создании. Возвращает число проверенных записей.
+        """
+        checked = 0
+        for section, (entity_cls, attr, id_field) in self._SECTIONS.items():
+            rules = entity_cls._RULES
+            entities = getattr(self, attr)
+            if section == 'sales':
+                # Поля продаж (в том числе архивных) читаем без создания объектов
+                fields = list(dict.fromkeys((id_field,) + tuple(rule.field for rule in rules)))
+                rows = list(self._sale_rows(*fields))
+                columns = {field: [row[position] for row in rows] for position, field in enumerate(fields)}
+            else:
+                columns = entity_rule_columns(rules, list(entities.values()))
+            index = first_invalid(rules, columns)
+            if index is not None:
+                entity_id = columns[id_field][index]
+                try:
+                    entities[entity_id]._validate_data()
+                except Exception as e:
+                    raise BookstoreError(f"Неверные данные ({section}, ID {entity_id}): {e}") from e
+            checked += len(entities)
+        return checked
 
     # Методы для работы с файлами
 
-    def save_to_json(self, filename: str) -> None:
-        """Сохранение данных в JSON файл"""
+    def _live_view(self) -> _StoreView:
+        """Представление текущих данных магазина без копирования"""
+        return _StoreView(
+            self.name,
+            {key: getattr(self, attr) for key, attr in self._COUNTERS.items()},
+            {key: getattr(self, attr) for key, attr in self._OPTIONAL_COUNTERS.items()},
+            self.books, self.employees, self.customers, self.sales
+        )
+
+    def _frozen_view(self) -> _StoreView:
+        """Согласованный снимок данных на текущий момент для фоновой записи
+
+        Изменяются на месте только книги (остаток и цена), поэтому под
+        блокировкой копируются лишь их объекты. Сотрудники, клиенты и
+        продажи только добавляются в конец словарей: для них запоминается
+        число записей, а добавленные позже отбрасываются уже при записи
+        (FrozenPrefix). Архивные продажи не копируются.
+        """
+        if not isinstance(self._storage, MemoryStorage):
+            raise BookstoreError("фоновое сохранение доступно только для хранения в памяти")
+        with self._quiesce():
+            view = self._live_view()
+            return view._replace(
+                books={book_id: copy.copy(book) for book_id, book in self.books.items()},
+                employees=FrozenPrefix(self.employees),
+                customers=FrozenPrefix(self.customers),
+                sales=self.sales.frozen() if isinstance(self.sales, TieredSales) else FrozenPrefix(self.sales)
+            )
+
+    # Форматы фонового сохранения: формат -> (метод записи, текст для сообщений)
+    _SNAPSHOT_WRITERS = {
+        'json': ('_write_json', 'JSON'),
+        'xml': ('_write_xml', 'XML'),
+        'binary': ('_write_binary', 'двоичный снимок'),
+    }
+
+    def save_in_background(self, filename: str, format: str = 'json', **options) -> Future:
+        """Сохранение снимка в фоновом потоке без остановки продаж
+
+        В вызывающем потоке снимается только согласованный снимок данных
+        (копируются книги, для остальных сущностей запоминается число записей); запись
+        идет в рабочем потоке во временный файл, который затем атомарно
+        заменяет filename. format - 'json', 'xml' или 'binary', options
+        передаются записи JSON (compact, compression). Возвращает Future,
+        который завершается после замены файла или с FileOperationError.
+        """
         try:
-            data = {
-                'name': self.name,
-                'next_book_id': self._next_book_id,
-                'next_emp_id': self._next_emp_id,
-                'next_cust_id': self._next_cust_id,
-                'next_sale_id': self._next_sale_id,
-                'books': [book.to_dict() for book in self.books.values()],
-                'employees': [emp.to_dict() for emp in self.employees.values()],
-                'customers': [cust.to_dict() for cust in self.customers.values()],
-                'sales': [sale.to_dict() for sale in self.sales.values()]
-            }
+            if format not in self._SNAPSHOT_WRITERS:
+                raise ValueError(f"неизвестный формат снимка: {format}")
+            view = self._frozen_view()
+            if self._snapshot_executor is None:
+                self._snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bookstore-snapshot')
+            future = self._snapshot_executor.submit(self._write_snapshot_file, format, view, filename, options)
+            self._pending_snapshots.add(future)
+            future.add_done_callback(self._pending_snapshots.discard)
+            print(f"Запущено фоновое сохранение в {filename}")
+            return future
+
+        except (ValueError, BookstoreError):
+            raise
+        except Exception as e:
+            raise FileOperationError(f"Ошибка при запуске фонового сохранения: {e}")
 
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+    def _replace_file(self, writer: str, view: _StoreView, filename: str, options: Dict[str, Any]) -> None:
+        """Запись снимка во временный файл с fsync и атомарная замена целевого"""
+        temp_filename = f"{filename}.tmp"
+        try:
+            getattr(self, writer)(view, temp_filename, **options)
+            with open(temp_filename, 'rb') as f:
+                os.fsync(f.fileno())
+            os.replace(temp_filename, filename)
+            sync_directory(filename)
+        except BaseException:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            raise
+
+    def _write_snapshot_file(self, format: str, view: _StoreView, filename: str, options: Dict[str, Any]) -> None:
+        """Фоновая запись снимка с атомарной заменой целевого файла"""
+        writer, title = self._SNAPSHOT_WRITERS[format]
+        try:
+            self._replace_file(writer, view, filename, options)
+            print(f"Фоновое сохранение в {filename} завершено")
+        except Exception as e:
+            raise FileOperationError(f"Ошибка при фоновом сохранении ({title}): {e}")
+
+    def wait_for_snapshots(self) -> None:
+        """Ожидание завершения всех запущенных фоновых сохранений"""
+        wait(list(self._pending_snapshots))
 
+    def save_to_json(self, filename: str, compact: bool = False, compression: str = None) -> None:
+        """Сохранение данных в JSON файл
+
+        Записи выводятся потоково, без промежуточного словаря со всеми данными.
+        compact=True убирает отступы; compression - None, 'gzip' или 'zstd'.
+        """
+        try:
+            self._write_json(self._live_view(), filename, compact, compression)
             print(f"Данные успешно сохранены в {filename}")
 
         except Exception as e:
             raise FileOperationError(f"Ошибка при сохранении в JSON: {e}")
 
-    def load_from_json(self, filename: str) -> None:
-        """Загрузка данных из JSON файла"""
+    def _write_json(self, view: _StoreView, filename: str, compact: bool = False, compression: str = None) -> None:
+        """Запись снимка JSON из представления данных"""
+        header = {'name': view.name, **view.counters}
+        header.update((key, value) for key, value in view.extras.items() if value)
+        sections = [
+            ('books', (book.to_dict() for book in view.books.values())),
+            ('employees', (emp.to_dict() for emp in view.employees.values())),
+            ('customers', (cust.to_dict() for cust in view.customers.values())),
+            ('sales', (sale.to_dict() for sale in view.sales.values()))
+        ]
+
+        with io.TextIOWrapper(open_compressed(filename, compression), encoding='utf-8') as f:
+            write_json_snapshot(f, header, sections, compact)
+
+    # Разделы снимка: имя раздела -> (класс сущности, атрибут магазина, поле ID)
+    _SECTIONS = {
+        'books': (Book, 'books', 'book_id'),
+        'employees': (Employee, 'employees', 'emp_id'),
+        'customers': (Customer, 'customers', 'cust_id'),
+        'sales': (Sale, 'sales', 'sale_id'),
+    }
+    _COUNTERS = {
+        'next_book_id': '_next_book_id',
+        'next_emp_id': '_next_emp_id',
+        'next_cust_id': '_next_cust_id',
+        'next_sale_id': '_next_sale_id',
+    }
+    # Необязательные поля снимка: LSN журнала, учтенный в снимке
+    _OPTIONAL_COUNTERS = {
+        'journal_lsn': '_journal_lsn',
+    }
+
+    def _clear_data(self) -> None:
+        """Очистка всех данных и счетчиков перед загрузкой"""
+        # Фоновые сохранения могут еще читать закрываемый архив продаж
+        self.wait_for_snapshots()
+        self.books.clear()
+        self.employees.clear()
+        self.customers.clear()
+        self.sales.clear()
+        for attr in self._COUNTERS.values():
+            setattr(self, attr, 1)
+        for attr in self._OPTIONAL_COUNTERS.values():
+            setattr(self, attr, 0)
+        # Индексы и агрегаты не должны ссылаться на удаленные сущности
+        self._rebuild_indexes()
+        self._total_revenue = self._inventory_value = 0.0
+        # Колонки аналитики относятся к прежним данным и строятся заново
+        self._analytics = None
+
+    def _finish_load(self) -> None:
+        """Согласование счетчиков, индексов и агрегатов после загрузки"""
+        self._sync_id_counters()
+        self._rebuild_indexes()
+        self._recompute_aggregates()
+
+    def load_from_json(self, filename: str, stream: bool = False,
+                       progress: Callable[[int, int, int], None] = None, workers: int = None,
+                       validate: bool = True) -> None:
+        """Загрузка данных из JSON файла
+
+        При stream=True разделы разбираются поэлементно и документ целиком
+        в памяти не хранится; progress(записей, прочитано байт, размер файла)
+        вызывается каждые 100 000 записей и по завершении.
+        workers > 1 создает и проверяет сущности в пуле из workers процессов
+        (без stream); результат и ошибки те же, что при загрузке в одном процессе.
+        validate=False пропускает проверку сущностей для доверенных снимков
+        (проверить данные позже можно через verify_data).
+        """
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Загрузка в хранилище SQLite выполняется одной транзакцией
+            with self._reload():
+                if stream:
+                    self._load_json_stream(filename, progress, validate=validate)
+                else:
+                    with open(filename, 'rb') as raw, open_decompressed(raw) as f:
+                        data = json.load(f)
+
+                    self.name = data['name']
+
+                    # Очищаем текущие данные
+                    self._clear_data()
+
+                    # Загружаем счетчики ID
+                    self._next_book_id = data.get('next_book_id', 1)
+                    self._next_emp_id = data.get('next_emp_id', 1)
+                    self._next_cust_id = data.get('next_cust_id', 1)
+                    self._next_sale_id = data.get('next_sale_id', 1)
+                    self._journal_lsn = data.get('journal_lsn', 0)
+
+                    if workers is not None and workers > 1:
+                        self._load_sections_parallel([
+                            ('books', data['books'], None),
+                            ('employees', data['employees'], None),
+                            ('customers', data['customers'], None),
+                            ('sales', data.get('sales', []), None)
+                        ], workers, validate)
+                    else:
+                        # Загружаем книги
+                        for book_data in data['books']:
+                            book = Book.from_dict(book_data, validate)
+                            self.books[book.book_id] = book
+
+                        # Загружаем сотрудников
+                        for emp_data in data['employees']:
+                            employee = Employee.from_dict(emp_data, validate)
+                            self.employees[employee.emp_id] = employee
+
+                        # Загружаем клиентов
+                        for cust_data in data['customers']:
+                            customer = Customer.from_dict(cust_data, validate)
+                            self.customers[customer.cust_id] = customer
+
+                        # Загружаем продажи
+                        for sale_data in data.get('sales', []):
+                            sale = Sale.from_dict(sale_data, validate)
+                            self.sales[sale.sale_id] = sale
 
-            self.name = data['name']
+            print(f"Данные успешно загружены из {filename}")
 
-            # Очищаем текущие данные
-            self.books.clear()
-            self.employees.clear()
-            self.customers.clear()
-            self.sales.clear()
+        except FileNotFoundError:
+            raise FileOperationError(f"Файл {filename} не найден")
+        except Exception as e:
+            raise FileOperationError(f"Ошибка при загрузке из JSON: {e}")
 
-            # Загружаем счетчики ID
-            self._next_book_id = data.get('next_book_id', 1)
-            self._next_emp_id = data.get('next_emp_id', 1)
-            self._next_cust_id = data.get('next_cust_id', 1)
-            self._next_sale_id = data.get('next_sale_id', 1)
+    def load_entities(self, books: Iterable[Book] = (), employees: Iterable[Employee] = (),
+                      customers: Iterable[Customer] = (), sales: Iterable[Sale] = ()) -> None:
+        """Замена всех данных готовыми сущностями, как при загрузке снимка
 
-            # Загружаем книги
-            for book_data in data['books']:
-                book = Book.from_dict(book_data)
-                self.books[book.book_id] = book
+        Продажи не списывают остатки (они уже учтены в количестве книг),
+        а счетчики ID, индексы и агрегаты строятся одним проходом после
+        загрузки. Подходит для импорта из других источников и тестовых данных.
+        """
+        try:
+            with self._reload():
+                self._clear_data()
+                for entities, target, id_field in ((books, self.books, 'book_id'),
+                                                   (employees, self.employees, 'emp_id'),
+                                                   (customers, self.customers, 'cust_id'),
+                                                   (sales, self.sales, 'sale_id')):
+                    for entity in entities:
+                        target[getattr(entity, id_field)] = entity
+            print(f"Загружено: {len(self.books)} книг, {len(self.employees)} сотрудников, "
+                  f"{len(self.customers)} клиентов, {len(self.sales)} продаж")
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при загрузке сущностей: {e}")
+
+    def _load_sections_parallel(self, sections: List[Tuple[str, List[Dict[str, Any]], Optional[Dict[str, Callable]]]],
+                                workers: int, validate: bool = True, chunks_per_worker: int = 4) -> None:
+        """Создание и проверка сущностей разделов в пуле процессов
+
+        Записи каждого раздела делятся на части; части всех разделов
+        обрабатываются параллельно, а результаты добавляются в магазин
+        строго в порядке записей. Каждая часть останавливается на первой
+        ошибке, поэтому первая по порядку неудачная часть содержит ту же
+        запись и то же исключение, что и последовательная загрузка.
+
+        Процессы возвращают проверенные значения колонками, а объекты
+        собираются здесь без повторной проверки: передача самих объектов
+        между процессами дороже их создания. Где доступен fork, записи
+        не передаются в процессы, а наследуются ими. В режиме thread_safe
+        процессы запускаются заново (spawn) и получают записи явно: fork
+        скопировал бы блокировки, захваченные другими потоками, и процессы
+        могли бы зависнуть.
+        """
+        global _LOAD_RECORDS
+        total = sum(len(records) for _, records, _ in sections)
+        chunk_size = max(1000, math.ceil(total / (workers * chunks_per_worker)))
+        inherit = not self.thread_safe and 'fork' in multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if inherit else 'spawn')
+        with _LOAD_RECORDS_LOCK if inherit else nullcontext():
+            if inherit:
+                _LOAD_RECORDS = [records for _, records, _ in sections]
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            try:
+                pending = []
+                for number, (section, records, types) in enumerate(sections):
+                    entity_cls = self._SECTIONS[section][0]
+                    for start in range(0, len(records), chunk_size):
+                        end = min(start + chunk_size, len(records))
+                        chunk = (number, start, end) if inherit else records[start:end]
+                        future = executor.submit(_build_entity_columns, entity_cls, chunk, types, validate)
+                        pending.append((section, future))
+
+                for section, future in pending:
+                    entity_cls, attr, id_field = self._SECTIONS[section]
+                    target = getattr(self, attr)
+                    entity_id = attrgetter(id_field)
+                    for entity in entities_from_columns(entity_cls, future.result()):
+                        target[entity_id(entity)] = entity
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+                if inherit:
+                    _LOAD_RECORDS = []
+
+    def _load_json_stream(self, filename: str, progress: Callable[[int, int, int], None] = None,
+                          progress_every: int = 100_000, validate: bool = True) -> None:
+        """Потоковая загрузка JSON-снимка с ограниченным расходом памяти"""
+        with open(filename, 'rb') as raw, open_decompressed(raw) as f:
+            total_bytes = os.fstat(raw.fileno()).st_size
+            reader = JsonSnapshotReader(f)
+            self._clear_data()
+            loaded = 0
+
+            for key, value in reader:
+                if key in self._SECTIONS:
+                    entity_cls, attr, id_field = self._SECTIONS[key]
+                    entity = entity_cls.from_dict(value, validate)
+                    getattr(self, attr)[getattr(entity, id_field)] = entity
+                    loaded += 1
+                    if progress is not None and loaded % progress_every == 0:
+                        progress(loaded, raw.tell(), total_bytes)
+                elif key in self._COUNTERS:
+                    setattr(self, self._COUNTERS[key], value)
+                elif key in self._OPTIONAL_COUNTERS:
+                    setattr(self, self._OPTIONAL_COUNTERS[key], value)
+                elif key == 'name':
+                    self.name = value
+
+            if progress is not None:
+                progress(loaded, raw.tell(), total_bytes)
+
+    # Поля записей XML в порядке to_dict()
+    _BOOK_FIELDS = ('book_id', 'title', 'author', 'genre', 'price', 'quantity', 'year')
+    _EMPLOYEE_FIELDS = ('emp_id', 'name', 'position', 'salary')
+    _CUSTOMER_FIELDS = ('cust_id', 'name', 'email', 'phone')
+    _SALE_FIELDS = ('sale_id', 'book_id', 'customer_id', 'employee_id',
+                    'quantity', 'total_price', 'sale_date')
 
-            # Загружаем сотрудников
-            for emp_data in data['employees']:
-                employee = Employee.from_dict(emp_data)
-                self.employees[employee.emp_id] = employee
+    def save_to_xml(self, filename: str) -> None:
+        """Сохранение данных в XML файл
 
-            # Загружаем клиентов
-            for cust_data in data['customers']:
-                customer = Customer.from_dict(cust_data)
-                self.customers[customer.cust_id] = customer
+        Элементы пишутся потоково, без построения дерева ElementTree;
+        результат побайтно совпадает с прежним выводом ElementTree.write.
+        """
+        try:
+            self._write_xml(self._live_view(), filename)
+            print(f"Данные успешно сохранены в {filename}")
 
-            # Загружаем продажи
-            for sale_data in data.get('sales', []):
-                sale = Sale.from_dict(sale_data)
-                self.sales[sale.sale_id] = sale
+        except Exception as e:
+            raise FileOperationError(f"Ошибка при сохранении в XML: {e}")
 
+    def _write_xml(self, view: _StoreView, filename: str) -> None:
+        """Запись снимка XML из представления данных"""
+        sale_row = attrgetter(*self._SALE_FIELDS[:-1])
+        sections = [
+            ('books', 'book', self._BOOK_FIELDS,
+             map(attrgetter(*self._BOOK_FIELDS), view.books.values())),
+            ('employees', 'employee', self._EMPLOYEE_FIELDS,
+             map(attrgetter(*self._EMPLOYEE_FIELDS), view.employees.values())),
+            ('customers', 'customer', self._CUSTOMER_FIELDS,
+             map(attrgetter(*self._CUSTOMER_FIELDS), view.customers.values())),
+            ('sales', 'sale', self._SALE_FIELDS,
+             (sale_row(sale) + (sale.sale_date.isoformat(),) for sale in view.sales.values()))
+        ]
+
+        extras = {key: value for key, value in view.extras.items() if value} or None
+
+        with open(filename, 'w', encoding='utf-8', errors='xmlcharrefreplace',
+                  buffering=1 << 20) as f:
+            write_xml_snapshot(f, view.name, view.counters, sections, extras)
+
+    # Записи XML: тег записи -> (раздел, преобразование типов полей)
+    _XML_RECORDS = {
+        'book': ('books', {'book_id': int, 'price': float, 'quantity': int, 'year': int}),
+        'employee': ('employees', {'emp_id': int, 'salary': float}),
+        'customer': ('customers', {'cust_id': int}),
+        'sale': ('sales', {'sale_id': int, 'book_id': int, 'customer_id': int,
+                           'employee_id': int, 'quantity': int, 'total_price': float}),
+    }
+
+    def _load_xml_record(self, elem: ET.Element, validate: bool = True) -> None:
+        """Создание сущности из XML-элемента записи и добавление в магазин"""
+        section, types = self._XML_RECORDS[elem.tag]
+        data = {child.tag: child.text for child in elem}
+        # Преобразуем типы данных
+        for field, convert in types.items():
+            data[field] = convert(data[field])
+
+        entity_cls, attr, id_field = self._SECTIONS[section]
+        entity = entity_cls.from_dict(data, validate)
+        getattr(self, attr)[getattr(entity, id_field)] = entity
+
+    def _load_xml_counters(self, counters_elem: ET.Element) -> None:
+        """Загрузка счетчиков ID из XML-элемента"""
+        for tag, attr in self._COUNTERS.items():
+            setattr(self, attr, int(counters_elem.find(tag).text))
+
+    def load_from_xml(self, filename: str, stream: bool = False, workers: int = None,
+                      validate: bool = True) -> None:
+        """Загрузка данных из XML файла
+
+        При stream=True файл разбирается через iterparse: сущности создаются
+        по мере закрытия элементов, а обработанные элементы удаляются из дерева.
+        workers > 1 создает сущности в пуле процессов, validate=False пропускает
+        проверку сущностей (см. load_from_json).
+        """
+        try:
+            # Загрузка в хранилище SQLite выполняется одной транзакцией
+            with self._reload():
+                if stream:
+                    self._load_xml_stream(filename, validate)
+                else:
+                    tree = ET.parse(filename)
+                    root = tree.getroot()
+
+                    self.name = root.find('name').text
+
+                    # Очищаем текущие данные
+                    self._clear_data()
+
+                    # Загружаем счетчики ID
+                    counters_elem = root.find('id_counters')
+                    if counters_elem is not None:
+                        self._load_xml_counters(counters_elem)
+                    for tag, attr in self._OPTIONAL_COUNTERS.items():
+                        elem = root.find(tag)
+                        if elem is not None:
+                            setattr(self, attr, int(elem.text))
+
+                    # Загружаем книги, сотрудников, клиентов и продажи
+                    if workers is not None and workers > 1:
+                        # Элементы дерева в процессы не передаются - только их поля
+                        sections = []
+                        for tag, (section, types) in self._XML_RECORDS.items():
+                            section_elem = root.find(section)
+                            if section_elem is not None:
+                                records = [{child.tag: child.text for child in elem}
+                                           for elem in section_elem.findall(tag)]
+                                sections.append((section, records, types))
+                        del tree, root
+                        self._load_sections_parallel(sections, workers, validate)
+                    else:
+                        for tag, (section, _) in self._XML_RECORDS.items():
+                            section_elem = root.find(section)
+                            if section_elem is not None:
+                                for elem in section_elem.findall(tag):
+                                    self._load_xml_record(elem, validate)
 
             print(f"Данные успешно загружены из {filename}")
 
         except FileNotFoundError:
             raise FileOperationError(f"Файл {filename} не найден")
         except Exception as e:
-            raise FileOperationError(f"Ошибка при загрузке из JSON: {e}")
-
-    def save_to_xml(self, filename: str) -> None:
-        """Сохранение данных в XML файл"""
-        try:
-            root = ET.Element('bookstore')
-
-            # Название магазина
-            name_elem = ET.SubElement(root, 'name')
-            name_elem.text = self.name
-
-            # Счетчики ID
-            counters_elem = ET.SubElement(root, 'id_counters')
-            ET.SubElement(counters_elem, 'next_book_id').text = str(self._next_book_id)
-            ET.SubElement(counters_elem, 'next_emp_id').text = str(self._next_emp_id)
-            ET.SubElement(counters_elem, 'next_cust_id').text = str(self._next_cust_id)
-            ET.SubElement(counters_elem, 'next_sale_id').text = str(self._next_sale_id)
-
-            # Книги
-            books_elem = ET.SubElement(root, 'books')
-            for book in self.books.values():
-                book_elem = ET.SubElement(books_elem, 'book')
-                for key, value in book.to_dict().items():
-                    child = ET.SubElement(book_elem, key)
-                    child.text = str(value)
-
-            # Сотрудники
-            employees_elem = ET.SubElement(root, 'employees')
-            for employee in self.employees.values():
-                emp_elem = ET.SubElement(employees_elem, 'employee')
-                for key, value in employee.to_dict().items():
-                    child = ET.SubElement(emp_elem, key)
-                    child.text = str(value)
-
-            # Клиенты
-            customers_elem = ET.SubElement(root, 'customers')
-            for customer in self.customers.values():
-                cust_elem = ET.SubElement(customers_elem, 'customer')
-                for key, value in customer.to_dict().items():
-                    child = ET.SubElement(cust_elem, key)
-                    child.text = str(value)
-
-            # Продажи
-            sales_elem = ET.SubElement(root, 'sales')
-            for sale in self.sales.values():
-                sale_elem = ET.SubElement(sales_elem, 'sale')
-                for key, value in sale.to_dict().items():
-                    child = ET.SubElement(sale_elem, key)
-                    child.text = str(value)
-
-            tree = ET.ElementTree(root)
-            tree.write(filename, encoding='utf-8', xml_declaration=True)
+            raise FileOperationError(f"Ошибка при загрузке из XML: {e}")
 
+    def _load_xml_stream(self, filename: str, validate: bool = True) -> None:
+        """Потоковая загрузка XML через iterparse с освобождением разобранных элементов"""
+        self._clear_data()
+        name_found = False
+        path: List[ET.Element] = []  # цепочка открытых элементов от корня
+
+        for event, elem in ET.iterparse(filename, events=('start', 'end')):
+            if event == 'start':
+                path.append(elem)
+                continue
+
+            path.pop()
+            depth = len(path)
+            if depth == 2:
+                # Запись внутри раздела: создаем сущность и освобождаем элемент
+                section = path[1]
+                record = self._XML_RECORDS.get(elem.tag)
+                if record is not None and record[0] == section.tag:
+                    self._load_xml_record(elem, validate)
+                    section.remove(elem)
+            elif depth == 1:
+                # Элемент верхнего уровня: имя, счетчики или закрытый раздел
+                if elem.tag == 'name' and not name_found:
+                    self.name = elem.text
+                    name_found = True
+                elif elem.tag == 'id_counters':
+                    self._load_xml_counters(elem)
+                elif elem.tag in self._OPTIONAL_COUNTERS:
+                    setattr(self, self._OPTIONAL_COUNTERS[elem.tag], int(elem.text))
+                path[0].remove(elem)
+
+        if not name_found:
+            raise ValueError("в файле нет элемента name")
+
+    # Колонки двоичного снимка: раздел -> (поле, вид) в порядке аргументов конструктора
+    _BINARY_COLUMNS = {
+        'books': (('book_id', 'int'), ('title', 'str'), ('author', 'str'), ('genre', 'str'),
+                  ('price', 'float'), ('quantity', 'int'), ('year', 'int')),
+        'employees': (('emp_id', 'int'), ('name', 'str'), ('position', 'str'), ('salary', 'float')),
+        'customers': (('cust_id', 'int'), ('name', 'str'), ('email', 'str'), ('phone', 'str')),
+        'sales': (('sale_id', 'int'), ('book_id', 'int'), ('customer_id', 'int'),
+                  ('employee_id', 'int'), ('quantity', 'int'), ('total_price', 'float'),
+                  ('sale_date', 'datetime')),
+    }
+
+    def save_to_binary(self, filename: str) -> None:
+        """Сохранение данных в двоичный колоночный снимок
+
+        Каждое поле хранится отдельным массивом фиксированной ширины,
+        строки - в общей таблице уникальных строк.
+        """
+        try:
+            self._write_binary(self._live_view(), filename)
             print(f"Данные успешно сохранены в {filename}")
 
         except Exception as e:
-            raise FileOperationError(f"Ошибка при сохранении в XML: {e}")
+            raise FileOperationError(f"Ошибка при сохранении в двоичный снимок: {e}")
+
+    def _write_binary(self, view: _StoreView, filename: str) -> None:
+        """Запись двоичного снимка из представления данных"""
+        tables = []
+        for section, columns in self._BINARY_COLUMNS.items():
+            entities = getattr(view, section)
+            if section == 'sales':
+                values = lambda field: self._sale_rows(field, sales=entities)
+            else:
+                values = lambda field: map(attrgetter(field), entities.values())
+            tables.append((section, len(entities), [
+                (field, kind, values(field)) for field, kind in columns
+            ]))
+
+        write_binary_snapshot(filename, view.name, view.counters, tables, view.extras)
 
-    def load_from_xml(self, filename: str) -> None:
-        """Загрузка данных из XML файла"""
-        try:
-            tree = ET.parse(filename)
-            root = tree.getroot()
-
-            self.name = root.find('name').text
-
-            # Очищаем текущие данные
-            self.books.clear()
-            self.employees.clear()
-            self.customers.clear()
-            self.sales.clear()
-
-            # Загружаем счетчики ID
-            counters_elem = root.find('id_counters')
-            if counters_elem is not None:
-                self._next_book_id = int(counters_elem.find('next_book_id').text)
-                self._next_emp_id = int(counters_elem.find('next_emp_id').text)
-                self._next_cust_id = int(counters_elem.find('next_cust_id').text)
-                self._next_sale_id = int(counters_elem.find('next_sale_id').text)
-
-
-            # Загружаем книги
-            books_elem = root.find('books')
-            if books_elem is not None:
-                for book_elem in books_elem.findall('book'):
-                    book_data = {child.tag: child.text for child in book_elem}
-                    # Преобразуем типы данных
-                    book_data['book_id'] = int(book_data['book_id'])
-                    book_data['price'] = float(book_data['price'])
-                    book_data['quantity'] = int(book_data['quantity'])
-                    book_data['year'] = int(book_data['year'])
-
-                    book = Book.from_dict(book_data)
-                    self.books[book.book_id] = book
-
-            # Загружаем сотрудников
-            employees_elem = root.find('employees')
-            if employees_elem is not None:
-                for emp_elem in employees_elem.findall('employee'):
-                    emp_data = {child.tag: child.text for child in emp_elem}
-                    emp_data['emp_id'] = int(emp_data['emp_id'])
-                    emp_data['salary'] = float(emp_data['salary'])
-
-                    employee = Employee.from_dict(emp_data)
-                    self.employees[employee.emp_id] = employee
-
-            # Загружаем клиентов
-            customers_elem = root.find('customers')
-            if customers_elem is not None:
-                for cust_elem in customers_elem.findall('customer'):
-                    cust_data = {child.tag: child.text for child in cust_elem}
-                    cust_data['cust_id'] = int(cust_data['cust_id'])
-
-                    customer = Customer.from_dict(cust_data)
-                    self.customers[customer.cust_id] = customer
-
-            # Загружаем продажи
-            sales_elem = root.find('sales')
-            if sales_elem is not None:
-                for sale_elem in sales_elem.findall('sale'):
-                    sale_data = {child.tag: child.text for child in sale_elem}
-                    sale_data['sale_id'] = int(sale_data['sale_id'])
-                    sale_data['book_id'] = int(sale_data['book_id'])
-                    sale_data['customer_id'] = int(sale_data['customer_id'])
-                    sale_data['employee_id'] = int(sale_data['employee_id'])
-                    sale_data['quantity'] = int(sale_data['quantity'])
-                    sale_data['total_price'] = float(sale_data['total_price'])
-
-                    sale = Sale.from_dict(sale_data)
-                    self.sales[sale.sale_id] = sale
+    def load_from_binary(self, filename: str, lazy_sales: bool = False, validate: bool = True) -> None:
+        """Загрузка данных из двоичного снимка
+
+        Файл отображается в память, и сущности создаются прямо из колонок
+        без разбора текста и преобразования типов полей. При lazy_sales=True
+        продажи остаются в файле и материализуются только при обращении.
+        validate=False пропускает проверку сущностей (см. verify_data).
+        """
+        try:
+            if lazy_sales and not isinstance(self._storage, MemoryStorage):
+                raise BookstoreError("ленивая загрузка продаж доступна только для хранения в памяти")
+
+            snapshot = BinarySnapshot(filename)
+            try:
+                with self._reload():
+                    metadata = snapshot.metadata
+                    self.name = metadata['name']
+                    self._clear_data()
+                    for key, attr in self._COUNTERS.items():
+                        setattr(self, attr, metadata['counters'].get(key, 1))
+                    for key, attr in self._OPTIONAL_COUNTERS.items():
+                        setattr(self, attr, metadata['extras'].get(key, 0))
+
+                    for section, columns in self._BINARY_COLUMNS.items():
+                        if not snapshot.has_table(section) or (lazy_sales and section == 'sales'):
+                            continue
+                        entity_cls, attr, id_field = self._SECTIONS[section]
+                        values = []
+                        for field, kind in columns:
+                            column = snapshot.column(section, field)
+                            values.append(map(micros_to_datetime, column) if kind == 'datetime' else column)
+                        entities = getattr(self, attr)
+                        for row in zip(*values):
+                            entity = entity_cls(*row, validate=validate)
+                            entities[getattr(entity, id_field)] = entity
+
+                    if lazy_sales and snapshot.has_table('sales'):
+                        # Снимок остается открытым: им теперь владеет архив продаж
+                        self._set_sales(TieredSales(snapshot))
+                        snapshot = None
+            finally:
+                if snapshot is not None:
+                    snapshot.close()
 
             print(f"Данные успешно загружены из {filename}")
 
         except FileNotFoundError:
             raise FileOperationError(f"Файл {filename} не найден")
         except Exception as e:
-            raise FileOperationError(f"Ошибка при загрузке из XML: {e}")
+            raise FileOperationError(f"Ошибка при загрузке из двоичного снимка: {e}")
+
+    def _set_sales(self, sales: MutableMapping[int, Sale]) -> None:
+        """Замена контейнера продаж в магазине и хранилище"""
+        self.sales = self._storage.sales = sales
+
+    def archive_sales(self, filename: str) -> int:
+        """Перенос всех продаж в архив, отображенный в память
+
+        Продажи записываются колонками в двоичный файл, после чего
+        объекты Sale освобождаются и создаются заново только при обращении.
+        Новые продажи хранятся в памяти до следующего вызова; на время
+        записи архива изменения в магазине останавливаются.
+        Возвращает количество продаж в архиве.
+        """
+        try:
+            if not isinstance(self._storage, MemoryStorage):
+                raise BookstoreError("архив продаж доступен только для хранения в памяти")
+
+            # Продажи, опубликованные во время записи, не должны пропасть при замене
+            with self._quiesce():
+                columns = self._BINARY_COLUMNS['sales']
+                tables = [('sales', len(self.sales),
+                           [(field, kind, self._sale_rows(field)) for field, kind in columns])]
+                write_binary_snapshot(filename, self.name, {}, tables)
+
+                archive = TieredSales(BinarySnapshot(filename))
+                if isinstance(self.sales, TieredSales):
+                    self.wait_for_snapshots()
+                    self.sales.close()
+                self._set_sales(archive)
+
+            print(f"В архив {filename} перенесено продаж: {archive.archived}")
+            return archive.archived
+
+        except BookstoreError:
+            raise
+        except Exception as e:
+            raise FileOperationError(f"Ошибка при архивировании продаж: {e}")
 
     def display_info(self) -> None:
         """Отображение информации о магазине"""
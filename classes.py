@@ -1,13 +1,35 @@
 # Модуль с основными классами книжного магазина
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
 from exceptions import *
+from validation import (BOOK_RULES, EMPLOYEE_RULES, CUSTOMER_RULES, SALE_RULES,
+                        rule_validator)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def datetime_to_micros(value: datetime) -> int:
+    """Наивная дата в микросекундах от начала эпохи"""
+    if value.tzinfo is not None:
+        raise ValueError(f"дата с часовым поясом не поддерживается: {value.isoformat()}")
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def micros_to_datetime(micros: int) -> datetime:
+    """Наивная дата из микросекунд от начала эпохи"""
+    return _EPOCH + timedelta(microseconds=micros)
+
 
 class Book:
     """Класс для представления книги"""
 
+    # Атрибуты в слотах вместо словаря экземпляра экономят память
+    __slots__ = ('book_id', 'title', 'author', 'genre', 'price', 'quantity', 'year')
+
     def __init__(self, book_id: int, title: str, author: str, genre: str,
-                 price: float, quantity: int, year: int):
+                 price: float, quantity: int, year: int, validate: bool = True):
         self.book_id = book_id
         self.title = title
         self.author = author
@@ -16,24 +38,12 @@ class Book:
         self.quantity = quantity
         self.year = year
 
-        self._validate_data()
-
-    def _validate_data(self):
-        """Валидация данных книги"""
-        if self.book_id < 0:
-            raise ValueError("ID книги не может быть отрицательным")
-        if not self.title:
-            raise ValueError("Название книги не может быть пустым")
-        if not self.author:
-            raise ValueError("Автор не может быть пустым")
-        if not self.genre:
-            raise ValueError("Жанр не может быть пустым")
-        if self.price <= 0:
-            raise InvalidPriceError("Цена должна быть положительной")
-        if self.quantity < 0:
-            raise ValueError("Количество не может быть отрицательным")
-        if self.year < 1000 or self.year > datetime.now().year:
-            raise ValueError("Неверный год издания")
+        if validate:
+            self._validate_data()
+
+    # Валидация данных книги (правила - в validation.BOOK_RULES)
+    _RULES = BOOK_RULES
+    _validate_data = rule_validator(BOOK_RULES)
 
     def to_dict(self):
         """Преобразование книги в словарь"""
@@ -48,8 +58,8 @@ class Book:
         }
 
     @classmethod
-    def from_dict(cls, data: Dict):
-        """Создание книги из словаря"""
+    def from_dict(cls, data: Dict, validate: bool = True):
+        """Создание книги из словаря (validate=False - для проверенных данных)"""
         return cls(
             book_id=data['book_id'],
             title=data['title'],
@@ -57,7 +67,8 @@ class Book:
             genre=data['genre'],
             price=data['price'],
             quantity=data['quantity'],
-            year=data['year']
+            year=data['year'],
+            validate=validate
         )
 
     def __str__(self):
@@ -66,24 +77,20 @@ class Book:
 class Employee:
     """Класс для представления сотрудника"""
 
-    def __init__(self, emp_id: int, name: str, position: str, salary: float):
+    __slots__ = ('emp_id', 'name', 'position', 'salary')
+
+    def __init__(self, emp_id: int, name: str, position: str, salary: float, validate: bool = True):
         self.emp_id = emp_id
         self.name = name
         self.position = position
         self.salary = salary
 
-        self._validate_data()
+        if validate:
+            self._validate_data()
 
-    def _validate_data(self):
-        """Валидация данных сотрудника"""
-        if self.emp_id < 0:
-            raise ValueError("ID сотрудника не может быть отрицательным")
-        if not self.name:
-            raise ValueError("Имя сотрудника не может быть пустым")
-        if not self.position:
-            raise ValueError("Должность не может быть пустой")
-        if self.salary < 0:
-            raise ValueError("Зарплата не может быть отрицательной")
+    # Валидация данных сотрудника (правила - в validation.EMPLOYEE_RULES)
+    _RULES = EMPLOYEE_RULES
+    _validate_data = rule_validator(EMPLOYEE_RULES)
 
     def to_dict(self) -> Dict:
         """Преобразование сотрудника в словарь"""
@@ -95,13 +102,14 @@ class Employee:
         }
 
     @classmethod
-    def from_dict(cls, data: Dict) -> 'Employee':
-        """Создание сотрудника из словаря"""
+    def from_dict(cls, data: Dict, validate: bool = True) -> 'Employee':
+        """Создание сотрудника из словаря (validate=False - для проверенных данных)"""
         return cls(
             emp_id=data['emp_id'],
             name=data['name'],
             position=data['position'],
-            salary=data['salary']
+            salary=data['salary'],
+            validate=validate
         )
 
     def __str__(self):
@@ -110,25 +118,20 @@ class Employee:
 class Customer:
     """Класс для представления клиента"""
 
-    def __init__(self, cust_id: int, name: str, email: str, phone: str):
+    __slots__ = ('cust_id', 'name', 'email', 'phone')
+
+    def __init__(self, cust_id: int, name: str, email: str, phone: str, validate: bool = True):
         self.cust_id = cust_id
         self.name = name
         self.email = email
         self.phone = phone
 
-        self._validate_data()
-
+        if validate:
+            self._validate_data()
 
-    def _validate_data(self):
-        """Валидация данных клиента"""
-        if self.cust_id < 0:
-            raise ValueError("ID клиента не может быть отрицательным")
-        if not self.name:
-            raise ValueError("Имя клиента не может быть пустым")
-        if '@' not in self.email:
-            raise ValueError("Неверный формат email")
-        if not self.phone:
-            raise ValueError("Телефон не может быть пустым")
+    # Валидация данных клиента (правила - в validation.CUSTOMER_RULES)
+    _RULES = CUSTOMER_RULES
+    _validate_data = rule_validator(CUSTOMER_RULES)
 
     def to_dict(self) -> Dict:
         """Преобразование клиента в словарь"""
@@ -140,13 +143,14 @@ class Customer:
         }
 
     @classmethod
-    def from_dict(cls, data: Dict) -> 'Customer':
-        """Создание клиента из словаря"""
+    def from_dict(cls, data: Dict, validate: bool = True) -> 'Customer':
+        """Создание клиента из словаря (validate=False - для проверенных данных)"""
         return cls(
             cust_id=data['cust_id'],
             name=data['name'],
             email=data['email'],
-            phone=data['phone']
+            phone=data['phone'],
+            validate=validate
         )
 
     def __str__(self):
@@ -155,33 +159,29 @@ class Customer:
 class Sale:
     """Класс для представления продажи"""
 
+    __slots__ = ('sale_id', 'book_id', 'customer_id', 'employee_id',
+                 'quantity', 'total_price', 'sale_date')
+
     def __init__(self, sale_id: int, book_id: int, customer_id: int,
                  employee_id: int, quantity: int, total_price: float,
-                 sale_date: datetime = None):
+                 sale_date: datetime = None, validate: bool = True):
         self.sale_id = sale_id
         self.book_id = book_id
         self.customer_id = customer_id
         self.employee_id = employee_id
         self.quantity = quantity
         self.total_price = total_price
+        # Дата хранится объектом datetime: перевод в микросекунды при каждом
+        # создании продажи дороже экономии памяти; в колонках архива и
+        # двоичного снимка даты переводятся пачкой при записи
         self.sale_date = sale_date or datetime.now()
 
-        self._validate_data()
-
-    def _validate_data(self):
-        """Валидация данных продажи"""
-        if self.sale_id <= 0:
-            raise ValueError("ID продажи должен быть положительным")
-        if self.book_id <= 0:
-            raise ValueError("ID книги должен быть положительным")
-        if self.customer_id <= 0:
-            raise ValueError("ID клиента должен быть положительным")
-        if self.employee_id <= 0:
-            raise ValueError("ID сотрудника должен быть положительным")
-        if self.quantity <= 0:
-            raise ValueError("Количество должно быть положительным")
-        if self.total_price <= 0:
-            raise ValueError("Общая цена должна быть положительной")
+        if validate:
+            self._validate_data()
+
+    # Валидация данных продажи (правила - в validation.SALE_RULES)
+    _RULES = SALE_RULES
+    _validate_data = rule_validator(SALE_RULES)
 
     def to_dict(self) -> Dict:
         """Преобразование продажи в словарь"""
@@ -196,8 +196,8 @@ class Sale:
         }
 
     @classmethod
-    def from_dict(cls, data: Dict) -> 'Sale':
-        """Создание продажи из словаря"""
+    def from_dict(cls, data: Dict, validate: bool = True) -> 'Sale':
+        """Создание продажи из словаря (validate=False - для проверенных данных)"""
         return cls(
             sale_id=data['sale_id'],
             book_id=data['book_id'],
@@ -205,7 +205,8 @@ class Sale:
             employee_id=data['employee_id'],
             quantity=data['quantity'],
             total_price=data['total_price'],
-            sale_date=datetime.fromisoformat(data['sale_date'])
+            sale_date=datetime.fromisoformat(data['sale_date']),
+            validate=validate
         )
 
     def __str__(self):
@@ -213,3 +214,25 @@ class Sale:
                 f"Клиент ID: {self.customer_id} | Сотрудник ID: {self.employee_id} | "
                 f"{self.quantity} шт. | {self.total_price} руб. | "
                 f"{self.sale_date.strftime('%d.%m.%Y %H:%M')}")
+
+
+def entity_columns(cls: type, entities: List[Any]) -> List[List[Any]]:
+    """Значения слотов сущностей по колонкам (в порядке __slots__)
+
+    Колонки простых значений передаются между процессами намного быстрее,
+    чем сами объекты.
+    """
+    return [[getattr(entity, slot) for entity in entities] for slot in cls.__slots__]
+
+
+def entities_from_columns(cls: type, columns: List[List[Any]]) -> List[Any]:
+    """Восстановление сущностей из колонок entity_columns без повторной проверки"""
+    new = object.__new__
+    setters = [cls.__dict__[slot].__set__ for slot in cls.__slots__]
+    entities = []
+    for row in zip(*columns):
+        entity = new(cls)
+        for setter, value in zip(setters, row):
+            setter(entity, value)
+        entities.append(entity)
+    return entities
@@ -0,0 +1,248 @@
+# Модуль с индексами для быстрого поиска в книжном магазине
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class TextIndex:
+    """Инвертированный индекс n-грамм для поиска подстрок без учета регистра"""
+
+    def __init__(self, fields: Iterable[str], n: int = 3):
+        self.n = n
+        # поле -> ключ -> значение в нижнем регистре (вычисляется один раз)
+        self._values: Dict[str, Dict[int, str]] = {field: {} for field in fields}
+        # поле -> n-грамма -> множество ключей
+        self._grams: Dict[str, Dict[str, Set[int]]] = {field: {} for field in self._values}
+
+    def _ngrams(self, text: str) -> Set[str]:
+        """Множество n-грамм строки"""
+        n = self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def add(self, key: int, values: Dict[str, str]) -> None:
+        """Добавление записи в индекс"""
+        for field, value in values.items():
+            folded = value.lower()
+            self._values[field][key] = folded
+            grams = self._grams[field]
+            for gram in self._ngrams(folded):
+                keys = grams.get(gram)
+                if keys is None:
+                    grams[gram] = {key}
+                else:
+                    keys.add(key)
+
+    def remove(self, key: int) -> None:
+        """Удаление записи из индекса"""
+        for field, values in self._values.items():
+            folded = values.pop(key, None)
+            if folded is None:
+                continue
+            grams = self._grams[field]
+            for gram in self._ngrams(folded):
+                keys = grams[gram]
+                keys.discard(key)
+                if not keys:
+                    del grams[gram]
+
+    def clear(self) -> None:
+        """Очистка индекса"""
+        for field in self._values:
+            self._values[field].clear()
+            self._grams[field].clear()
+
+    def search(self, field: str, query: str) -> Set[int]:
+        """Ключи записей, у которых поле содержит подстроку query"""
+        folded = query.lower()
+        values = self._values[field]
+
+        # Короткие запросы не покрываются n-граммами - проверяем готовые значения
+        if len(folded) < self.n:
+            return {key for key, value in values.items() if folded in value}
+
+        grams = self._grams[field]
+        postings = []
+        for gram in self._ngrams(folded):
+            keys = grams.get(gram)
+            if not keys:
+                return set()
+            postings.append(keys)
+
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        # Совпадение всех n-грамм не гарантирует совпадение подстроки
+        return {key for key in candidates if folded in values[key]}
+
+
+class SortedIndex:
+    """Упорядоченный по значению индекс для диапазонных запросов"""
+
+    # Максимальный размер блока; вставка сдвигает элементы только внутри блока
+    LOAD = 1000
+
+    def __init__(self):
+        # Записи (значение, порядковый номер, ключ) хранятся в отсортированных
+        # блоках; порядковый номер делает записи уникальными и сохраняет
+        # порядок добавления среди равных значений
+        self._blocks: List[List[Tuple[float, int, int]]] = []
+        self._maxes: List[Tuple[float, int, int]] = []  # последняя запись каждого блока
+        self._by_key: Dict[int, Tuple[float, int, int]] = {}
+        self._seq = 0
+        # Дерево Фенвика по длинам блоков: число записей до любого блока за O(log n)
+        self._sizes: List[int] = [0]
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def _entry(self, key: int, value: float) -> Tuple[float, int, int]:
+        """Создание записи индекса"""
+        entry = (value, self._seq, key)
+        self._seq += 1
+        self._by_key[key] = entry
+        return entry
+
+    def add(self, key: int, value: float) -> None:
+        """Добавление записи в индекс"""
+        entry = self._entry(key, value)
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(entry)
+            self._rebuild_sizes()
+            return
+
+        pos = bisect_left(self._maxes, entry)
+        if pos == len(self._maxes):
+            pos -= 1
+        block = self._blocks[pos]
+        insort(block, entry)
+        self._maxes[pos] = block[-1]
+
+        if len(block) > 2 * self.LOAD:
+            # Делим переполненный блок пополам
+            half = block[self.LOAD:]
+            del block[self.LOAD:]
+            self._maxes[pos] = block[-1]
+            self._blocks.insert(pos + 1, half)
+            self._maxes.insert(pos + 1, half[-1])
+            self._rebuild_sizes()
+        else:
+            self._resize(pos, 1)
+
+    def load(self, items: Iterable[Tuple[int, float]]) -> None:
+        """Массовое добавление записей с одной сортировкой в конце"""
+        entries = [entry for block in self._blocks for entry in block]
+        entries.extend(self._entry(key, value) for key, value in items)
+        entries.sort()
+        load = self.LOAD
+        self._blocks = [entries[i:i + load] for i in range(0, len(entries), load)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._rebuild_sizes()
+
+    def remove(self, key: int) -> None:
+        """Удаление записи из индекса"""
+        entry = self._by_key.pop(key)
+        pos = bisect_left(self._maxes, entry)
+        block = self._blocks[pos]
+        del block[bisect_left(block, entry)]
+        if block:
+            self._maxes[pos] = block[-1]
+            self._resize(pos, -1)
+        else:
+            del self._blocks[pos]
+            del self._maxes[pos]
+            self._rebuild_sizes()
+
+    def update(self, key: int, value: float) -> None:
+        """Изменение значения записи"""
+        self.remove(key)
+        self.add(key, value)
+
+    def clear(self) -> None:
+        """Очистка индекса"""
+        self._blocks.clear()
+        self._maxes.clear()
+        self._by_key.clear()
+        self._sizes = [0]
+
+    def _rebuild_sizes(self) -> None:
+        """Построение дерева длин блоков после изменения их состава"""
+        sizes = [0] * (len(self._blocks) + 1)
+        for i, block in enumerate(self._blocks, 1):
+            sizes[i] += len(block)
+            parent = i + (i & -i)
+            if parent < len(sizes):
+                sizes[parent] += sizes[i]
+        self._sizes = sizes
+
+    def _resize(self, pos: int, delta: int) -> None:
+        """Изменение длины блока pos в дереве"""
+        sizes = self._sizes
+        i = pos + 1
+        while i < len(sizes):
+            sizes[i] += delta
+            i += i & -i
+
+    def _before(self, pos: int) -> int:
+        """Число записей в блоках до блока pos"""
+        sizes, total = self._sizes, 0
+        while pos:
+            total += sizes[pos]
+            pos &= pos - 1
+        return total
+
+    def _locate(self, bound: tuple, right: bool) -> Tuple[int, int]:
+        """Позиция (блок, смещение) первой записи больше bound (или не меньше)"""
+        pos = bisect_left(self._maxes, bound)
+        if pos == len(self._maxes):
+            return pos, 0
+        block = self._blocks[pos]
+        offset = bisect_right(block, bound) if right else bisect_left(block, bound)
+        return pos, offset
+
+    def _bounds(self, low: Optional[float], high: Optional[float]) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """Позиции начала и конца диапазона [low, high]"""
+        start = (0, 0) if low is None else self._locate((low,), right=False)
+        end = (len(self._blocks), 0) if high is None else self._locate((high, float('inf')), right=True)
+        return start, end
+
+    def _slices(self, low: Optional[float], high: Optional[float]) -> Iterable[List[Tuple[float, int, int]]]:
+        """Части блоков, попадающие в диапазон [low, high]"""
+        start, end = self._bounds(low, high)
+        if start >= end:
+            return
+        if start[0] == end[0]:
+            yield self._blocks[start[0]][start[1]:end[1]]
+            return
+        yield self._blocks[start[0]][start[1]:]
+        yield from self._blocks[start[0] + 1:end[0]]
+        if end[0] < len(self._blocks):
+            yield self._blocks[end[0]][:end[1]]
+
+    def count(self, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """Количество записей в диапазоне [low, high] без копирования частей блоков"""
+        start, end = self._bounds(low, high)
+        if start >= end:
+            return 0
+        return self._before(end[0]) + end[1] - self._before(start[0]) - start[1]
+
+    def range(self, low: Optional[float] = None, high: Optional[float] = None) -> List[int]:
+        """Ключи записей в диапазоне [low, high] по возрастанию значения"""
+        return [entry[2] for part in self._slices(low, high) for entry in part]
+
+    def first(self, n: int) -> List[int]:
+        """Ключи n записей с наименьшими значениями"""
+        result: List[int] = []
+        for block in self._blocks:
+            if len(result) >= n:
+                break
+            result.extend(entry[2] for entry in block[:n - len(result)])
+        return result
+
+    def last(self, n: int) -> List[int]:
+        """Ключи n записей с наибольшими значениями, по убыванию"""
+        result: List[int] = []
+        for block in reversed(self._blocks):
+            if len(result) >= n:
+                break
+            result.extend(entry[2] for entry in reversed(block[-(n - len(result)):]))
+        return result
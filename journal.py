@@ -0,0 +1,116 @@
+# Модуль с журналом предзаписи (write-ahead log) изменений книжного магазина
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+
+class Journal:
+    """Журнал изменений магазина в формате JSON Lines с групповой синхронизацией
+
+    Записи дописываются в конец файла; fsync выполняется не на каждую запись,
+    а пачкой: после sync_every записей или не позже sync_interval секунд
+    после первой несинхронизированной записи. При сбое теряется не больше
+    одной несинхронизированной пачки.
+    """
+
+    def __init__(self, filename: str, sync_every: int = 64, sync_interval: float = 0.05):
+        self.filename = filename
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = open(filename, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._timer: Optional[threading.Timer] = None
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Добавление записи в журнал"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._pending += 1
+            if self._pending >= self.sync_every:
+                self._sync_locked()
+            elif self._timer is None and self.sync_interval > 0:
+                # Первая запись пачки запускает отложенную синхронизацию
+                self._timer = threading.Timer(self.sync_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _sync_locked(self) -> None:
+        """Сброс буфера и fsync (вызывается под блокировкой)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending and not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def sync(self) -> None:
+        """Принудительная запись всех накопленных записей на диск"""
+        with self._lock:
+            self._sync_locked()
+
+    def truncate(self, upto_lsn: int = None) -> None:
+        """Очистка журнала после сохранения полного снимка
+
+        Если задан upto_lsn, удаляются только записи с LSN не больше него
+        (учтенные в снимке), а более поздние сохраняются. Журнал
+        переписывается во временный файл, который атомарно заменяет прежний.
+        """
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
+            records = [] if upto_lsn is None else [
+                record for record in read_journal(self.filename) if record['lsn'] > upto_lsn
+            ]
+            temp_filename = f"{self.filename}.tmp"
+            with open(temp_filename, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_filename, self.filename)
+            sync_directory(self.filename)
+            self._file = open(self.filename, 'a', encoding='utf-8')
+
+    def close(self) -> None:
+        """Синхронизация и закрытие журнала"""
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
+
+    def __enter__(self) -> 'Journal':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def sync_directory(filename: str) -> None:
+    """Синхронизация каталога файла, чтобы переименование пережило сбой"""
+    if os.name != 'posix':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_journal(filename: str) -> Iterator[Dict[str, Any]]:
+    """Чтение записей журнала; оборванная при сбое последняя запись пропускается"""
+    if not os.path.exists(filename):
+        return
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                # Запись не была дописана до конца - дальше данных нет
+                return
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                return
+            yield record
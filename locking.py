@@ -0,0 +1,51 @@
+# Модуль с блокировками для параллельной работы с книжным магазином
+
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+
+class StripedLock:
+    """Набор блокировок, разделяемых между ключами по остатку от деления
+
+    Ключи с разными полосами блокируются независимо, а число блокировок
+    не растет с числом ключей.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _stripe(self, key: int) -> int:
+        """Номер полосы для ключа"""
+        return hash(key) % len(self._locks)
+
+    @contextmanager
+    def hold(self, keys: Iterable[int]) -> Iterator[None]:
+        """Захват блокировок всех ключей
+
+        Полосы захватываются по возрастанию номера, поэтому потоки,
+        блокирующие пересекающиеся наборы ключей, не попадут во взаимную
+        блокировку.
+        """
+        stripes = sorted({self._stripe(key) for key in keys})
+        acquired = []
+        try:
+            for stripe in stripes:
+                lock = self._locks[stripe]
+                lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    @contextmanager
+    def hold_all(self) -> Iterator[None]:
+        """Захват всех полос (в том же порядке, что и в hold)"""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
@@ -3,22 +3,32 @@
 from bookstore import Bookstore
 from classes import Book, Employee, Customer, Sale
 from exceptions import *
+from metrics import Metrics
 
 
 class BookstoreManager:
     """Менеджер для управления книжным магазином с обработкой исключений"""
 
-    def __init__(self, bookstore: Bookstore):
+    def __init__(self, bookstore: Bookstore, metrics: Metrics = None):
         self.bookstore = bookstore
+        self.metrics = metrics  # по умолчанию используется реестр магазина
+
+    def _record_error(self, operation, error: Exception) -> None:
+        """Учет обработанной ошибки, если метрики включены"""
+        metrics = self.metrics if self.metrics is not None else getattr(self.bookstore, 'metrics', None)
+        if metrics is not None:
+            metrics.record_handled_error(getattr(operation, '__name__', repr(operation)), error)
 
     def safe_execute(self, operation, *args, **kwargs):
         """Безопасное выполнение операций с обработкой исключений"""
         try:
             return operation(*args, **kwargs)
         except BookstoreError as e:
+            self._record_error(operation, e)
             print(f"Ошибка в работе магазина: {e}")
             return None
         except Exception as e:
+            self._record_error(operation, e)
             print(f"Неожиданная ошибка: {e}")
             return None
 
@@ -64,6 +74,8 @@ class BookstoreManager:
             print("11. Сохранить данные")
             print("12. Загрузить данные")
             print("13. Информация о магазине")
+            print("14. Изменить цену книги")
+            print("15. Продать несколько книг")
             print("0. Выход")
 
             choice = input("Выберите действие: ").strip()
@@ -94,6 +106,10 @@ class BookstoreManager:
                 self._load_data_interactive()
             elif choice == '13':
                 self.safe_execute(self.bookstore.display_info)
+            elif choice == '14':
+                self._update_price_interactive()
+            elif choice == '15':
+                self._checkout_interactive()
             elif choice == '0':
                 print("До свидания!")
                 break
@@ -138,12 +154,10 @@ class BookstoreManager:
             return
 
         print("\nИстория продаж:")
-        total_revenue = 0
         for sale in self.bookstore.sales.values():
             print(f"  {sale}")
-            total_revenue += sale.total_price
 
-        print(f"\nОбщая выручка: {total_revenue:.2f} руб.")
+        print(f"\nОбщая выручка: {self.bookstore.get_total_revenue():.2f} руб.")
 
     def _add_book_interactive(self):
         """Интерактивное добавление книги"""
@@ -193,6 +207,24 @@ class BookstoreManager:
         except Exception as e:
             print(f"Ошибка: {e}")
 
+    def _update_price_interactive(self):
+        """Интерактивное изменение цены книги"""
+        try:
+            if not self.bookstore.books:
+                print("В магазине нет книг")
+                return
+
+            print("\nИзменение цены книги:")
+            self._show_books()
+
+            book_id = self._get_int_input("\nID книги: ")
+            price = self._get_float_input("Новая цена: ")
+
+            self.safe_execute(self.bookstore.update_book_price, book_id, price)
+
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
     def _search_books_interactive(self):
         """Интерактивный поиск книг"""
         print("\nПоиск книг:")
@@ -276,6 +308,42 @@ class BookstoreManager:
         except Exception as e:
             print(f"Ошибка: {e}")
 
+    def _checkout_interactive(self):
+        """Интерактивная продажа нескольких книг одной покупкой"""
+        try:
+            if not self.bookstore.books:
+                print("В магазине нет книг для продажи")
+                return
+
+            print("\nПродажа нескольких книг:")
+            self._show_books()
+
+            items = []
+            print("Введите позиции корзины (пустой ID книги - завершить ввод)")
+            while True:
+                book_id = input("ID книги: ").strip()
+                if not book_id:
+                    break
+                if not book_id.isdigit():
+                    print("Ошибка: введите целое число (например: 5)")
+                    continue
+                quantity = self._get_int_input("Количество: ", 1)
+                items.append((int(book_id), quantity))
+
+            if not items:
+                print("Корзина пуста")
+                return
+
+            customer_id = self._get_int_input("ID клиента: ")
+            employee_id = self._get_int_input("ID сотрудника: ")
+
+            sales = self.safe_execute(self.bookstore.checkout, items, customer_id, employee_id)
+            if sales is not None:
+                print(f"Продажи #{sales[0].sale_id}-{sales[-1].sale_id} завершены!")
+
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
     def _add_employee_interactive(self):
         """Интерактивное добавление сотрудника"""
         try:
@@ -330,6 +398,7 @@ class BookstoreManager:
         print("\nСохранение данных:")
         print("1. Сохранить в JSON")
         print("2. Сохранить в XML")
+        print("3. Сохранить в двоичный снимок")
 
         choice = input("Выберите формат: ").strip()
         filename = input("Имя файла: ").strip()
@@ -347,6 +416,10 @@ class BookstoreManager:
             if not filename.endswith('.xml'):
                 filename += '.xml'
             self.safe_execute(self.bookstore.save_to_xml, filename)
+        elif choice == '3':
+            if not filename.endswith('.bin'):
+                filename += '.bin'
+            self.safe_execute(self.bookstore.save_to_binary, filename)
         else:
             print("Неверный выбор формата")
 
@@ -355,6 +428,7 @@ class BookstoreManager:
         print("\nЗагрузка данных:")
         print("1. Загрузить из JSON")
         print("2. Загрузить из XML")
+        print("3. Загрузить из двоичного снимка")
 
         choice = input("Выберите формат: ").strip()
         filename = input("Имя файла: ").strip()
@@ -371,5 +445,9 @@ class BookstoreManager:
             if not filename.endswith('.xml'):
                 filename += '.xml'
             self.safe_execute(self.bookstore.load_from_xml, filename)
+        elif choice == '3':
+            if not filename.endswith('.bin'):
+                filename += '.bin'
+            self.safe_execute(self.bookstore.load_from_binary, filename)
         else:
             print("Неверный выбор формата")
@@ -0,0 +1,201 @@
+# Модуль с метриками вызовов книжного магазина: счетчики, задержки и ошибки
+
+import functools
+import inspect
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Верхние границы корзин гистограммы задержек в секундах (как le в Prometheus)
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005,
+                   0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, math.inf)
+
+# Методы, работающие с файлами, помечаются отдельным видом операции
+FILE_OPERATIONS = frozenset({
+    'save_to_json', 'load_from_json', 'save_to_xml', 'load_from_xml',
+    'save_to_binary', 'load_from_binary', 'save_in_background',
+    'checkpoint', 'recover', 'archive_sales',
+})
+
+
+class _OperationStats:
+    """Накопленные значения по одной операции"""
+
+    __slots__ = ('kind', 'calls', 'errors', 'buckets', 'total')
+
+    def __init__(self, kind: str, buckets: int):
+        self.kind = kind
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.buckets = [0] * buckets  # число вызовов по корзинам, не накопительно
+        self.total = 0.0
+
+
+class Metrics:
+    """Реестр метрик вызовов
+
+    Для каждой операции хранит число вызовов, гистограмму задержек и число
+    ошибок по классам исключений. Отдельно учитываются ошибки, обработанные
+    менеджером (BookstoreManager.safe_execute) и показанные пользователю.
+    Все методы потокобезопасны.
+    """
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        if not self.buckets or self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+        self._lock = threading.Lock()
+        self._operations: Dict[str, _OperationStats] = {}
+        self._handled: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, operation: str, seconds: float, error: Optional[BaseException] = None,
+                kind: str = 'method') -> None:
+        """Учет одного вызова операции с его длительностью и ошибкой (если была)"""
+        bucket = bisect_left(self.buckets, seconds)
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                stats = self._operations[operation] = _OperationStats(kind, len(self.buckets))
+            stats.calls += 1
+            stats.buckets[bucket] += 1
+            stats.total += seconds
+            if error is not None:
+                name = type(error).__name__
+                stats.errors[name] = stats.errors.get(name, 0) + 1
+
+    def record_handled_error(self, operation: str, error: BaseException) -> None:
+        """Учет ошибки, перехваченной и показанной пользователю"""
+        key = (operation, type(error).__name__)
+        with self._lock:
+            self._handled[key] = self._handled.get(key, 0) + 1
+
+    def reset(self) -> None:
+        """Сброс всех накопленных значений"""
+        with self._lock:
+            self._operations.clear()
+            self._handled.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущие значения метрик в виде словаря
+
+        Для каждой операции: вид (method или file), число вызовов, суммарное
+        и среднее время, ошибки по классам и накопительная гистограмма
+        {граница: число вызовов не дольше границы}.
+        """
+        with self._lock:
+            operations = {name: (stats.kind, stats.calls, dict(stats.errors),
+                                 list(stats.buckets), stats.total)
+                          for name, stats in self._operations.items()}
+            handled = dict(self._handled)
+
+        result: Dict[str, Any] = {'operations': {}, 'handled_errors': {}}
+        for name, (kind, calls, errors, buckets, total) in sorted(operations.items()):
+            cumulative, histogram = 0, {}
+            for bound, count in zip(self.buckets, buckets):
+                cumulative += count
+                histogram[bound] = cumulative
+            result['operations'][name] = {
+                'kind': kind,
+                'calls': calls,
+                'errors': errors,
+                'total_seconds': total,
+                'mean_seconds': total / calls if calls else 0.0,
+                'histogram': histogram,
+            }
+        for (operation, error), count in sorted(handled.items()):
+            result['handled_errors'].setdefault(operation, {})[error] = count
+        return result
+
+    def to_prometheus(self, prefix: str = 'bookstore') -> str:
+        """Метрики в текстовом формате Prometheus"""
+        data = self.snapshot()
+        lines = [f"# HELP {prefix}_calls_total Число вызовов операций магазина",
+                 f"# TYPE {prefix}_calls_total counter"]
+        operations = data['operations']
+        for name, stats in operations.items():
+            lines.append(f'{prefix}_calls_total{{{_labels(name, stats)}}} {stats["calls"]}')
+
+        lines += [f"# HELP {prefix}_errors_total Число ошибок операций по классам исключений",
+                  f"# TYPE {prefix}_errors_total counter"]
+        for name, stats in operations.items():
+            for error, count in sorted(stats['errors'].items()):
+                lines.append(f'{prefix}_errors_total{{{_labels(name, stats)},error="{error}"}} {count}')
+
+        lines += [f"# HELP {prefix}_latency_seconds Длительность операций магазина",
+                  f"# TYPE {prefix}_latency_seconds histogram"]
+        for name, stats in operations.items():
+            labels = _labels(name, stats)
+            for bound, count in stats['histogram'].items():
+                le = '+Inf' if bound == math.inf else repr(bound)
+                lines.append(f'{prefix}_latency_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f'{prefix}_latency_seconds_sum{{{labels}}} {stats["total_seconds"]!r}')
+            lines.append(f'{prefix}_latency_seconds_count{{{labels}}} {stats["calls"]}')
+
+        lines += [f"# HELP {prefix}_handled_errors_total Ошибки, обработанные менеджером",
+                  f"# TYPE {prefix}_handled_errors_total counter"]
+        for operation, errors in data['handled_errors'].items():
+            for error, count in errors.items():
+                lines.append(f'{prefix}_handled_errors_total'
+                             f'{{operation="{_escape(operation)}",error="{error}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    """Экранирование значения метки Prometheus"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(name: str, stats: Dict[str, Any]) -> str:
+    """Метки операции для текстового формата"""
+    return f'method="{_escape(name)}",kind="{stats["kind"]}"'
+
+
+def _timed(method: Callable, name: str, kind: str, metrics: Metrics) -> Callable:
+    """Обертка метода, учитывающая каждый вызов"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except BaseException as e:
+            metrics.observe(name, time.perf_counter() - start, e, kind)
+            raise
+        metrics.observe(name, time.perf_counter() - start, None, kind)
+        return result
+
+    wrapper.__metrics__ = metrics
+    return wrapper
+
+
+def public_methods(obj: Any) -> List[str]:
+    """Имена публичных методов класса объекта (без свойств и служебных имен)"""
+    return [name for name, value in inspect.getmembers(type(obj))
+            if not name.startswith('_') and inspect.isfunction(value)]
+
+
+def instrument(obj: Any, metrics: Optional[Metrics] = None,
+               methods: Optional[Iterable[str]] = None) -> Metrics:
+    """Включение учета вызовов публичных методов объекта
+
+    Обертки ставятся атрибутами экземпляра поверх методов класса, поэтому
+    другие экземпляры и сам класс не затрагиваются, а после uninstrument
+    вызовы снова идут напрямую, без каких-либо накладных расходов.
+    Внутренние вызовы одного публичного метода из другого тоже учитываются.
+    """
+    metrics = metrics if metrics is not None else Metrics()
+    for name in (public_methods(obj) if methods is None else methods):
+        method = getattr(obj, name)
+        if getattr(method, '__metrics__', None) is not None:
+            method = method.__wrapped__  # повторное включение заменяет реестр
+        kind = 'file' if name in FILE_OPERATIONS else 'method'
+        setattr(obj, name, _timed(method, name, kind, metrics))
+    return metrics
+
+
+def uninstrument(obj: Any) -> None:
+    """Снятие оберток, поставленных instrument"""
+    for name, value in list(vars(obj).items()):
+        if getattr(value, '__metrics__', None) is not None:
+            delattr(obj, name)
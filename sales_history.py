@@ -0,0 +1,207 @@
+# Модуль с историей продаж, хранящейся в отображенном в память колоночном файле
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, MutableMapping
+from itertools import compress
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from binary_snapshot import BinarySnapshot
+from classes import Sale, micros_to_datetime
+
+# Поля продажи в порядке аргументов конструктора Sale
+SALE_FIELDS = ('sale_id', 'book_id', 'customer_id', 'employee_id',
+               'quantity', 'total_price', 'sale_date')
+
+
+class FrozenPrefix(Mapping):
+    """Первые записи словаря, который пополняется только добавлением в конец
+
+    Снимок без копирования: запоминается число записей, а при обходе
+    записи, добавленные позже, отбрасываются. Ссылки копируются уже при
+    обходе (list() от словаря выполняется целиком под GIL, поэтому
+    параллельные добавления ему не мешают). Удалять можно только записи
+    за границей снимка; доступ по ключу границу не проверяет.
+    """
+
+    def __init__(self, data: Dict[Any, Any], count: Optional[int] = None):
+        self._data = data
+        self._count = len(data) if count is None else count
+
+    def _prefix(self, entries: Iterable[Any]) -> List[Any]:
+        """Первые записи снимка из представления словаря"""
+        entries = list(entries)
+        if len(entries) < self._count:
+            raise RuntimeError("записи снимка удалены из словаря во время записи")
+        del entries[self._count:]
+        return entries
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._data[key]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._prefix(self._data))
+
+    def values(self) -> List[Any]:
+        return self._prefix(self._data.values())
+
+    def items(self) -> List[tuple]:
+        return self._prefix(self._data.items())
+
+
+class TieredSales(MutableMapping):
+    """Продажи в двух уровнях: архив в двоичном снимке и недавние в словаре
+
+    Архивные продажи хранятся колонками в файле, отображенном в память,
+    и превращаются в объекты Sale только при обращении (поиск по ID
+    выполняется бинарным поиском по колонке sale_id). Новые продажи
+    попадают в словарь недавних. Продажи неизменяемы: изменения полей
+    материализованного архивного объекта не сохраняются.
+    """
+
+    def __init__(self, snapshot: Optional[BinarySnapshot] = None, table: str = 'sales'):
+        self._snapshot = snapshot
+        self._recent: Dict[int, Sale] = {}
+        self._removed: Set[int] = set()  # удаленные или перезаписанные архивные ID
+        self._columns: Dict[str, Sequence] = {}
+        self._keys: Sequence[int] = ()  # ID архива по возрастанию
+        self._rows: Optional[Sequence[int]] = None  # номера строк для _keys, если архив не упорядочен
+
+        if snapshot is not None:
+            self._columns = {field: snapshot.column(table, field) for field in SALE_FIELDS}
+            ids = self._columns['sale_id']
+            if snapshot.is_sorted(table):
+                self._keys = ids
+            else:
+                self._rows = array('q', sorted(range(len(ids)), key=ids.__getitem__))
+                self._keys = array('q', (ids[row] for row in self._rows))
+
+    @property
+    def archived(self) -> int:
+        """Количество продаж в архиве (без удаленных)"""
+        return len(self._keys) - len(self._removed)
+
+    @property
+    def recent(self) -> int:
+        """Количество продаж в памяти"""
+        return len(self._recent)
+
+    def _row(self, key: int) -> Optional[int]:
+        """Номер строки архива для ID продажи или None"""
+        keys = self._keys
+        pos = bisect_left(keys, key)
+        if pos == len(keys) or keys[pos] != key or key in self._removed:
+            return None
+        return pos if self._rows is None else self._rows[pos]
+
+    def _materialize(self, row: int) -> Sale:
+        """Создание объекта Sale из строки архива"""
+        columns = self._columns
+        # Архив записан из уже проверенных продаж
+        return Sale(*(columns[field][row] for field in SALE_FIELDS[:-1]),
+                    sale_date=micros_to_datetime(columns['sale_date'][row]), validate=False)
+
+    def __getitem__(self, key: int) -> Sale:
+        sale = self._recent.get(key)
+        if sale is not None:
+            return sale
+        row = self._row(key)
+        if row is None:
+            raise KeyError(key)
+        return self._materialize(row)
+
+    def __setitem__(self, key: int, sale: Sale) -> None:
+        if key not in self._recent and self._row(key) is not None:
+            # Новая версия архивной продажи скрывает архивную запись
+            self._removed.add(key)
+        self._recent[key] = sale
+
+    def __delitem__(self, key: int) -> None:
+        if key in self._recent:
+            del self._recent[key]
+        elif self._row(key) is not None:
+            self._removed.add(key)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._recent or self._row(key) is not None
+
+    def __len__(self) -> int:
+        return self.archived + len(self._recent)
+
+    def _archive_mask(self) -> Optional[Iterator[bool]]:
+        """Признаки действующих строк архива или None, если удаленных нет"""
+        if not self._removed:
+            return None
+        removed = self._removed
+        return (key not in removed for key in self._columns['sale_id'])
+
+    def __iter__(self) -> Iterator[int]:
+        if self._columns:
+            ids = self._columns['sale_id']
+            mask = self._archive_mask()
+            yield from ids if mask is None else compress(ids, mask)
+        yield from list(self._recent)
+
+    def values(self) -> Iterator[Sale]:
+        """Обход продаж с материализацией архивных по одной"""
+        if self._columns:
+            rows = range(len(self._columns['sale_id']))
+            mask = self._archive_mask()
+            for row in (rows if mask is None else compress(rows, mask)):
+                yield self._materialize(row)
+        yield from list(self._recent.values())
+
+    def items(self) -> Iterator[tuple]:
+        """Обход пар ID -> продажа"""
+        return ((sale.sale_id, sale) for sale in self.values())
+
+    def rows(self, *fields: str) -> Iterable[Any]:
+        """Значения полей всех продаж без создания объектов Sale
+
+        Для одного поля выдаются значения, для нескольких - кортежи,
+        как у operator.attrgetter.
+        """
+        columns = []
+        for field in fields:
+            column = self._columns.get(field, ())
+            columns.append(map(micros_to_datetime, column) if field == 'sale_date' else column)
+        archive = zip(*columns) if len(fields) > 1 else columns[0]
+        mask = self._archive_mask()
+        if mask is not None:
+            archive = compress(archive, mask)
+        yield from archive
+        yield from map(attrgetter(*fields), list(self._recent.values()))
+
+    def frozen(self) -> 'TieredSales':
+        """Снимок на текущий момент для чтения: архив общий, недавние - FrozenPrefix
+
+        Снимок не владеет файлом архива и действителен, пока он не закрыт.
+        """
+        other = TieredSales()
+        other._columns = self._columns
+        other._keys = self._keys
+        other._rows = self._rows
+        other._recent = FrozenPrefix(self._recent)
+        other._removed = self._removed.copy()
+        return other
+
+    def clear(self) -> None:
+        """Удаление всех продаж и освобождение архива"""
+        self._recent.clear()
+        self._removed.clear()
+        self._columns = {}
+        self._keys = ()
+        self._rows = None
+        self.close()
+
+    def close(self) -> None:
+        """Освобождение файла архива"""
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
@@ -0,0 +1,409 @@
+# Модуль с асинхронным сервисом поверх книжного магазина
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from bookstore import Bookstore
+from classes import Book, Employee, Customer, Sale
+from exceptions import *
+from storage import MemoryStorage
+
+
+class AsyncBookstore:
+    """Асинхронный фасад над Bookstore для обслуживания многих клиентов
+
+    Операции в памяти (поиск, продажи, добавление, отчеты) занимают
+    микросекунды и выполняются прямо в цикле событий, поэтому изменения
+    естественным образом упорядочены. Снимки JSON, XML и двоичные пишутся
+    фоновым сохранением и не задерживают продажи; остальные операции
+    с файлами выполняются в пуле потоков, и на это время изменения ждут
+    своей очереди, а загрузка дополнительно приостанавливает чтение.
+    """
+
+    def __init__(self, bookstore: Bookstore, executor: Executor = None):
+        self.bookstore = bookstore
+        self._executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix='bookstore-io')
+        self._own_executor = executor is None
+        self._write_lock = asyncio.Lock()
+        self._ready = asyncio.Event()  # сброшен, пока идет загрузка
+        self._ready.set()
+
+    async def _read(self, method: Callable, *args, **kwargs) -> Any:
+        """Чтение данных (ждет только окончания загрузки)"""
+        await self._ready.wait()
+        return method(*args, **kwargs)
+
+    async def _write(self, method: Callable, *args, **kwargs) -> Any:
+        """Изменение данных в цикле событий под общей очередью изменений"""
+        async with self._write_lock:
+            return method(*args, **kwargs)
+
+    async def _offload(self, method: Callable, *args, exclusive: bool = False, **kwargs) -> Any:
+        """Выполнение операции с файлом в пуле потоков
+
+        exclusive=True приостанавливает и чтение (для загрузки данных).
+        """
+        loop = asyncio.get_running_loop()
+        async with self._write_lock:
+            if exclusive:
+                self._ready.clear()
+            try:
+                return await loop.run_in_executor(self._executor, partial(method, *args, **kwargs))
+            finally:
+                self._ready.set()
+
+    # Чтение
+
+    async def search_books(self, **kwargs) -> List[Book]:
+        """Поиск книг по критериям search_books"""
+        return await self._read(self.bookstore.search_books, **kwargs)
+
+    async def get_book(self, book_id: int) -> Book:
+        """Получение книги по ID"""
+        def get() -> Book:
+            book = self.bookstore.books.get(book_id)
+            if book is None:
+                raise BookNotFoundError(f"Книга с ID {book_id} не найдена")
+            return book
+        return await self._read(get)
+
+    async def get_sales_by_customer(self, customer_id: int) -> List[Sale]:
+        """Продажи клиента"""
+        return await self._read(self.bookstore.get_sales_by_customer, customer_id)
+
+    async def get_sales_by_employee(self, employee_id: int) -> List[Sale]:
+        """Продажи сотрудника"""
+        return await self._read(self.bookstore.get_sales_by_employee, employee_id)
+
+    async def get_book_sales(self, book_id: int) -> List[Sale]:
+        """Продажи книги"""
+        return await self._read(self.bookstore.get_book_sales, book_id)
+
+    async def get_summary(self) -> Dict[str, Any]:
+        """Сводка по магазину: количество сущностей, выручка и стоимость инвентаря"""
+        def summary() -> Dict[str, Any]:
+            bookstore = self.bookstore
+            return {
+                'name': bookstore.name,
+                'books': len(bookstore.books),
+                'employees': len(bookstore.employees),
+                'customers': len(bookstore.customers),
+                'sales': len(bookstore.sales),
+                'total_revenue': bookstore.get_total_revenue(),
+                'inventory_value': bookstore.get_inventory_value()
+            }
+        return await self._read(summary)
+
+    async def sales_report(self, key: str, since: datetime = None, until: datetime = None,
+                           top: int = None) -> Union[Dict[Any, Dict[str, float]], List[Tuple[Any, Dict[str, float]]]]:
+        """Итоги продаж по группам (см. SalesAnalytics.group_by); top - только N лучших по выручке"""
+        def report():
+            analytics = self.bookstore.get_sales_analytics()
+            if top is not None:
+                return analytics.top(key, top, since=since, until=until)
+            return analytics.group_by(key, since, until)
+        # Дополнение колонок аналитики изменяет ее состояние
+        return await self._write(report)
+
+    # Изменение
+
+    async def add_book(self, book: Union[Book, Dict]) -> Book:
+        """Добавление книги; возвращает книгу с назначенным ID"""
+        # У новой записи по сети ID может отсутствовать - его назначит магазин
+        book = book if isinstance(book, Book) else Book.from_dict({'book_id': 0, **book})
+        await self._write(self.bookstore.add_book, book)
+        # При слиянии с существующей книгой возвращаем итоговую запись
+        return self.bookstore.books[book.book_id]
+
+    async def add_employee(self, employee: Union[Employee, Dict]) -> Employee:
+        """Добавление сотрудника; возвращает сотрудника с назначенным ID"""
+        employee = employee if isinstance(employee, Employee) else Employee.from_dict({'emp_id': 0, **employee})
+        await self._write(self.bookstore.add_employee, employee)
+        return employee
+
+    async def add_customer(self, customer: Union[Customer, Dict]) -> Customer:
+        """Добавление клиента; возвращает клиента с назначенным ID"""
+        customer = customer if isinstance(customer, Customer) else Customer.from_dict({'cust_id': 0, **customer})
+        await self._write(self.bookstore.add_customer, customer)
+        return customer
+
+    async def remove_book(self, book_id: int, quantity: int = 1) -> None:
+        """Списание экземпляров книги"""
+        await self._write(self.bookstore.remove_book, book_id, quantity)
+
+    async def update_book_price(self, book_id: int, price: float) -> None:
+        """Изменение цены книги"""
+        await self._write(self.bookstore.update_book_price, book_id, price)
+
+    async def sell_book(self, book_id: int, quantity: int, customer_id: int, employee_id: int) -> Sale:
+        """Продажа книги"""
+        return await self._write(self.bookstore.sell_book, book_id, quantity, customer_id, employee_id)
+
+    async def checkout(self, items: Iterable[Tuple[int, int]], customer_id: int, employee_id: int) -> List[Sale]:
+        """Продажа корзины книг одной операцией"""
+        return await self._write(self.bookstore.checkout, items, customer_id, employee_id)
+
+    # Файлы
+
+    async def _save_in_background(self, filename: str, format: str, **options) -> None:
+        """Фоновое сохранение снимка: в цикле событий снимается только копия данных"""
+        await self._ready.wait()
+        if not isinstance(self.bookstore._storage, MemoryStorage):
+            # Хранилище на диске не поддерживает копию данных - пишем под очередью изменений
+            method = {'json': self.bookstore.save_to_json, 'xml': self.bookstore.save_to_xml,
+                      'binary': self.bookstore.save_to_binary}[format]
+            await self._offload(method, filename, **options)
+            return
+        await asyncio.wrap_future(self.bookstore.save_in_background(filename, format, **options))
+
+    async def save_to_json(self, filename: str, **options) -> None:
+        """Сохранение в JSON без остановки продаж"""
+        await self._save_in_background(filename, 'json', **options)
+
+    async def save_to_xml(self, filename: str) -> None:
+        """Сохранение в XML без остановки продаж"""
+        await self._save_in_background(filename, 'xml')
+
+    async def save_to_binary(self, filename: str) -> None:
+        """Сохранение двоичного снимка без остановки продаж"""
+        await self._save_in_background(filename, 'binary')
+
+    async def checkpoint(self, filename: str, **options) -> None:
+        """Снимок JSON с очисткой журнала в пуле потоков"""
+        await self._offload(self.bookstore.checkpoint, filename, **options)
+
+    async def load_from_json(self, filename: str, **options) -> None:
+        """Загрузка из JSON в пуле потоков"""
+        await self._offload(self.bookstore.load_from_json, filename, exclusive=True, **options)
+
+    async def load_from_xml(self, filename: str, **options) -> None:
+        """Загрузка из XML в пуле потоков"""
+        await self._offload(self.bookstore.load_from_xml, filename, exclusive=True, **options)
+
+    async def load_from_binary(self, filename: str, **options) -> None:
+        """Загрузка двоичного снимка в пуле потоков"""
+        await self._offload(self.bookstore.load_from_binary, filename, exclusive=True, **options)
+
+    async def close(self) -> None:
+        """Завершение пула потоков (если он создан фасадом)"""
+        if self._own_executor:
+            self._executor.shutdown(wait=True)
+
+
+# Методы, доступные по сети, и допустимые имена их параметров:
+# внутренние настройки магазина (workers, stream, compression...) клиенту недоступны
+_REMOTE_METHODS = {
+    'search_books': ('title', 'author', 'genre', 'min_price', 'max_price', 'min_year', 'max_year'),
+    'get_book': ('book_id',),
+    'get_sales_by_customer': ('customer_id',),
+    'get_sales_by_employee': ('employee_id',),
+    'get_book_sales': ('book_id',),
+    'get_summary': (),
+    'sales_report': ('key', 'since', 'until', 'top'),
+    'add_book': ('book',),
+    'add_employee': ('employee',),
+    'add_customer': ('customer',),
+    'remove_book': ('book_id', 'quantity'),
+    'update_book_price': ('book_id', 'price'),
+    'sell_book': ('book_id', 'quantity', 'customer_id', 'employee_id'),
+    'checkout': ('items', 'customer_id', 'employee_id'),
+}
+# Операции с файлами доступны, только если сервер запущен с каталогом данных,
+# и работают только с файлами внутри него
+_FILE_METHODS = {
+    'save_to_json': ('filename',),
+    'save_to_xml': ('filename',),
+    'save_to_binary': ('filename',),
+    'checkpoint': ('filename',),
+    'load_from_json': ('filename',),
+    'load_from_xml': ('filename',),
+    'load_from_binary': ('filename',),
+}
+_DATE_PARAMS = ('since', 'until')
+
+
+def _to_json(value: Any) -> Any:
+    """Преобразование результата метода в значение, пригодное для JSON"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(_to_json(key)): _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return value
+
+
+class BookstoreServer:
+    """Сервер JSON Lines поверх AsyncBookstore
+
+    Каждая строка запроса - объект {"id": ..., "method": ..., "params": {...}},
+    ответ - {"id": ..., "result": ...} или {"id": ..., "error": {"type": ...,
+    "message": ...}}, где type - имя класса исключения (например,
+    InsufficientQuantityError). Запросы одного соединения обрабатываются
+    по порядку, соединения - параллельно. Параметры, не предусмотренные
+    методом для клиентов, отклоняются.
+
+    Сохранение и загрузка доступны, только если задан data_dir: имя файла
+    в запросе считается относительным к этому каталогу, а пути, ведущие
+    за его пределы (через .., абсолютный путь или символическую ссылку),
+    отклоняются.
+    """
+
+    def __init__(self, service: AsyncBookstore, data_dir: str = None):
+        self.service = service
+        self.data_dir = os.path.realpath(data_dir) if data_dir is not None else None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _resolve_path(self, filename: Any) -> str:
+        """Путь к файлу внутри каталога данных"""
+        if not isinstance(filename, str) or not filename:
+            raise FileOperationError("Не задано имя файла")
+        path = os.path.realpath(os.path.join(self.data_dir, filename))
+        if os.path.commonpath([path, self.data_dir]) != self.data_dir or path == self.data_dir:
+            raise FileOperationError(f"Путь вне каталога данных: {filename}")
+        return path
+
+    async def _call(self, request: Dict[str, Any]) -> Any:
+        """Вызов метода фасада по запросу"""
+        method = request.get('method')
+        is_file = self.data_dir is not None and method in _FILE_METHODS
+        if method not in _REMOTE_METHODS and not is_file:
+            raise ValueError(f"неизвестный метод: {method}")
+        params = request.get('params') or {}
+        if not isinstance(params, dict):
+            raise ValueError("параметры запроса должны быть объектом")
+        allowed = _FILE_METHODS[method] if is_file else _REMOTE_METHODS[method]
+        unknown = sorted(set(params) - set(allowed))
+        if unknown:
+            raise ValueError(f"недопустимые параметры метода {method}: {', '.join(unknown)}")
+        params = dict(params)
+        if is_file:
+            params['filename'] = self._resolve_path(params.get('filename'))
+        for name in _DATE_PARAMS:
+            if params.get(name) is not None:
+                params[name] = datetime.fromisoformat(params[name])
+        return await getattr(self.service, method)(**params)
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, response: Dict[str, Any]) -> None:
+        """Отправка ответа одной строкой JSON"""
+        writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+        await writer.drain()
+
+    @staticmethod
+    def _error(request_id: Any, error: Exception) -> Dict[str, Any]:
+        """Ответ с ошибкой запроса"""
+        return {'id': request_id, 'error': {'type': type(error).__name__, 'message': str(error)}}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обслуживание одного соединения"""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as e:
+                    # Строка длиннее лимита потока: начало следующего запроса
+                    # не найти, поэтому после ответа соединение закрывается
+                    await self._send(writer, self._error(None, e))
+                    break
+                if not line:
+                    break
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get('id')
+                    response = {'id': request_id, 'result': _to_json(await self._call(request))}
+                except Exception as e:
+                    response = self._error(request_id, e)
+                await self._send(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765, path: str = None) -> asyncio.AbstractServer:
+        """Запуск сервера на TCP-порту или на unix-сокете (если задан path)"""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    async def stop(self) -> None:
+        """Остановка сервера"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+def is_loopback(host: str) -> bool:
+    """Признак адреса, доступного только с этой машины"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+async def serve(bookstore: Bookstore, host: str = '127.0.0.1', port: int = 8765, path: str = None,
+                data_dir: str = None) -> None:
+    """Обслуживание клиентов до прерывания"""
+    service = AsyncBookstore(bookstore)
+    server = BookstoreServer(service, data_dir)
+    async_server = await server.start(host, port, path)
+    address = path or f"{host}:{port}"
+    print(f"Сервис магазина '{bookstore.name}' запущен на {address}")
+    try:
+        async with async_server:
+            await async_server.serve_forever()
+    finally:
+        await server.stop()
+        await service.close()
+
+
+def main():
+    """Точка входа для запуска сервиса из командной строки"""
+    parser = argparse.ArgumentParser(description="Сетевой сервис книжного магазина (JSON Lines)")
+    parser.add_argument('--host', default='127.0.0.1', help="Адрес для TCP (по умолчанию только локальный)")
+    parser.add_argument('--allow-remote', action='store_true',
+                        help="Разрешить адрес, отличный от локального (сервис не проверяет клиентов)")
+    parser.add_argument('--port', type=int, default=8765, help="Порт для TCP")
+    parser.add_argument('--unix', help="Путь к unix-сокету вместо TCP")
+    parser.add_argument('--load', help="Файл данных для загрузки при старте (.json, .xml или .bin)")
+    parser.add_argument('--data-dir',
+                        help="Каталог для сохранения и загрузки по сети (без него операции с файлами недоступны)")
+    args = parser.parse_args()
+    if args.unix is None and not args.allow_remote and not is_loopback(args.host):
+        parser.error(f"адрес {args.host} доступен извне; укажите --allow-remote, если это намеренно")
+
+    if args.load:
+        bookstore = Bookstore("Книжный магазин")
+        if args.load.endswith('.xml'):
+            bookstore.load_from_xml(args.load)
+        elif args.load.endswith('.bin'):
+            bookstore.load_from_binary(args.load)
+        else:
+            bookstore.load_from_json(args.load)
+    else:
+        from main import create_initial_bookstore
+        bookstore = create_initial_bookstore()
+
+    try:
+        asyncio.run(serve(bookstore, args.host, args.port, args.unix, args.data_dir))
+    except KeyboardInterrupt:
+        print("Сервис остановлен")
+
+
+if __name__ == "__main__":
+    main()
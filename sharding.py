@@ -0,0 +1,354 @@
+# Модуль с шардированным координатором нескольких книжных магазинов
+
+import contextlib
+import math
+import multiprocessing
+import os
+from multiprocessing.connection import Connection
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from bookstore import Bookstore
+from classes import Book, Employee, Customer, Sale
+from exceptions import *
+
+
+def _sell_batch(bookstore: Bookstore, orders: List[Tuple[int, Tuple[int, int, int, int]]]) -> List[Tuple[int, Any]]:
+    """Продажа пачки заказов шарда без вывода сообщений
+
+    orders - пары (позиция заказа, аргументы sell_book); результат - пары
+    (позиция, Sale или исключение).
+    """
+    results = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for position, order in orders:
+            try:
+                results.append((position, bookstore.sell_book(*order)))
+            except (BookstoreError, ValueError) as e:
+                results.append((position, e))
+    return results
+
+
+def _id_counters(bookstore: Bookstore) -> Dict[str, int]:
+    """Следующие ID сущностей шарда"""
+    return {attr: getattr(bookstore, attr) for attr in Bookstore._COUNTERS.values()}
+
+
+# Операции, выполняемые на шарде помимо методов Bookstore
+_SHARD_OPS: Dict[str, Callable] = {
+    'sell_batch': _sell_batch,
+    'id_counters': _id_counters,
+}
+
+
+def _run_on_shard(bookstore: Bookstore, method: str, args: tuple, kwargs: dict) -> Any:
+    """Выполнение операции или метода Bookstore на шарде"""
+    op = _SHARD_OPS.get(method)
+    if op is not None:
+        return op(bookstore, *args, **kwargs)
+    return getattr(bookstore, method)(*args, **kwargs)
+
+
+def _create_shard(name: str, index: int, count: int) -> Bookstore:
+    """Магазин-шард с собственной последовательностью ID продаж"""
+    bookstore = Bookstore(f"{name} #{index + 1}")
+    bookstore.configure_sale_ids(index + 1, count)
+    return bookstore
+
+
+def _shard_worker(conn: Connection, name: str, index: int, count: int) -> None:
+    """Цикл рабочего процесса шарда: вызов -> ('ok', результат) или ('error', исключение)"""
+    bookstore = _create_shard(name, index, count)
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            method, args, kwargs = request
+            try:
+                conn.send(('ok', _run_on_shard(bookstore, method, args, kwargs)))
+            except Exception as e:
+                try:
+                    conn.send(('error', e))
+                except Exception:
+                    # Исключение не сериализуется - передаем текст
+                    conn.send(('error', BookstoreError(f"{type(e).__name__}: {e}")))
+    finally:
+        bookstore.close()
+        conn.close()
+
+
+class _LocalShard:
+    """Шард в том же процессе: вызовы выполняются сразу"""
+
+    def __init__(self, name: str, index: int, count: int):
+        self.bookstore = _create_shard(name, index, count)
+
+    def submit(self, method: str, *args, **kwargs) -> Callable[[], Any]:
+        """Выполнение вызова; возвращает функцию получения результата"""
+        try:
+            result = _run_on_shard(self.bookstore, method, args, kwargs)
+        except Exception as e:
+            error = e
+
+            def raise_error():
+                raise error
+            return raise_error
+        return lambda: result
+
+    def close(self) -> None:
+        self.bookstore.close()
+
+
+class _ProcessShard:
+    """Шард в отдельном процессе, связанный с координатором каналом Pipe"""
+
+    def __init__(self, name: str, index: int, count: int):
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_shard_worker, args=(child_conn, name, index, count),
+            name=f"bookstore-shard-{index + 1}", daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def submit(self, method: str, *args, **kwargs) -> Callable[[], Any]:
+        """Отправка вызова; возвращает функцию ожидания результата
+
+        Результаты нужно получать в порядке отправки вызовов.
+        """
+        self._conn.send((method, args, kwargs))
+
+        def receive():
+            status, value = self._conn.recv()
+            if status == 'error':
+                raise value
+            return value
+        return receive
+
+    def close(self) -> None:
+        try:
+            self._conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self._process.join()
+        self._conn.close()
+
+
+class ShardedBookstore:
+    """Координатор нескольких магазинов-шардов
+
+    Книги (и их продажи) распределяются по шардам по book_id, поэтому
+    продажа выполняется на одном шарде. Клиенты и сотрудники небольшими
+    справочниками копируются на все шарды, чтобы продажу можно было
+    проверить локально. ID сущностей выдает координатор, ID продаж -
+    шарды из непересекающихся последовательностей (configure_sale_ids).
+    Запросы по всем шардам (поиск, выручка, продажи клиента) рассылаются
+    всем шардам сразу и собираются после, поэтому при processes=True
+    шарды работают параллельно на разных ядрах. Координатор не
+    предназначен для вызовов из нескольких потоков одновременно.
+    """
+
+    def __init__(self, name: str, shards: int = 4, processes: bool = False):
+        if shards < 1:
+            raise ValueError("количество шардов должно быть положительным")
+        self.name = name
+        shard_cls = _ProcessShard if processes else _LocalShard
+        self._shards = [shard_cls(name, index, shards) for index in range(shards)]
+        self._next_book_id = 1
+        self._next_emp_id = 1
+        self._next_cust_id = 1
+
+    @property
+    def shard_count(self) -> int:
+        """Количество шардов"""
+        return len(self._shards)
+
+    def shard_for(self, book_id: int) -> int:
+        """Номер шарда, хранящего книгу"""
+        return book_id % len(self._shards)
+
+    def _call(self, book_id: int, method: str, *args, **kwargs) -> Any:
+        """Вызов на шарде книги"""
+        return self._shards[self.shard_for(book_id)].submit(method, *args, **kwargs)()
+
+    @staticmethod
+    def _collect(pending: List[Callable[[], Any]]) -> List[Any]:
+        """Сбор результатов всех отправленных вызовов
+
+        Ответы получаются от всех шардов даже при ошибке, чтобы каналы
+        не рассинхронизировались; затем поднимается первая ошибка.
+        """
+        results, error = [], None
+        for receive in pending:
+            try:
+                results.append(receive())
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return results
+
+    def _gather(self, method: str, *args, **kwargs) -> List[Any]:
+        """Вызов на всех шардах: сначала рассылка, затем сбор результатов"""
+        return self._collect([shard.submit(method, *args, **kwargs) for shard in self._shards])
+
+    # Изменение
+
+    def add_book(self, book: Book) -> None:
+        """Добавление книги на ее шард"""
+        try:
+            if book.book_id <= 0:
+                book.book_id = self._next_book_id
+            self._next_book_id = max(self._next_book_id, book.book_id + 1)
+            self._call(book.book_id, 'add_book', book)
+        except BookstoreError:
+            raise
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при добавлении книги: {e}")
+
+    def add_employee(self, employee: Employee) -> None:
+        """Добавление сотрудника на все шарды"""
+        try:
+            if employee.emp_id <= 0:
+                employee.emp_id = self._next_emp_id
+            self._next_emp_id = max(self._next_emp_id, employee.emp_id + 1)
+            self._gather('add_employee', employee)
+        except BookstoreError:
+            raise
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при добавлении сотрудника: {e}")
+
+    def add_customer(self, customer: Customer) -> None:
+        """Добавление клиента на все шарды"""
+        try:
+            if customer.cust_id <= 0:
+                customer.cust_id = self._next_cust_id
+            self._next_cust_id = max(self._next_cust_id, customer.cust_id + 1)
+            self._gather('add_customer', customer)
+        except BookstoreError:
+            raise
+        except Exception as e:
+            raise BookstoreError(f"Ошибка при добавлении клиента: {e}")
+
+    def remove_book(self, book_id: int, quantity: int = 1) -> None:
+        """Удаление экземпляров книги на ее шарде"""
+        self._call(book_id, 'remove_book', book_id, quantity)
+
+    def update_book_price(self, book_id: int, price: float) -> None:
+        """Изменение цены книги на ее шарде"""
+        self._call(book_id, 'update_book_price', book_id, price)
+
+    def sell_book(self, book_id: int, quantity: int, customer_id: int, employee_id: int) -> Sale:
+        """Продажа книги на ее шарде"""
+        return self._call(book_id, 'sell_book', book_id, quantity, customer_id, employee_id)
+
+    def sell_many(self, orders: Iterable[Tuple[int, int, int, int]], max_errors: int = 100) -> Dict[str, Any]:
+        """Продажа множества заказов (book_id, quantity, customer_id, employee_id)
+
+        Заказы группируются по шардам и продаются пачками параллельно.
+        Порядок продаж сохраняется внутри каждой книги. Возвращает сводку:
+        'sold', 'failed', 'errors' (позиция, текст ошибки) и 'sales' -
+        продажи в порядке заказов.
+        """
+        batches: List[List[Tuple[int, Tuple[int, int, int, int]]]] = [[] for _ in self._shards]
+        for position, order in enumerate(orders):
+            batches[self.shard_for(order[0])].append((position, tuple(order)))
+
+        pending = [shard.submit('sell_batch', batch)
+                   for shard, batch in zip(self._shards, batches) if batch]
+        results = sorted((result for part in self._collect(pending) for result in part), key=lambda item: item[0])
+
+        summary: Dict[str, Any] = {'sold': 0, 'failed': 0, 'errors': [], 'sales': []}
+        for position, result in results:
+            if isinstance(result, Sale):
+                summary['sold'] += 1
+                summary['sales'].append(result)
+            else:
+                summary['failed'] += 1
+                if len(summary['errors']) < max_errors:
+                    summary['errors'].append((position, f"{type(result).__name__}: {result}"))
+        print(f"Продано заказов: {summary['sold']}, отклонено: {summary['failed']}")
+        return summary
+
+    # Запросы
+
+    def search_books(self, **kwargs) -> List[Book]:
+        """Поиск книг на всех шардах; результат упорядочен по ID"""
+        found = [book for books in self._gather('search_books', **kwargs) for book in books]
+        return sorted(found, key=attrgetter('book_id'))
+
+    def get_total_revenue(self) -> float:
+        """Общая выручка всех шардов"""
+        return math.fsum(self._gather('get_total_revenue'))
+
+    def get_inventory_value(self) -> float:
+        """Общая стоимость инвентаря всех шардов"""
+        return math.fsum(self._gather('get_inventory_value'))
+
+    def _merge_sales(self, method: str, key: int) -> List[Sale]:
+        """Продажи со всех шардов в порядке времени продажи"""
+        sales = [sale for part in self._gather(method, key) for sale in part]
+        return sorted(sales, key=attrgetter('sale_date', 'sale_id'))
+
+    def get_sales_by_customer(self, customer_id: int) -> List[Sale]:
+        """Продажи клиента со всех шардов"""
+        return self._merge_sales('get_sales_by_customer', customer_id)
+
+    def get_sales_by_employee(self, employee_id: int) -> List[Sale]:
+        """Продажи сотрудника со всех шардов"""
+        return self._merge_sales('get_sales_by_employee', employee_id)
+
+    def get_book_sales(self, book_id: int) -> List[Sale]:
+        """Продажи книги (с ее шарда)"""
+        return self._call(book_id, 'get_book_sales', book_id)
+
+    # Файлы
+
+    def save_to_json(self, pattern: str, **options) -> None:
+        """Сохранение каждого шарда в свой файл JSON
+
+        pattern - шаблон имени файла с полем {shard} (номер шарда с 1),
+        например 'store_{shard}.json'. Шарды сохраняются параллельно.
+        """
+        try:
+            self._gather_files('save_to_json', pattern, **options)
+        except FileOperationError:
+            raise
+        except Exception as e:
+            raise FileOperationError(f"Ошибка при сохранении шардов: {e}")
+
+    def load_from_json(self, pattern: str, **options) -> None:
+        """Загрузка шардов из файлов JSON по шаблону (см. save_to_json)
+
+        Для корректной маршрутизации книг количество шардов должно
+        совпадать с количеством при сохранении.
+        """
+        try:
+            self._gather_files('load_from_json', pattern, **options)
+            for counters in self._gather('id_counters'):
+                self._next_book_id = max(self._next_book_id, counters['_next_book_id'])
+                self._next_emp_id = max(self._next_emp_id, counters['_next_emp_id'])
+                self._next_cust_id = max(self._next_cust_id, counters['_next_cust_id'])
+        except FileOperationError:
+            raise
+        except Exception as e:
+            raise FileOperationError(f"Ошибка при загрузке шардов: {e}")
+
+    def _gather_files(self, method: str, pattern: str, **options) -> None:
+        """Параллельная операция с файлами шардов по шаблону имени"""
+        if '{shard}' not in pattern:
+            raise ValueError("шаблон имени файла должен содержать {shard}")
+        self._collect([shard.submit(method, pattern.format(shard=index + 1), **options)
+                       for index, shard in enumerate(self._shards)])
+
+    def close(self) -> None:
+        """Остановка шардов (и их рабочих процессов)"""
+        for shard in self._shards:
+            shard.close()
+        self._shards = []
+
+    def __enter__(self) -> 'ShardedBookstore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,266 @@
+# Модуль с хранилищами данных книжного магазина
+
+import math
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Tuple
+
+from classes import Book, Employee, Customer, Sale
+from sales_history import TieredSales
+
+
+class MemoryStorage:
+    """Хранилище по умолчанию: обычные словари в памяти процесса"""
+
+    # Вторичные индексы продаж поддерживает сам магазин
+    indexes_sales = False
+    # Изменения не откатываются: при ошибке сделанное остается в словарях
+    transactional = False
+
+    def __init__(self):
+        self.books: Dict[int, Book] = {}
+        self.employees: Dict[int, Employee] = {}
+        self.customers: Dict[int, Customer] = {}
+        self.sales: Dict[int, Sale] = {}
+
+    def batch(self) -> ContextManager:
+        """Группа изменений; для словарей транзакции не нужны"""
+        return nullcontext()
+
+    def find_sales(self, column: str, value: int) -> List[Sale]:
+        """Поиск продаж по полю (для словарей не используется)"""
+        return [sale for sale in self.sales.values() if getattr(sale, column) == value]
+
+    def max_id(self, table: str) -> int:
+        """Наибольший ID сущностей таблицы (0, если она пуста)"""
+        return max(getattr(self, table), default=0)
+
+    def totals(self) -> Tuple[float, float]:
+        """Выручка по всем продажам и стоимость инвентаря полным перебором"""
+        sales = self.sales
+        # Архивные продажи читаются из колонок без создания объектов Sale
+        prices = (sales.rows('total_price') if isinstance(sales, TieredSales)
+                  else (sale.total_price for sale in sales.values()))
+        revenue = math.fsum(prices)
+        inventory = math.fsum(book.price * book.quantity for book in self.books.values())
+        return revenue, inventory
+
+    def close(self) -> None:
+        """Закрытие хранилища"""
+
+
+def _sale_to_row(sale: Sale) -> tuple:
+    """Строка таблицы sales из объекта продажи"""
+    return (sale.sale_id, sale.book_id, sale.customer_id, sale.employee_id,
+            sale.quantity, sale.total_price, sale.sale_date.isoformat())
+
+
+def _sale_from_row(row: tuple) -> Sale:
+    """Объект продажи из строки таблицы sales"""
+    return Sale(*row[:6], sale_date=datetime.fromisoformat(row[6]))
+
+
+# Таблицы: имя -> (колонки с типами, преобразование в строку, из строки)
+_TABLES: Dict[str, Tuple[Tuple[Tuple[str, str], ...], Callable, Callable]] = {
+    'books': (
+        (('book_id', 'INTEGER PRIMARY KEY'), ('title', 'TEXT NOT NULL'), ('author', 'TEXT NOT NULL'),
+         ('genre', 'TEXT NOT NULL'), ('price', 'REAL NOT NULL'), ('quantity', 'INTEGER NOT NULL'),
+         ('year', 'INTEGER NOT NULL')),
+        lambda b: (b.book_id, b.title, b.author, b.genre, b.price, b.quantity, b.year),
+        lambda row: Book(*row)
+    ),
+    'employees': (
+        (('emp_id', 'INTEGER PRIMARY KEY'), ('name', 'TEXT NOT NULL'), ('position', 'TEXT NOT NULL'),
+         ('salary', 'REAL NOT NULL')),
+        lambda e: (e.emp_id, e.name, e.position, e.salary),
+        lambda row: Employee(*row)
+    ),
+    'customers': (
+        (('cust_id', 'INTEGER PRIMARY KEY'), ('name', 'TEXT NOT NULL'), ('email', 'TEXT NOT NULL'),
+         ('phone', 'TEXT NOT NULL')),
+        lambda c: (c.cust_id, c.name, c.email, c.phone),
+        lambda row: Customer(*row)
+    ),
+    'sales': (
+        (('sale_id', 'INTEGER PRIMARY KEY'), ('book_id', 'INTEGER NOT NULL'),
+         ('customer_id', 'INTEGER NOT NULL'), ('employee_id', 'INTEGER NOT NULL'),
+         ('quantity', 'INTEGER NOT NULL'), ('total_price', 'REAL NOT NULL'),
+         ('sale_date', 'TEXT NOT NULL')),
+        _sale_to_row,
+        _sale_from_row
+    ),
+}
+
+# Индексы по внешним ключам продаж для выборок get_sales_by_*
+_SALE_INDEXES = ('customer_id', 'employee_id', 'book_id')
+
+
+class SQLiteTable(MutableMapping):
+    """Таблица SQLite с интерфейсом словаря ID -> сущность
+
+    Объекты создаются при каждом чтении, поэтому измененную сущность
+    нужно записать обратно присваиванием table[id] = entity.
+    """
+
+    def __init__(self, storage: 'SQLiteStorage', table: str):
+        columns, self._to_row, self._from_row = _TABLES[table]
+        names = [name for name, _ in columns]
+        key = names[0]
+        self._storage = storage
+        self.table = table
+        # SQL собирается один раз; sqlite3 кеширует подготовленные выражения
+        self._select = f"SELECT {', '.join(names)} FROM {table}"
+        self._select_one = f"{self._select} WHERE {key} = ?"
+        self._select_keys = f"SELECT {key} FROM {table} ORDER BY {key}"
+        self._exists = f"SELECT 1 FROM {table} WHERE {key} = ?"
+        self._count = f"SELECT COUNT(*) FROM {table}"
+        self._max_key = f"SELECT MAX({key}) FROM {table}"
+        self._upsert = (f"INSERT OR REPLACE INTO {table} ({', '.join(names)}) "
+                        f"VALUES ({', '.join('?' * len(names))})")
+        self._delete = f"DELETE FROM {table} WHERE {key} = ?"
+        self._delete_all = f"DELETE FROM {table}"
+        self._order = f" ORDER BY {key}"
+
+    def __getitem__(self, key: int) -> Any:
+        row = self._storage.query_one(self._select_one, (key,))
+        if row is None:
+            raise KeyError(key)
+        return self._from_row(row)
+
+    def __setitem__(self, key: int, entity: Any) -> None:
+        self._storage.execute(self._upsert, self._to_row(entity))
+
+    def __delitem__(self, key: int) -> None:
+        if self._storage.execute(self._delete, (key,)) == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return self._storage.query_one(self._exists, (key,)) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        for (key,) in self._storage.query(self._select_keys):
+            yield key
+
+    def __len__(self) -> int:
+        return self._storage.query_one(self._count)[0]
+
+    def values(self) -> Iterator[Any]:
+        """Потоковый обход сущностей без загрузки таблицы в память"""
+        return map(self._from_row, self._storage.query(self._select + self._order))
+
+    def items(self) -> Iterator[Tuple[int, Any]]:
+        """Потоковый обход пар ID -> сущность"""
+        return ((row[0], self._from_row(row)) for row in self._storage.query(self._select + self._order))
+
+    def max_key(self) -> int:
+        """Наибольший ключ таблицы (0, если она пуста)"""
+        return self._storage.query_one(self._max_key)[0] or 0
+
+    def total(self, expression: str) -> float:
+        """Сумма выражения над строками таблицы, вычисленная в SQLite"""
+        return self._storage.query_one(f"SELECT TOTAL({expression}) FROM {self.table}")[0]
+
+    def where(self, column: str, value: Any) -> List[Any]:
+        """Выборка сущностей по значению колонки"""
+        sql = f"{self._select} WHERE {column} = ?{self._order}"
+        return [self._from_row(row) for row in self._storage.query(sql, (value,))]
+
+    def clear(self) -> None:
+        self._storage.execute(self._delete_all)
+
+
+class SQLiteStorage:
+    """Хранилище во встраиваемой базе SQLite (режим WAL)
+
+    Каждое изменение вне batch() фиксируется сразу; внутри batch() все
+    изменения выполняются одной транзакцией и откатываются при ошибке.
+    """
+
+    # Выборки продаж по клиенту, сотруднику и книге идут через индексы SQLite
+    indexes_sales = True
+    # Ошибка внутри batch() откатывает все изменения группы
+    transactional = True
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._conn = sqlite3.connect(filename, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._depth = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for table, (columns, _, _) in _TABLES.items():
+                definition = ', '.join(f"{name} {kind}" for name, kind in columns)
+                self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definition})")
+            for column in _SALE_INDEXES:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS sales_{column} ON sales ({column})")
+
+        self.books = SQLiteTable(self, 'books')
+        self.employees = SQLiteTable(self, 'employees')
+        self.customers = SQLiteTable(self, 'customers')
+        self.sales = SQLiteTable(self, 'sales')
+
+    def execute(self, sql: str, params: tuple = ()) -> int:
+        """Выполнение изменяющего запроса; возвращает число затронутых строк"""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def query(self, sql: str, params: tuple = ()) -> Iterator[tuple]:
+        """Потоковое чтение строк запроса"""
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            yield from rows
+
+    def query_one(self, sql: str, params: tuple = ()) -> tuple:
+        """Первая строка запроса или None"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Группа изменений в одной транзакции (допускается вложенность)"""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        self._conn.execute("COMMIT")
+                    except BaseException:
+                        # Неудачная фиксация оставила бы транзакцию открытой
+                        self._conn.execute("ROLLBACK")
+                        raise
+
+    def find_sales(self, column: str, value: int) -> List[Sale]:
+        """Продажи с заданным значением внешнего ключа (через индекс SQLite)"""
+        return self.sales.where(column, value)
+
+    def max_id(self, table: str) -> int:
+        """Наибольший ID сущностей таблицы по первичному ключу, без чтения строк"""
+        return getattr(self, table).max_key()
+
+    def totals(self) -> Tuple[float, float]:
+        """Выручка и стоимость инвентаря, посчитанные запросами SUM в SQLite"""
+        return self.sales.total('total_price'), self.books.total('price * quantity')
+
+    def close(self) -> None:
+        """Закрытие соединения с базой"""
+        with self._lock:
+            self._conn.close()
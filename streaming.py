@@ -0,0 +1,270 @@
+# Модуль с потоковым чтением и записью снимков книжного магазина
+
+import codecs
+import gzip
+import json
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+try:
+    import zstandard
+except ImportError:  # необязательная зависимость для сжатия zstd
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+COMPRESSIONS = (None, 'gzip', 'zstd')
+
+_WHITESPACE = ' \t\n\r'
+_DECODER = json.JSONDecoder()
+
+
+class JsonSnapshotReader:
+    """Инкрементальный разбор JSON-снимка магазина с ограниченным буфером
+
+    Снимок - это объект верхнего уровня, у которого значения-массивы
+    (books, employees, customers, sales) разбираются поэлементно.
+    Итерация выдает пары (ключ, значение) для скалярных полей и
+    (ключ, элемент) для каждого элемента массива.
+    """
+
+    def __init__(self, file: BinaryIO, chunk_size: int = 1 << 16):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self.bytes_read = 0
+
+    def _fill(self) -> bool:
+        """Дочитать следующий блок файла в буфер; False в конце файла"""
+        if self._eof:
+            return False
+        data = self._file.read(self._chunk_size)
+        self.bytes_read += len(data)
+        if not data:
+            self._eof = True
+            self._buffer += self._decoder.decode(b'', final=True)
+            return False
+
+        # Отбрасываем уже разобранную часть буфера
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += self._decoder.decode(data)
+        return True
+
+    def _peek(self) -> str:
+        """Следующий значимый символ без его поглощения ('' в конце файла)"""
+        while True:
+            buffer = self._buffer
+            while self._pos < len(buffer) and buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(buffer) or not self._fill():
+                break
+        return self._buffer[self._pos:self._pos + 1]
+
+    def _expect(self, chars: str) -> str:
+        """Поглотить один из ожидаемых символов"""
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(f"ожидался один из символов {chars!r}, получено {char!r} "
+                             f"(байт {self.bytes_read})")
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """Разобрать очередное JSON-значение, дочитывая файл при необходимости"""
+        self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+                # Число на границе буфера могло быть обрезано - нужен следующий символ
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if self._peek() == '[':
+                self._pos += 1
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield key, self._value()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                yield key, self._value()
+            if self._expect(',}') == '}':
+                return
+
+
+def _require_zstandard() -> None:
+    """Проверка наличия модуля zstandard"""
+    if zstandard is None:
+        raise ValueError("для сжатия zstd требуется пакет zstandard")
+
+
+def open_decompressed(raw: BinaryIO) -> BinaryIO:
+    """Обертка над файлом, распаковывающая gzip/zstd по сигнатуре"""
+    magic = raw.peek(4)[:4]
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if magic == ZSTD_MAGIC:
+        _require_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(raw)
+    return raw
+
+
+def open_compressed(filename: str, compression: str = None) -> BinaryIO:
+    """Открытие файла на запись с необязательным сжатием gzip или zstd"""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"неизвестный тип сжатия: {compression}")
+    if compression == 'gzip':
+        return gzip.open(filename, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        _require_zstandard()
+        return zstandard.ZstdCompressor().stream_writer(open(filename, 'wb'))
+    return open(filename, 'wb')
+
+
+def iter_json_snapshot(filename: str, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+    """Потоковый обход JSON-снимка: пары (раздел, запись) с ограниченной памятью"""
+    with open(filename, 'rb') as raw, open_decompressed(raw) as f:
+        yield from JsonSnapshotReader(f, chunk_size)
+
+
+_INDENTED = json.JSONEncoder(ensure_ascii=False, indent=2)
+# Поля записи с отступом indent=2 на третьем уровне вложенности. Записи
+# разделов - плоские словари, поэтому их отступы задаются разделителем
+# кодировщика без indent: он работает на C, а с indent - на Python
+_RECORD_INDENT = '\n      '
+_INDENTED_RECORD = json.JSONEncoder(ensure_ascii=False, separators=(',' + _RECORD_INDENT, ': '))
+_COMPACT = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def write_json_snapshot(f: TextIO, header: Dict[str, Any],
+                        sections: Iterable[Tuple[str, Iterable[Dict[str, Any]]]],
+                        compact: bool = False) -> None:
+    """Потоковая запись JSON-снимка: записи выводятся по мере обхода разделов
+
+    Без compact результат побайтно совпадает с json.dump(..., indent=2)
+    (записи разделов должны быть плоскими словарями, как to_dict сущностей);
+    в компактном режиме нет отступов, а каждая запись начинается с новой строки.
+    """
+    if compact:
+        encode = _COMPACT.encode
+        f.write('{')
+        separator = ''
+        for key, value in header.items():
+            f.write(f'{separator}{encode(key)}:{encode(value)}')
+            separator = ','
+        for key, records in sections:
+            f.write(f'{separator}{encode(key)}:[')
+            separator = ','
+            prefix = '\n'
+            for record in records:
+                f.write(prefix)
+                f.write(encode(record))
+                prefix = ',\n'
+            f.write('\n]' if prefix != '\n' else ']')
+        f.write('}')
+        return
+
+    encode = _INDENTED.encode
+    encode_record = _INDENTED_RECORD.encode
+    f.write('{')
+    separator = '\n  '
+    for key, value in header.items():
+        f.write(f'{separator}{encode(key)}: {encode(value)}')
+        separator = ',\n  '
+    for key, records in sections:
+        f.write(f'{separator}{encode(key)}: [')
+        separator = ',\n  '
+        prefix = '\n    '
+        for record in records:
+            text = encode_record(record)
+            if text == '{}':
+                f.write(f'{prefix}{{}}')
+            else:
+                f.write(f'{prefix}{{{_RECORD_INDENT}{text[1:-1]}\n    }}')
+            prefix = ',\n    '
+        f.write('\n  ]' if prefix != '\n    ' else ']')
+    f.write('\n}' if separator != '\n  ' else '}')
+
+
+def _escape_xml(text: str) -> str:
+    """Экранирование текста XML так же, как это делает ElementTree"""
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def _xml_element(tag: str, text: Optional[str]) -> str:
+    """Сериализация простого элемента с текстом"""
+    if not text:
+        return f'<{tag} />'
+    return f'<{tag}>{_escape_xml(text)}</{tag}>'
+
+
+def write_xml_snapshot(f: TextIO, name: Optional[str], counters: Dict[str, int],
+                       sections: Iterable[Tuple[str, str, Tuple[str, ...], Iterable[tuple]]],
+                       extras: Dict[str, Any] = None, batch_size: int = 1000) -> None:
+    """Потоковая запись XML-снимка, побайтно совпадающая с выводом ElementTree
+
+    sections - кортежи (тег раздела, тег записи, теги полей, строки значений);
+    значения строки соответствуют тегам полей и выводятся через str().
+    extras - необязательные элементы верхнего уровня после счетчиков.
+    """
+    f.write("<?xml version='1.0' encoding='utf-8'?>\n<bookstore>")
+    f.write(_xml_element('name', name))
+    f.write('<id_counters>')
+    f.write(''.join(_xml_element(tag, str(value)) for tag, value in counters.items()))
+    f.write('</id_counters>')
+    for tag, value in (extras or {}).items():
+        f.write(_xml_element(tag, str(value)))
+
+    for section_tag, record_tag, fields, rows in sections:
+        # Шаблон записи собираем один раз на раздел
+        template = ''.join(f'<{field}>{{}}</{field}>' for field in fields)
+        template = f'<{record_tag}>{template}</{record_tag}>'.format
+        opened = False
+        batch = []
+        for row in rows:
+            values = [value if type(value) is str else str(value) for value in row]
+            if '' in values:
+                # Пустые значения ElementTree пишет как <tag />
+                batch.append(f'<{record_tag}>' +
+                             ''.join(map(_xml_element, fields, values)) +
+                             f'</{record_tag}>')
+            else:
+                batch.append(template(*map(_escape_xml, values)))
+            if len(batch) >= batch_size:
+                if not opened:
+                    f.write(f'<{section_tag}>')
+                    opened = True
+                f.write(''.join(batch))
+                batch.clear()
+        if batch:
+            if not opened:
+                f.write(f'<{section_tag}>')
+                opened = True
+            f.write(''.join(batch))
+        f.write(f'</{section_tag}>' if opened else f'<{section_tag} />')
+
+    f.write('</bookstore>')
@@ -0,0 +1,30 @@
+# Общие настройки тестов: модули магазина лежат в корне репозитория
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from bookstore import Bookstore
+from classes import Book, Customer, Employee
+
+
+def build_store(sales: int = 0, books: int = 10, name: str = "Тест", **options) -> Bookstore:
+    """Небольшой магазин с книгами, клиентом, сотрудником и продажами"""
+    bookstore = Bookstore(name, **options)
+    for book_id in range(1, books + 1):
+        bookstore.add_book(Book(book_id, f"Книга {book_id}", f"Автор {book_id % 3}", "Роман",
+                                100.0 + book_id, 10 ** 6, 2000))
+    bookstore.add_employee(Employee(1, "Сотрудник", "Продавец", 50000.0))
+    bookstore.add_customer(Customer(1, "Клиент", "client@example.com", "+70000000000"))
+    for number in range(sales):
+        bookstore.sell_book(number % books + 1, 1 + number % 3, 1, 1)
+    return bookstore
+
+
+@pytest.fixture
+def make_store():
+    """Фабрика небольших магазинов для тестов"""
+    return build_store
@@ -0,0 +1,33 @@
+# Тесты колоночной аналитики продаж
+
+import math
+
+import pytest
+
+pytest.importorskip('numpy')
+
+
+def test_totals_after_reloading_larger_file(make_store, tmp_path):
+    filename = str(tmp_path / 'big.json')
+    big = make_store(2000, books=7)
+    big.save_to_json(filename)
+    expected = big.get_total_revenue()
+
+    bookstore = make_store(1000)
+    assert bookstore.get_sales_analytics().total()['sales'] == 1000
+
+    bookstore.load_from_json(filename)
+    total = bookstore.get_sales_analytics().total()
+    assert total['sales'] == 2000
+    assert math.isclose(total['revenue'], expected)
+
+
+def test_totals_after_reloading_smaller_file(make_store, tmp_path):
+    filename = str(tmp_path / 'small.json')
+    small = make_store(100, books=7)
+    small.save_to_json(filename)
+
+    bookstore = make_store(300)
+    bookstore.get_sales_analytics()
+    bookstore.load_from_json(filename)
+    assert math.isclose(bookstore.get_sales_analytics().total()['revenue'], small.get_total_revenue())
@@ -0,0 +1,61 @@
+# Тесты снимков данных для фоновой записи
+
+import json
+
+import pytest
+
+from bookstore import Bookstore
+from classes import Customer
+from sales_history import FrozenPrefix
+
+
+def _write_and_load(bookstore, view, filename):
+    """Запись представления в JSON и загрузка в новый магазин"""
+    bookstore._write_json(view, filename)
+    loaded = Bookstore("Копия")
+    loaded.load_from_json(filename)
+    return loaded
+
+
+def test_frozen_view_ignores_later_changes(make_store, tmp_path):
+    bookstore = make_store(20, books=5, thread_safe=True)
+    view = bookstore._frozen_view()
+    quantity = bookstore.books[1].quantity
+
+    for _ in range(5):
+        bookstore.sell_book(1, 2, 1, 1)
+    bookstore.add_customer(Customer(0, "Новый", "new@example.com", "+70000000001"))
+
+    loaded = _write_and_load(bookstore, view, str(tmp_path / 'frozen.json'))
+    assert len(loaded.sales) == 20
+    assert len(loaded.customers) == 1
+    assert loaded.books[1].quantity == quantity
+    assert len(bookstore.sales) == 25
+
+
+def test_frozen_view_over_archived_sales(make_store, tmp_path):
+    bookstore = make_store(30, books=5)
+    bookstore.archive_sales(str(tmp_path / 'archive.bin'))
+    bookstore.sell_book(2, 1, 1, 1)
+    view = bookstore._frozen_view()
+    bookstore.sell_book(3, 1, 1, 1)
+
+    filename = str(tmp_path / 'frozen.json')
+    loaded = _write_and_load(bookstore, view, filename)
+    assert sorted(loaded.sales) == list(range(1, 32))
+    with open(filename, encoding='utf-8') as f:
+        assert len(json.load(f)['sales']) == 31
+    bookstore.close()
+
+
+def test_frozen_prefix_rejects_removed_entries():
+    data = {1: 'a', 2: 'b', 3: 'c'}
+    prefix = FrozenPrefix(data)
+    data[4] = 'd'
+    assert list(prefix) == [1, 2, 3]
+    assert prefix.values() == ['a', 'b', 'c']
+
+    del data[4]
+    del data[3]
+    with pytest.raises(RuntimeError):
+        prefix.values()
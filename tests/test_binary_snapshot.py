@@ -0,0 +1,67 @@
+# Тесты двоичного снимка: полный цикл через JSON и поврежденные файлы
+
+import math
+import struct
+
+import pytest
+
+from binary_snapshot import MAGIC, VERSION
+from bookstore import Bookstore
+from exceptions import FileOperationError
+
+
+def _contents(bookstore):
+    """Все сущности магазина в виде словарей для сравнения"""
+    return {
+        'books': [book.to_dict() for book in bookstore.books.values()],
+        'employees': [emp.to_dict() for emp in bookstore.employees.values()],
+        'customers': [cust.to_dict() for cust in bookstore.customers.values()],
+        'sales': sorted((sale.to_dict() for sale in bookstore.sales.values()), key=lambda sale: sale['sale_id']),
+    }
+
+
+@pytest.mark.parametrize('lazy_sales', [False, True])
+def test_json_binary_round_trip(make_store, tmp_path, lazy_sales):
+    json_file = str(tmp_path / 'store.json')
+    binary_file = str(tmp_path / 'store.bin')
+    make_store(50, books=7).save_to_json(json_file)
+
+    source = Bookstore("Источник")
+    source.load_from_json(json_file)
+    source.save_to_binary(binary_file)
+
+    loaded = Bookstore("Копия")
+    loaded.load_from_binary(binary_file, lazy_sales=lazy_sales)
+    assert loaded.name == source.name
+    assert _contents(loaded) == _contents(source)
+    assert math.isclose(loaded.get_total_revenue(), source.get_total_revenue())
+    assert loaded.sell_book(1, 1, 1, 1).sale_id == 51
+    loaded.close()
+
+
+@pytest.mark.parametrize('keep', [0.5, 0.99, 10])
+def test_truncated_snapshot(make_store, tmp_path, keep):
+    filename = str(tmp_path / 'store.bin')
+    make_store(50).save_to_binary(filename)
+    with open(filename, 'rb') as f:
+        data = f.read()
+    with open(filename, 'wb') as f:
+        f.write(data[:int(len(data) * keep) if keep < 1 else keep])
+
+    bookstore = make_store(3)
+    with pytest.raises(FileOperationError):
+        bookstore.load_from_binary(filename)
+    # Данные магазина не затронуты неудачной загрузкой
+    assert len(bookstore.sales) == 3
+
+
+def test_wrong_version_snapshot(make_store, tmp_path):
+    filename = str(tmp_path / 'store.bin')
+    make_store(5).save_to_binary(filename)
+    with open(filename, 'r+b') as f:
+        f.seek(len(MAGIC))
+        f.write(struct.pack('<I', VERSION + 1))
+
+    bookstore = Bookstore("Тест")
+    with pytest.raises(FileOperationError, match=f"версия двоичного снимка: {VERSION + 1}"):
+        bookstore.load_from_binary(filename)
@@ -0,0 +1,70 @@
+# Тесты оформления корзины: откат при сбое посреди корзины
+
+import pytest
+
+from exceptions import BookstoreError
+from storage import SQLiteStorage
+
+
+def _state(bookstore):
+    """Все, что должна восстановить отмененная корзина"""
+    return {
+        'stock': {book_id: book.quantity for book_id, book in bookstore.books.items()},
+        'sales': sorted(bookstore.sales),
+        'revenue': round(bookstore.get_total_revenue(), 6),
+        'inventory': round(bookstore.get_inventory_value(), 6),
+        'by_customer': [sale.sale_id for sale in bookstore.get_sales_by_customer(1)],
+        'by_employee': [sale.sale_id for sale in bookstore.get_sales_by_employee(1)],
+        'by_book': {book_id: [sale.sale_id for sale in bookstore.get_book_sales(book_id)]
+                    for book_id in bookstore.books},
+        'next_sale_id': bookstore._next_sale_id,
+    }
+
+
+def _fail_on_call(bookstore, monkeypatch, method, number):
+    """Сбой метода магазина на вызове с номером number"""
+    original = getattr(bookstore, method)
+    calls = []
+
+    def failing(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == number:
+            raise RuntimeError("сбой посреди корзины")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(bookstore, method, failing)
+
+
+@pytest.fixture(params=['memory', 'thread_safe', 'sqlite'])
+def store(request, make_store, tmp_path):
+    """Магазин с продажами в каждом из режимов хранения"""
+    if request.param == 'sqlite':
+        bookstore = make_store(5, storage=SQLiteStorage(str(tmp_path / 'store.db')))
+    else:
+        bookstore = make_store(5, thread_safe=request.param == 'thread_safe')
+    yield bookstore
+    bookstore.close()
+
+
+@pytest.mark.parametrize('method', ['_index_sale', '_account_sale'])
+def test_failure_in_the_middle_of_basket(store, monkeypatch, method):
+    before = _state(store)
+    _fail_on_call(store, monkeypatch, method, 3)
+
+    with pytest.raises(BookstoreError):
+        store.checkout([(1, 1), (2, 2), (3, 1), (4, 3)], 1, 1)
+
+    monkeypatch.undo()
+    assert _state(store) == before
+    assert store.verify_aggregates()
+    # Следующая продажа получает ID сразу после прежних
+    assert store.sell_book(1, 1, 1, 1).sale_id == before['next_sale_id']
+
+
+def test_successful_basket(store):
+    before = _state(store)
+    sales = store.checkout([(1, 1), (2, 2), (1, 1)], 1, 1)
+
+    assert [sale.sale_id for sale in sales] == [6, 7, 8]
+    assert store.books[1].quantity == before['stock'][1] - 2
+    assert store.verify_aggregates()
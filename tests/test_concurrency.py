@@ -0,0 +1,160 @@
+# Тесты параллельной работы с магазином в режиме thread_safe
+
+import contextlib
+import io
+import random
+import sys
+import threading
+
+import pytest
+
+from bookstore import Bookstore
+from classes import Book, Customer, Employee
+from exceptions import InsufficientQuantityError
+from journal import Journal
+
+BOOKS = 20
+STOCK = 300
+
+
+@pytest.fixture(autouse=True)
+def fast_switching():
+    """Частое переключение потоков повышает шанс поймать гонку"""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _store() -> Bookstore:
+    """Магазин, в котором спрос заметно превышает остатки"""
+    bookstore = Bookstore("Нагрузка", thread_safe=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for book_id in range(1, BOOKS + 1):
+            bookstore.add_book(Book(book_id, f"Книга {book_id}", "Автор", "Роман", 100.0 + book_id, STOCK, 2000))
+        bookstore.add_customer(Customer(1, "Покупатель", "buyer@mail.com", "+7-000"))
+        bookstore.add_employee(Employee(1, "Продавец", "Кассир", 30000.0))
+    return bookstore
+
+
+def _run(*targets) -> None:
+    """Запуск функций в отдельных потоках с передачей первой ошибки"""
+    errors = []
+
+    def run(target):
+        try:
+            target()
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+
+def _seller(bookstore: Bookstore, seed: int, operations: int = 1500):
+    """Поток случайных продаж и корзин"""
+    def sell():
+        rng = random.Random(seed)
+        for _ in range(operations):
+            try:
+                if rng.random() < 0.2:
+                    basket = [(rng.randint(1, BOOKS), rng.randint(1, 2)) for _ in range(3)]
+                    bookstore.checkout(basket, 1, 1)
+                else:
+                    bookstore.sell_book(rng.randint(1, BOOKS), rng.randint(1, 3), 1, 1)
+            except InsufficientQuantityError:
+                pass
+    return sell
+
+
+def test_concurrent_sales_do_not_oversell():
+    bookstore = _store()
+    _run(*(_seller(bookstore, seed) for seed in range(8)))
+
+    sold = {}
+    for sale in bookstore.sales.values():
+        sold[sale.book_id] = sold.get(sale.book_id, 0) + sale.quantity
+    for book_id in range(1, BOOKS + 1):
+        quantity = bookstore.books[book_id].quantity if book_id in bookstore.books else 0
+        assert quantity >= 0
+        assert quantity + sold.get(book_id, 0) == STOCK
+
+    sale_ids = sorted(bookstore.sales)
+    assert sale_ids == list(range(1, len(sale_ids) + 1))
+    assert bookstore.verify_aggregates()
+    assert sorted(sale.sale_id for sale in bookstore.get_sales_by_customer(1)) == sale_ids
+    assert sum(len(bookstore.get_book_sales(book_id)) for book_id in range(1, BOOKS + 1)) == len(sale_ids)
+
+    # Новая продажа получает следующий ID без пропуска
+    with contextlib.redirect_stdout(io.StringIO()):
+        bookstore.add_book(Book(BOOKS + 1, "Новая", "Автор", "Роман", 100.0, 1, 2000))
+        assert bookstore.sell_book(BOOKS + 1, 1, 1, 1).sale_id == len(sale_ids) + 1
+
+
+def test_search_during_add_book():
+    bookstore = _store()
+    added = 2000
+
+    def add():
+        for number in range(added):
+            bookstore.add_book(Book(0, f"Новинка {number}", "Автор", "Поэзия", 100.0 + number % 50, 1, 2000))
+
+    def search():
+        for _ in range(300):
+            # Короткий запрос перебирает значения индекса целиком
+            bookstore.search_books(title="Но")
+            bookstore.search_books(genre="Поэзия")
+            bookstore.search_books(min_price=120, max_price=130)
+            bookstore.find_books_by_price(120, 130)
+
+    _run(add, search, search)
+    assert len(bookstore.search_books(genre="Поэзия")) == added
+
+
+def test_checkpoint_during_sales_recovers(tmp_path):
+    snapshot = str(tmp_path / 'snapshot.json')
+    journal_file = str(tmp_path / 'journal.log')
+    bookstore = _store()
+    bookstore.attach_journal(Journal(journal_file, sync_interval=0))
+
+    def checkpoints():
+        for _ in range(5):
+            bookstore.checkpoint(snapshot)
+
+    _run(checkpoints, *(_seller(bookstore, seed, 500) for seed in range(4)))
+    bookstore.detach_journal().close()
+
+    restored = Bookstore("Восстановление")
+    with contextlib.redirect_stdout(io.StringIO()):
+        restored.recover(journal_file, snapshot)
+    assert sorted(restored.sales) == sorted(bookstore.sales)
+    assert {book_id: book.quantity for book_id, book in restored.books.items()} == \
+        {book_id: book.quantity for book_id, book in bookstore.books.items()}
+    assert restored.verify_aggregates()
+
+
+def test_archive_during_sales_keeps_every_sale(tmp_path):
+    bookstore = _store()
+
+    def archive():
+        for number in range(5):
+            bookstore.archive_sales(str(tmp_path / f'archive{number}.bin'))
+
+    _run(archive, *(_seller(bookstore, seed, 500) for seed in range(4)))
+
+    sold = {}
+    for sale in bookstore.sales.values():
+        sold[sale.book_id] = sold.get(sale.book_id, 0) + sale.quantity
+    for book_id in range(1, BOOKS + 1):
+        quantity = bookstore.books[book_id].quantity if book_id in bookstore.books else 0
+        assert quantity + sold.get(book_id, 0) == STOCK
+    sale_ids = sorted(bookstore.sales)
+    assert sale_ids == list(range(1, len(sale_ids) + 1))
+    assert bookstore.verify_aggregates()
+    bookstore.close()
@@ -0,0 +1,80 @@
+# Тесты индексов поиска: диапазонные запросы против линейного перебора
+
+import random
+
+import pytest
+
+from bookstore import Bookstore
+from classes import Book
+from indexes import SortedIndex
+
+
+def _in_range(value, low, high):
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def test_sorted_index_count_matches_range(monkeypatch):
+    # Маленькие блоки, чтобы проверить деление и удаление блоков
+    monkeypatch.setattr(SortedIndex, 'LOAD', 4)
+    rng = random.Random(7)
+    index, values = SortedIndex(), {}
+    for key in range(1000):
+        action = rng.random()
+        if action < 0.6 or not values:
+            values[key] = rng.randint(0, 40)
+            index.add(key, values[key])
+        elif action < 0.85:
+            index.remove(values.popitem()[0])
+        elif action < 0.95:
+            changed = rng.choice(list(values))
+            values[changed] = rng.randint(0, 40)
+            index.update(changed, values[changed])
+        else:
+            loaded = {10 ** 6 + key * 100 + i: rng.randint(0, 40) for i in range(rng.randint(1, 15))}
+            index.load(loaded.items())
+            values.update(loaded)
+
+        low, high = rng.choice([None, rng.randint(-2, 42)]), rng.choice([None, rng.randint(-2, 42)])
+        expected = sorted((value, key) for key, value in values.items() if _in_range(value, low, high))
+        assert index.count(low, high) == len(expected)
+        assert sorted(values[key] for key in index.range(low, high)) == [value for value, _ in expected]
+
+
+def test_range_search_matches_linear_filter(monkeypatch, capsys):
+    monkeypatch.setattr(SortedIndex, 'LOAD', 8)
+    rng = random.Random(3)
+    bookstore = Bookstore("Поиск")
+    for book_id in range(1, 301):
+        bookstore.add_book(Book(book_id, f"Книга {book_id}", "Автор", "Роман",
+                                float(rng.randint(100, 200)), 5, rng.randint(1990, 2020)))
+    for book_id in rng.sample(range(1, 301), 40):
+        bookstore.update_book_price(book_id, float(rng.randint(100, 200)))
+    for book_id in rng.sample(range(1, 301), 30):
+        bookstore.remove_book(book_id, 5)
+    capsys.readouterr()
+
+    for _ in range(200):
+        criteria = {
+            'min_price': rng.choice([None, rng.randint(95, 205)]),
+            'max_price': rng.choice([None, rng.randint(95, 205)]),
+            'min_year': rng.choice([None, rng.randint(1988, 2022)]),
+            'max_year': rng.choice([None, rng.randint(1988, 2022)]),
+        }
+        expected = [book.book_id for book in bookstore.books.values()
+                    if _in_range(book.price, criteria['min_price'], criteria['max_price'])
+                    and _in_range(book.year, criteria['min_year'], criteria['max_year'])]
+        assert [book.book_id for book in bookstore.search_books(**criteria)] == expected
+
+        by_price = bookstore.find_books_by_price(criteria['min_price'], criteria['max_price'])
+        assert sorted(book.book_id for book in by_price) == sorted(
+            book.book_id for book in bookstore.books.values()
+            if _in_range(book.price, criteria['min_price'], criteria['max_price']))
+        assert [book.price for book in by_price] == sorted(book.price for book in by_price)
+
+
+@pytest.mark.parametrize('low, high', [(None, None), (150, 120), (500, None), (None, 50)])
+def test_empty_and_full_ranges(low, high):
+    index = SortedIndex()
+    index.load((key, 100.0 + key % 60) for key in range(500))
+    expected = sum(1 for key in range(500) if _in_range(100.0 + key % 60, low, high))
+    assert index.count(low, high) == len(index.range(low, high)) == expected
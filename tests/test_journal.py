@@ -0,0 +1,135 @@
+# Тесты журнала предзаписи и контрольных точек
+
+import json
+
+import pytest
+
+from bookstore import Bookstore
+from classes import Book, Customer, Employee
+from exceptions import BookstoreError, FileOperationError
+from journal import Journal, read_journal
+from storage import SQLiteStorage
+
+
+def test_recover_replays_journal_over_checkpoint(make_store, tmp_path):
+    snapshot, log = str(tmp_path / 'snapshot.json'), str(tmp_path / 'journal.log')
+    bookstore = make_store(5)
+    bookstore.attach_journal(Journal(log))
+    bookstore.checkpoint(snapshot)
+    for _ in range(3):
+        bookstore.sell_book(1, 1, 1, 1)
+    bookstore.detach_journal().close()
+
+    restored = Bookstore("Восстановленный")
+    assert restored.recover(log, snapshot) == 3
+    assert sorted(restored.sales) == sorted(bookstore.sales)
+    assert restored.books[1].quantity == bookstore.books[1].quantity
+
+
+def test_checkpoint_keeps_changes_made_during_write(make_store, tmp_path, monkeypatch):
+    snapshot, log = str(tmp_path / 'snapshot.json'), str(tmp_path / 'journal.log')
+    bookstore = make_store(5)
+    bookstore.attach_journal(Journal(log))
+    bookstore.sell_book(1, 1, 1, 1)
+
+    replace_file = Bookstore._replace_file
+
+    def write_with_concurrent_sale(self, *args):
+        # Продажа после снятия данных снимка, но до очистки журнала
+        self.sell_book(2, 1, 1, 1)
+        replace_file(self, *args)
+
+    monkeypatch.setattr(Bookstore, '_replace_file', write_with_concurrent_sale)
+    bookstore.checkpoint(snapshot)
+    monkeypatch.undo()
+    bookstore.detach_journal().close()
+
+    assert [record['op'] for record in read_journal(log)] == ['sell']
+    restored = Bookstore("Восстановленный")
+    restored.recover(log, snapshot)
+    assert sorted(restored.sales) == sorted(bookstore.sales)
+    assert restored.books[2].quantity == bookstore.books[2].quantity
+
+
+def test_failed_checkpoint_keeps_previous_snapshot(make_store, tmp_path, monkeypatch):
+    snapshot, log = str(tmp_path / 'snapshot.json'), str(tmp_path / 'journal.log')
+    bookstore = make_store(2)
+    bookstore.attach_journal(Journal(log))
+    bookstore.checkpoint(snapshot)
+    with open(snapshot, encoding='utf-8') as f:
+        previous = f.read()
+    bookstore.sell_book(1, 1, 1, 1)
+
+    def broken_write(self, view, filename, **options):
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('{"name": "обрыв')
+        raise OSError("нет места на диске")
+
+    monkeypatch.setattr(Bookstore, '_write_json', broken_write)
+    with pytest.raises(FileOperationError):
+        bookstore.checkpoint(snapshot)
+
+    with open(snapshot, encoding='utf-8') as f:
+        assert f.read() == previous
+    assert not (tmp_path / 'snapshot.json.tmp').exists()
+    # Журнал не очищен: продажа после прежнего снимка восстановима
+    bookstore.detach_journal().close()
+    assert len(json.loads(previous)['sales']) == 2
+    assert [record['op'] for record in read_journal(log)] == ['sell']
+
+
+def _store_state(bookstore):
+    """Данные, счетчики и агрегаты магазина для сравнения"""
+    return {
+        'books': {book_id: (book.quantity, book.price) for book_id, book in bookstore.books.items()},
+        'sales': sorted(bookstore.sales),
+        'customers': sorted(bookstore.customers),
+        'employees': sorted(bookstore.employees),
+        'by_book': [sale.sale_id for sale in bookstore.get_book_sales(1)],
+        'search': [book.book_id for book in bookstore.search_books(title="Книга")],
+        'revenue': round(bookstore.get_total_revenue(), 6),
+        'inventory': round(bookstore.get_inventory_value(), 6),
+        'counters': (bookstore._next_book_id, bookstore._next_emp_id,
+                     bookstore._next_cust_id, bookstore._next_sale_id, bookstore._journal_lsn),
+    }
+
+
+@pytest.mark.parametrize('mode', ['memory', 'thread_safe', 'sqlite'])
+@pytest.mark.parametrize('operation', [
+    lambda store: store.sell_book(1, 1, 1, 1),
+    lambda store: store.checkout([(1, 1), (2, 2)], 1, 1),
+    lambda store: store.add_book(Book(0, "Новая", "Автор", "Роман", 100.0, 5, 2000)),
+    lambda store: store.add_book(Book(1, "Книга 1", "Автор 1", "Роман", 101.0, 5, 2000)),
+    lambda store: store.add_customer(Customer(0, "Новый", "new@example.com", "+70000000001")),
+    lambda store: store.add_employee(Employee(0, "Новый", "Продавец", 40000.0)),
+    lambda store: store.remove_book(3, store.books[3].quantity),
+    lambda store: store.update_book_price(1, 500.0),
+], ids=['sell', 'checkout', 'add_book', 'merge_book', 'add_customer', 'add_employee',
+        'remove_book', 'set_price'])
+def test_failed_journal_append_leaves_store_unchanged(make_store, tmp_path, monkeypatch,
+                                                      operation, mode):
+    log = str(tmp_path / 'journal.log')
+    if mode == 'sqlite':
+        bookstore = make_store(5, storage=SQLiteStorage(str(tmp_path / 'store.db')))
+    else:
+        bookstore = make_store(5, thread_safe=mode == 'thread_safe')
+    journal = Journal(log)
+    bookstore.attach_journal(journal)
+    bookstore.sell_book(2, 1, 1, 1)
+    before = _store_state(bookstore)
+
+    def broken_append(record):
+        raise OSError("нет места на диске")
+
+    monkeypatch.setattr(journal, 'append', broken_append)
+    with pytest.raises(BookstoreError):
+        operation(bookstore)
+    monkeypatch.undo()
+
+    assert _store_state(bookstore) == before
+    assert bookstore.verify_aggregates()
+    # После сбоя журнал продолжается без пропуска LSN
+    operation(bookstore)
+    bookstore.detach_journal().close()
+    assert [record['lsn'] for record in read_journal(log)] == [1, 2]
+    bookstore.close()
@@ -0,0 +1,34 @@
+# Тесты массовой загрузки готовых сущностей
+
+import math
+
+from bookstore import Bookstore
+from classes import Book
+
+
+def test_load_entities_rebuilds_counters_and_indexes(make_store):
+    source = make_store(30, books=5)
+    bookstore = Bookstore("Копия")
+    bookstore.load_entities(books=list(source.books.values()),
+                            employees=list(source.employees.values()),
+                            customers=list(source.customers.values()),
+                            sales=list(source.sales.values()))
+
+    assert len(bookstore.sales) == 30
+    assert math.isclose(bookstore.get_total_revenue(), source.get_total_revenue())
+    assert [sale.sale_id for sale in bookstore.get_sales_by_customer(1)] == list(range(1, 31))
+    assert [book.book_id for book in bookstore.search_books(title="Книга 3")] == [3]
+
+    bookstore.add_book(Book(0, "Новая", "Автор", "Роман", 100.0, 1, 2000))
+    assert 6 in bookstore.books
+    bookstore.sell_book(1, 1, 1, 1)
+    assert max(bookstore.sales) == 31
+
+
+def test_load_entities_replaces_previous_data(make_store):
+    bookstore = make_store(10)
+    bookstore.load_entities(books=[Book(7, "Одна", "Автор", "Роман", 50.0, 3, 2000)])
+
+    assert list(bookstore.books) == [7]
+    assert not bookstore.sales and not bookstore.customers
+    assert bookstore.get_total_revenue() == 0
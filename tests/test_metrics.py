@@ -0,0 +1,106 @@
+# Тесты метрик вызовов: обертки методов, ошибки по классам и формат Prometheus
+
+import math
+
+import pytest
+
+from bookstore import Bookstore
+from exceptions import BookNotFoundError, InsufficientQuantityError
+from manager import BookstoreManager
+from metrics import Metrics, instrument, uninstrument
+
+
+def test_instrument_and_uninstrument_restore_methods(make_store, tmp_path):
+    bookstore = make_store(2)
+    other = make_store()
+    metrics = instrument(bookstore, methods=['sell_book', 'save_to_json'])
+
+    # Обертки стоят только на экземпляре, класс и другие магазины не затронуты
+    assert {'sell_book', 'save_to_json'} <= set(vars(bookstore))
+    assert 'sell_book' not in vars(other)
+    bookstore.sell_book(1, 1, 1, 1)
+    bookstore.save_to_json(str(tmp_path / 'store.json'))
+    operations = metrics.snapshot()['operations']
+    assert operations['sell_book']['calls'] == 1 and operations['sell_book']['kind'] == 'method'
+    assert operations['save_to_json']['kind'] == 'file'
+
+    # Повторное включение заменяет реестр, а не оборачивает обертку
+    replacement = instrument(bookstore, methods=['sell_book'])
+    bookstore.sell_book(1, 1, 1, 1)
+    assert replacement.snapshot()['operations']['sell_book']['calls'] == 1
+    assert metrics.snapshot()['operations']['sell_book']['calls'] == 1
+
+    uninstrument(bookstore)
+    assert 'sell_book' not in vars(bookstore) and 'save_to_json' not in vars(bookstore)
+    assert bookstore.sell_book.__func__ is Bookstore.sell_book
+    bookstore.sell_book(1, 1, 1, 1)
+    assert replacement.snapshot()['operations']['sell_book']['calls'] == 1
+
+
+def test_errors_counted_by_exception_class(make_store):
+    bookstore = make_store()
+    metrics = bookstore.enable_metrics()
+    bookstore.sell_book(1, 1, 1, 1)
+    with pytest.raises(InsufficientQuantityError):
+        bookstore.sell_book(1, 10 ** 7, 1, 1)
+    for _ in range(2):
+        with pytest.raises(BookNotFoundError):
+            bookstore.sell_book(999, 1, 1, 1)
+
+    stats = metrics.snapshot()['operations']['sell_book']
+    assert stats['calls'] == 4
+    assert stats['errors'] == {'InsufficientQuantityError': 1, 'BookNotFoundError': 2}
+    assert stats['histogram'][math.inf] == 4
+    assert math.isclose(stats['mean_seconds'], stats['total_seconds'] / 4)
+
+    assert bookstore.disable_metrics() is metrics
+    bookstore.sell_book(1, 1, 1, 1)
+    assert metrics.snapshot()['operations']['sell_book']['calls'] == 4
+
+
+def test_prometheus_text_format():
+    metrics = Metrics(buckets=(0.001, 0.1))
+    metrics.observe('sell_book', 0.0005)
+    metrics.observe('sell_book', 0.05, InsufficientQuantityError("нет"))
+    metrics.observe('save_to_json', 2.0, kind='file')
+    metrics.record_handled_error('sell "1"', BookNotFoundError("нет"))
+
+    lines = metrics.to_prometheus('shop').splitlines()
+    assert '# TYPE shop_calls_total counter' in lines
+    assert 'shop_calls_total{method="sell_book",kind="method"} 2' in lines
+    assert 'shop_calls_total{method="save_to_json",kind="file"} 1' in lines
+    assert 'shop_errors_total{method="sell_book",kind="method",error="InsufficientQuantityError"} 1' in lines
+    assert '# TYPE shop_latency_seconds histogram' in lines
+    # Корзины гистограммы накопительные, последняя - +Inf
+    assert 'shop_latency_seconds_bucket{method="sell_book",kind="method",le="0.001"} 1' in lines
+    assert 'shop_latency_seconds_bucket{method="sell_book",kind="method",le="0.1"} 2' in lines
+    assert 'shop_latency_seconds_bucket{method="save_to_json",kind="file",le="0.1"} 0' in lines
+    assert 'shop_latency_seconds_bucket{method="save_to_json",kind="file",le="+Inf"} 1' in lines
+    assert 'shop_latency_seconds_sum{method="save_to_json",kind="file"} 2.0' in lines
+    assert 'shop_latency_seconds_count{method="sell_book",kind="method"} 2' in lines
+    assert 'shop_handled_errors_total{operation="sell \\"1\\"",error="BookNotFoundError"} 1' in lines
+
+    metrics.reset()
+    assert not any(line.startswith('shop_') for line in metrics.to_prometheus('shop').splitlines())
+
+
+def test_manager_counts_handled_errors(make_store, capsys):
+    bookstore = make_store()
+    metrics = bookstore.enable_metrics()
+    manager = BookstoreManager(bookstore)
+
+    assert manager.safe_execute(bookstore.sell_book, 999, 1, 1, 1) is None
+    assert manager.safe_execute(bookstore.sell_book, 1, 10 ** 7, 1, 1) is None
+    assert manager.safe_execute(int, "не число") is None
+    assert manager.safe_execute(bookstore.sell_book, 1, 1, 1, 1) is not None
+    assert "Ошибка в работе магазина" in capsys.readouterr().out
+
+    assert metrics.snapshot()['handled_errors'] == {
+        'sell_book': {'BookNotFoundError': 1, 'InsufficientQuantityError': 1},
+        'int': {'ValueError': 1},
+    }
+    # Отдельный реестр менеджера имеет приоритет над реестром магазина
+    own = Metrics()
+    BookstoreManager(bookstore, own).safe_execute(bookstore.sell_book, 999, 1, 1, 1)
+    assert own.snapshot()['handled_errors'] == {'sell_book': {'BookNotFoundError': 1}}
+    assert metrics.snapshot()['handled_errors']['sell_book']['BookNotFoundError'] == 1
@@ -0,0 +1,94 @@
+# Тесты параллельной загрузки снимков в пуле процессов
+
+import json
+import threading
+
+import pytest
+
+from bookstore import Bookstore
+from conftest import build_store
+from exceptions import FileOperationError
+
+SALES = 2500  # больше одной части раздела: проверяется порядок сборки
+
+
+def _contents(bookstore):
+    """Сущности, счетчики и агрегаты магазина для сравнения"""
+    return {
+        'books': [book.to_dict() for book in bookstore.books.values()],
+        'employees': [emp.to_dict() for emp in bookstore.employees.values()],
+        'customers': [cust.to_dict() for cust in bookstore.customers.values()],
+        'sales': [sale.to_dict() for sale in bookstore.sales.values()],
+        'search': [book.book_id for book in bookstore.search_books(author="Автор 1")],
+        'by_customer': [sale.sale_id for sale in bookstore.get_sales_by_customer(1)],
+        'revenue': round(bookstore.get_total_revenue(), 6),
+        'next_sale_id': bookstore._next_sale_id,
+    }
+
+
+def _load(filename, thread_safe=False, **options):
+    bookstore = Bookstore("Загрузка", thread_safe=thread_safe)
+    loader = bookstore.load_from_xml if filename.endswith('.xml') else bookstore.load_from_json
+    loader(filename, **options)
+    return bookstore
+
+
+@pytest.fixture(scope='module')
+def snapshots(tmp_path_factory):
+    """Снимки JSON и XML магазина с несколькими тысячами продаж"""
+    directory = tmp_path_factory.mktemp('snapshots')
+    bookstore = build_store(SALES)
+    paths = {'json': str(directory / 'store.json'), 'xml': str(directory / 'store.xml')}
+    bookstore.save_to_json(paths['json'])
+    bookstore.save_to_xml(paths['xml'])
+    return paths
+
+
+@pytest.mark.parametrize('thread_safe', [False, True], ids=['fork', 'thread_safe'])
+@pytest.mark.parametrize('format', ['json', 'xml'])
+def test_parallel_load_matches_sequential(snapshots, format, thread_safe):
+    sequential = _load(snapshots[format])
+    parallel = _load(snapshots[format], thread_safe, workers=2)
+    assert _contents(parallel) == _contents(sequential)
+    assert len(parallel.sales) == SALES
+    assert parallel.verify_aggregates()
+
+
+def test_parallel_load_reports_same_error(snapshots, tmp_path):
+    filename = tmp_path / 'broken.json'
+    with open(snapshots['json'], encoding='utf-8') as f:
+        data = json.load(f)
+    data['sales'][1500]['quantity'] = -1
+    filename.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+    errors = []
+    for options in ({}, {'workers': 2}):
+        with pytest.raises(FileOperationError) as info:
+            _load(str(filename), **options)
+        errors.append(str(info.value))
+    assert errors[0] == errors[1]
+
+
+def test_concurrent_parallel_loads_keep_their_records(make_store, tmp_path):
+    small = str(tmp_path / 'small.json')
+    make_store(1200, books=4).save_to_json(small)
+    files = [small, small.replace('small', 'large')]
+    make_store(SALES, books=7).save_to_json(files[1])
+    expected = [_contents(_load(filename)) for filename in files]
+
+    results, errors = {}, []
+
+    def load(number):
+        try:
+            results[number] = _contents(_load(files[number % 2], workers=2))
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load, args=(number,)) for number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    for number, contents in results.items():
+        assert contents == expected[number % 2]
@@ -0,0 +1,94 @@
+# Тесты сетевого сервиса: операции с файлами ограничены каталогом данных
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from bookstore import Bookstore
+from classes import Book
+from exceptions import FileOperationError
+from service import AsyncBookstore, BookstoreServer, is_loopback
+
+
+def _store() -> Bookstore:
+    bookstore = Bookstore("Тест")
+    bookstore.add_book(Book(1, "Книга", "Автор", "Роман", 100.0, 5, 2000))
+    return bookstore
+
+
+def _call(server: BookstoreServer, method: str, **params):
+    return asyncio.run(server._call({'method': method, 'params': params}))
+
+
+def test_file_methods_unavailable_without_data_dir(tmp_path):
+    server = BookstoreServer(AsyncBookstore(_store()))
+    with pytest.raises(ValueError, match="неизвестный метод"):
+        _call(server, 'save_to_json', filename=str(tmp_path / 'evil.json'))
+    assert not (tmp_path / 'evil.json').exists()
+
+
+@pytest.mark.parametrize('filename', ['../evil.json', '/tmp/evil.json', 'sub/../../evil.json', ''])
+def test_paths_outside_data_dir_rejected(tmp_path, filename):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    server = BookstoreServer(AsyncBookstore(_store()), str(data_dir))
+    with pytest.raises(FileOperationError):
+        _call(server, 'save_to_json', filename=filename)
+    assert not (tmp_path / 'evil.json').exists()
+
+
+def test_symlink_out_of_data_dir_rejected(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    os.symlink(tmp_path, data_dir / 'link')
+    server = BookstoreServer(AsyncBookstore(_store()), str(data_dir))
+    with pytest.raises(FileOperationError):
+        _call(server, 'save_to_json', filename='link/evil.json')
+
+
+def test_save_and_load_inside_data_dir(tmp_path):
+    server = BookstoreServer(AsyncBookstore(_store()), str(tmp_path))
+    _call(server, 'save_to_json', filename='store.json')
+    with open(tmp_path / 'store.json', encoding='utf-8') as file:
+        assert json.load(file)['books'][0]['title'] == "Книга"
+
+    loaded = BookstoreServer(AsyncBookstore(Bookstore("Пустой")), str(tmp_path))
+    _call(loaded, 'load_from_json', filename='store.json')
+    assert [book.title for book in loaded.service.bookstore.books.values()] == ["Книга"]
+
+
+@pytest.mark.parametrize('method, params', [
+    ('load_from_json', {'filename': 'store.json', 'workers': 100000}),
+    ('save_to_json', {'filename': 'store.json', 'compression': 'gzip'}),
+    ('checkpoint', {'filename': 'store.json', 'stream': True}),
+    ('search_books', {'title': "Книга", 'validate': False}),
+])
+def test_internal_parameters_rejected(tmp_path, method, params):
+    server = BookstoreServer(AsyncBookstore(_store()), str(tmp_path))
+    with pytest.raises(ValueError, match="недопустимые параметры"):
+        _call(server, method, **params)
+    assert not (tmp_path / 'store.json').exists()
+
+
+def test_oversized_line_gets_error_response():
+    async def exchange():
+        server = BookstoreServer(AsyncBookstore(_store()))
+        await server.start(port=0)
+        port = server._server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'{"id": 1, "method": "search_books", "params": {"title": "' + b'x' * 100_000 + b'"}}\n')
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        writer.close()
+        await server.stop()
+        return response
+
+    response = asyncio.run(exchange())
+    assert response['id'] is None and response['error']['type'] == 'ValueError'
+
+
+def test_is_loopback():
+    assert is_loopback('127.0.0.1') and is_loopback('::1') and is_loopback('localhost')
+    assert not is_loopback('0.0.0.0') and not is_loopback('192.168.1.10') and not is_loopback('example.com')
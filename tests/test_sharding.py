@@ -0,0 +1,110 @@
+# Тесты шардированного координатора в одном процессе и с процессами-шардами
+
+import math
+
+import pytest
+
+from classes import Book, Customer, Employee
+from exceptions import InsufficientQuantityError
+from sharding import ShardedBookstore
+
+SHARDS = 3
+BOOKS = 10
+
+
+def _fill(sharded: ShardedBookstore, sales: int = 30) -> None:
+    """Книги с ID от координатора, два клиента, сотрудник и продажи"""
+    for number in range(1, BOOKS + 1):
+        sharded.add_book(Book(0, f"Книга {number}", f"Автор {number % 3}", "Роман",
+                              100.0 + number, 1000, 2000 + number % 5))
+    sharded.add_employee(Employee(0, "Сотрудник", "Продавец", 50000.0))
+    sharded.add_customer(Customer(0, "Первый", "first@example.com", "+70000000001"))
+    sharded.add_customer(Customer(0, "Второй", "second@example.com", "+70000000002"))
+    for number in range(sales):
+        sharded.sell_book(number % BOOKS + 1, 1 + number % 3, 1 + number % 2, 1)
+
+
+@pytest.fixture(params=[False, True], ids=['local', 'processes'])
+def sharded(request):
+    """Заполненный координатор в каждом из режимов"""
+    with ShardedBookstore("Сеть", shards=SHARDS, processes=request.param) as store:
+        _fill(store)
+        yield store
+
+
+def test_books_routed_by_id():
+    with ShardedBookstore("Сеть", shards=SHARDS) as sharded:
+        _fill(sharded, sales=0)
+        for index, shard in enumerate(sharded._shards):
+            assert shard.bookstore.books
+            assert all(sharded.shard_for(book_id) == index for book_id in shard.bookstore.books)
+            # Справочники нужны каждому шарду для локальной проверки продажи
+            assert sorted(shard.bookstore.customers) == [1, 2]
+            assert sorted(shard.bookstore.employees) == [1]
+        assert sorted(book_id for shard in sharded._shards for book_id in shard.bookstore.books) == \
+            list(range(1, BOOKS + 1))
+
+
+def test_sale_ids_do_not_overlap(sharded):
+    summary = sharded.sell_many([(number % BOOKS + 1, 1, 1, 1) for number in range(60)] +
+                                [(1, 10 ** 6, 1, 1)])
+    assert summary['sold'] == 60 and summary['failed'] == 1
+    assert 'InsufficientQuantityError' in summary['errors'][0][1]
+
+    sales = [sale for book_id in range(1, BOOKS + 1) for sale in sharded.get_book_sales(book_id)]
+    sale_ids = [sale.sale_id for sale in sales]
+    assert len(sale_ids) == len(set(sale_ids)) == 90
+    # Каждый шард выдает ID из своей последовательности start, start + step, ...
+    for sale in sales:
+        assert (sale.sale_id - 1) % SHARDS == sharded.shard_for(sale.book_id)
+
+
+def test_scatter_gather_queries(sharded):
+    found = sharded.search_books(author="Автор 1")
+    assert [book.book_id for book in found] == [1, 4, 7, 10]
+    found = sharded.search_books(min_price=103, max_price=106)
+    assert [book.book_id for book in found] == [3, 4, 5, 6]
+
+    sales = [sale for book_id in range(1, BOOKS + 1) for sale in sharded.get_book_sales(book_id)]
+    assert math.isclose(sharded.get_total_revenue(), math.fsum(sale.total_price for sale in sales))
+    stock = sum(book.price * book.quantity for book in sharded.search_books())
+    assert math.isclose(sharded.get_inventory_value(), stock)
+
+    for customer_id in (1, 2):
+        merged = sharded.get_sales_by_customer(customer_id)
+        assert sorted(sale.sale_id for sale in merged) == \
+            sorted(sale.sale_id for sale in sales if sale.customer_id == customer_id)
+        assert [(sale.sale_date, sale.sale_id) for sale in merged] == \
+            sorted((sale.sale_date, sale.sale_id) for sale in merged)
+    assert len(sharded.get_sales_by_employee(1)) == 30
+
+
+def test_errors_from_shard_reach_caller(sharded):
+    with pytest.raises(InsufficientQuantityError):
+        sharded.sell_book(1, 10 ** 6, 1, 1)
+    # После ошибки каналы шардов не рассинхронизированы
+    assert len(sharded.search_books()) == BOOKS
+
+
+@pytest.mark.parametrize('processes', [False, True], ids=['local', 'processes'])
+def test_save_load_round_trip(sharded, tmp_path, processes):
+    pattern = str(tmp_path / 'store_{shard}.json')
+    sharded.save_to_json(pattern)
+    assert sorted(path.name for path in tmp_path.iterdir()) == \
+        [f'store_{number}.json' for number in range(1, SHARDS + 1)]
+
+    with ShardedBookstore("Копия", shards=SHARDS, processes=processes) as loaded:
+        loaded.load_from_json(pattern)
+        assert [book.to_dict() for book in loaded.search_books()] == \
+            [book.to_dict() for book in sharded.search_books()]
+        assert math.isclose(loaded.get_total_revenue(), sharded.get_total_revenue())
+        assert [sale.to_dict() for sale in loaded.get_sales_by_customer(1)] == \
+            [sale.to_dict() for sale in sharded.get_sales_by_customer(1)]
+
+        # Счетчики ID продолжаются после загруженных данных
+        book = Book(0, "Новая", "Автор", "Роман", 100.0, 5, 2000)
+        loaded.add_book(book)
+        assert book.book_id == BOOKS + 1
+        old_ids = {sale.sale_id for sale in loaded.get_sales_by_employee(1)}
+        new_ids = {loaded.sell_book(book_id, 1, 1, 1).sale_id for book_id in range(1, SHARDS + 1)}
+        assert not new_ids & old_ids
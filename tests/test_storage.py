@@ -0,0 +1,108 @@
+# Тесты хранилища SQLite
+
+import math
+import sqlite3
+
+import pytest
+
+import storage
+from bookstore import Bookstore
+from classes import Book
+from exceptions import BookstoreError
+from storage import SQLiteStorage
+
+
+def test_reopen_does_not_read_sales(make_store, tmp_path, monkeypatch):
+    database = str(tmp_path / 'store.db')
+    bookstore = make_store(50, storage=SQLiteStorage(database))
+    revenue, inventory = bookstore.get_total_revenue(), bookstore.get_inventory_value()
+    next_sale = bookstore.sell_book(1, 1, 1, 1).sale_id + 1
+    revenue += bookstore.sales[next_sale - 1].total_price
+    inventory -= bookstore.books[1].price
+    bookstore.close()
+
+    def forbidden(row):
+        raise AssertionError("продажа прочитана при открытии магазина")
+
+    # Счетчики и агрегаты берутся запросами MAX и SUM, без чтения продаж
+    columns, to_row, _ = storage._TABLES['sales']
+    monkeypatch.setitem(storage._TABLES, 'sales', (columns, to_row, forbidden))
+    reopened = Bookstore("Снова", storage=SQLiteStorage(database))
+    monkeypatch.undo()
+
+    assert math.isclose(reopened.get_total_revenue(), revenue)
+    assert math.isclose(reopened.get_inventory_value(), inventory)
+    assert reopened.sell_book(2, 1, 1, 1).sale_id == next_sale
+    assert reopened.verify_aggregates()
+    reopened.close()
+
+
+def test_empty_database_counters(tmp_path):
+    bookstore = Bookstore("Пустой", storage=SQLiteStorage(str(tmp_path / 'empty.db')))
+    assert bookstore.get_total_revenue() == 0.0 and bookstore.get_inventory_value() == 0.0
+    assert bookstore._storage.max_id('sales') == 0
+    bookstore.close()
+
+
+def _consistent_state(bookstore):
+    """Счетчики, агрегаты и результаты поиска для сравнения после отката"""
+    return {
+        'books': {book_id: book.quantity for book_id, book in bookstore.books.items()},
+        'sales': len(bookstore.sales),
+        'search': [book.book_id for book in bookstore.search_books(title="Книга")],
+        'cheapest': [book.book_id for book in bookstore.get_cheapest_books(3)],
+        'revenue': round(bookstore.get_total_revenue(), 6),
+        'inventory': round(bookstore.get_inventory_value(), 6),
+        'counters': (bookstore._next_book_id, bookstore._next_sale_id),
+    }
+
+
+def test_rolled_back_bulk_insert(make_store, tmp_path):
+    bookstore = make_store(5, storage=SQLiteStorage(str(tmp_path / 'store.db')))
+    before = _consistent_state(bookstore)
+
+    def books():
+        for number in range(5):
+            yield Book(0, f"Книга новая {number}", "Автор", "Роман", 1.0 + number, 3, 2000)
+        raise OSError("обрыв источника данных")
+
+    with pytest.raises(BookstoreError):
+        bookstore.add_books_bulk(books())
+
+    assert _consistent_state(bookstore) == before
+    assert bookstore.verify_aggregates()
+    bookstore.add_book(Book(0, "После отката", "Автор", "Роман", 100.0, 1, 2000))
+    assert max(bookstore.books) == before['counters'][0]
+    bookstore.close()
+
+
+class _FailingCommit:
+    """Соединение SQLite, у которого не удается фиксация транзакции"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, sql, *args):
+        if sql == "COMMIT":
+            raise sqlite3.OperationalError("database is locked")
+        return self._conn.execute(sql, *args)
+
+
+@pytest.mark.parametrize('operation', [
+    lambda store: store.sell_book(1, 2, 1, 1),
+    lambda store: store.checkout([(1, 1), (2, 3)], 1, 1),
+], ids=['sell', 'checkout'])
+def test_failed_commit_restores_counters_and_aggregates(make_store, tmp_path, monkeypatch, operation):
+    bookstore = make_store(5, storage=SQLiteStorage(str(tmp_path / 'store.db')))
+    before = _consistent_state(bookstore)
+
+    storage_ = bookstore._storage
+    monkeypatch.setattr(storage_, '_conn', _FailingCommit(storage_._conn))
+    with pytest.raises(BookstoreError):
+        operation(bookstore)
+    monkeypatch.undo()
+
+    assert _consistent_state(bookstore) == before
+    assert bookstore.verify_aggregates()
+    assert bookstore.sell_book(3, 1, 1, 1).sale_id == before['counters'][1]
+    bookstore.close()
@@ -0,0 +1,33 @@
+# Тесты потоковой записи снимков
+
+import io
+import json
+
+from streaming import write_json_snapshot
+
+
+def _sections():
+    books = [{'book_id': 1, 'title': 'Кавычки " и \\ и\nперевод строки', 'price': 10.5, 'note': None},
+             {'book_id': 2, 'title': '{скобки}: [список], ', 'price': 1e-7, 'flag': True}]
+    return [('books', books), ('employees', []), ('sales', [{'sale_id': 1}, {}])]
+
+
+def test_indented_output_matches_json_dump():
+    header = {'name': 'Магазин', 'next_book_id': 3, 'journal_lsn': 7}
+    expected = json.dumps({**header, **dict(_sections())}, ensure_ascii=False, indent=2)
+    buffer = io.StringIO()
+    write_json_snapshot(buffer, header, _sections())
+    assert buffer.getvalue() == expected
+
+
+def test_compact_output_parses_to_same_data():
+    header = {'name': 'Магазин'}
+    buffer = io.StringIO()
+    write_json_snapshot(buffer, header, _sections(), compact=True)
+    assert json.loads(buffer.getvalue()) == {**header, **dict(_sections())}
+
+
+def test_empty_snapshot_matches_json_dump():
+    buffer = io.StringIO()
+    write_json_snapshot(buffer, {}, [])
+    assert buffer.getvalue() == json.dumps({}, indent=2)
@@ -0,0 +1,84 @@
+# Тесты декларативных правил проверки и доверенной загрузки
+
+import json
+
+import pytest
+
+import validation
+from bookstore import Bookstore
+from classes import Book, Customer, Sale
+from exceptions import BookstoreError, InvalidPriceError
+from storage import SQLiteStorage
+from validation import BOOK_RULES, SALE_RULES, first_invalid
+
+
+@pytest.mark.parametrize('make, error, message', [
+    (lambda: Book(-1, "К", "А", "Ж", 1.0, 1, 2000), ValueError, "ID книги не может быть отрицательным"),
+    (lambda: Book(1, "", "А", "Ж", 1.0, 1, 2000), ValueError, "Название книги не может быть пустым"),
+    (lambda: Book(1, "К", "А", "Ж", 0, 1, 2000), InvalidPriceError, "Цена должна быть положительной"),
+    (lambda: Book(1, "К", "А", "Ж", 1.0, 1, 3000), ValueError, "Неверный год издания"),
+    (lambda: Customer(1, "И", "почта", "+7"), ValueError, "Неверный формат email"),
+    (lambda: Sale(1, 2, 3, 4, 0, 1.0), ValueError, "Количество должно быть положительным"),
+])
+def test_constructor_reports_first_broken_rule(make, error, message):
+    with pytest.raises(error) as info:
+        make()
+    assert type(info.value) is error and str(info.value) == message
+
+
+def test_trusted_construction_skips_rules():
+    assert Book(1, "", "А", "Ж", -1.0, 1, 2000, validate=False).price == -1.0
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_first_invalid_matches_per_object_checks(monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(validation, 'np', None)
+    columns = {'sale_id': [1, 2, 3, 4], 'book_id': [1, 1, 1, 1], 'customer_id': [1, 1, 1, 1],
+               'employee_id': [1, 1, 1, 1], 'quantity': [1, 2, 0, 1], 'total_price': [1.0, 2.0, 3.0, -1.0]}
+    assert first_invalid(SALE_RULES, columns) == 2
+    columns['total_price'][1] = 'x'
+    assert first_invalid(SALE_RULES, columns) == 1
+    books = {'book_id': [1, 2], 'title': ["К", "К"], 'author': ["А", "А"], 'genre': ["Ж", "Ж"],
+             'price': [1.0, 1.0], 'quantity': [1, 1], 'year': [2000, 2000]}
+    assert first_invalid(BOOK_RULES, books) is None
+
+
+def test_verify_data_after_trusted_load(make_store, tmp_path):
+    filename = tmp_path / 'store.json'
+    make_store(5).save_to_json(str(filename))
+    data = json.loads(filename.read_text(encoding='utf-8'))
+    data['sales'][3]['quantity'] = -2
+    filename.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+    with pytest.raises(BookstoreError, match="Количество должно быть положительным"):
+        Bookstore("Проверка").load_from_json(str(filename))
+
+    trusted = Bookstore("Доверенная")
+    trusted.load_from_json(str(filename), validate=False)
+    with pytest.raises(BookstoreError, match=r"sales, ID 4\): Количество должно быть положительным"):
+        trusted.verify_data()
+
+
+@pytest.mark.parametrize('stream', [False, True])
+@pytest.mark.parametrize('mode', ['memory', 'sqlite'])
+def test_failed_load_leaves_consistent_store(make_store, tmp_path, stream, mode):
+    filename = tmp_path / 'store.json'
+    make_store(3, books=4).save_to_json(str(filename))
+    data = json.loads(filename.read_text(encoding='utf-8'))
+    data['books'][2]['price'] = -1
+    filename.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+    options = {'storage': SQLiteStorage(str(tmp_path / 'store.db'))} if mode == 'sqlite' else {}
+    bookstore = make_store(8, books=10, **options)
+    with pytest.raises(BookstoreError):
+        bookstore.load_from_json(str(filename), stream=stream)
+
+    # SQLite откатывает загрузку, в памяти остаются книги до неверной записи
+    remaining = list(range(1, 11)) if mode == 'sqlite' else [1, 2]
+    assert sorted(bookstore.books) == remaining
+    assert sorted(book.book_id for book in bookstore.search_books(title="Книга")) == remaining
+    assert sorted(book.book_id for book in bookstore.search_books(min_price=0, max_price=1000)) == remaining
+    assert len(bookstore.get_book_sales(1)) == (1 if mode == 'sqlite' else 0)
+    assert bookstore.verify_aggregates()
+    bookstore.close()
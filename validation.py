@@ -0,0 +1,164 @@
+# Модуль с декларативными правилами проверки сущностей книжного магазина
+
+import time
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # необязательная зависимость для векторной проверки
+    np = None
+
+from exceptions import *
+
+# Текущий год кэшируется до наступления следующего года
+_year = 0
+_next_year_at = 0.0
+
+
+def current_year() -> int:
+    """Текущий год (вычисляется один раз и обновляется с наступлением нового года)"""
+    global _year, _next_year_at
+    if time.time() >= _next_year_at:
+        now = datetime.now()
+        _year = now.year
+        _next_year_at = datetime(now.year + 1, 1, 1).timestamp()
+    return _year
+
+
+class Rule(NamedTuple):
+    """Правило проверки поля
+
+    invalid - функция от значения, истинная для неверного значения;
+    vector - то же условие над массивом NumPy (только для числовых полей).
+    """
+    field: str
+    invalid: Callable[[Any], bool]
+    error: type
+    message: str
+    vector: Optional[Callable[[Any], Any]] = None
+
+
+def _negative(v: Any) -> Any:
+    """Значение отрицательное"""
+    return v < 0
+
+
+def _not_positive(v: Any) -> Any:
+    """Значение не положительное"""
+    return v <= 0
+
+
+def _empty(v: Any) -> bool:
+    """Значение пустое"""
+    return not v
+
+
+def _bad_year(v: Any) -> Any:
+    """Год вне допустимого диапазона"""
+    return v < 1000 or v > current_year()
+
+
+def _bad_years(v: Any) -> Any:
+    """Годы вне допустимого диапазона (по массиву)"""
+    return (v < 1000) | (v > current_year())
+
+
+def _bad_email(v: Any) -> bool:
+    """Email без символа @"""
+    return '@' not in v
+
+
+BOOK_RULES = (
+    Rule('book_id', _negative, ValueError, "ID книги не может быть отрицательным", _negative),
+    Rule('title', _empty, ValueError, "Название книги не может быть пустым"),
+    Rule('author', _empty, ValueError, "Автор не может быть пустым"),
+    Rule('genre', _empty, ValueError, "Жанр не может быть пустым"),
+    Rule('price', _not_positive, InvalidPriceError, "Цена должна быть положительной", _not_positive),
+    Rule('quantity', _negative, ValueError, "Количество не может быть отрицательным", _negative),
+    Rule('year', _bad_year, ValueError, "Неверный год издания", _bad_years),
+)
+
+EMPLOYEE_RULES = (
+    Rule('emp_id', _negative, ValueError, "ID сотрудника не может быть отрицательным", _negative),
+    Rule('name', _empty, ValueError, "Имя сотрудника не может быть пустым"),
+    Rule('position', _empty, ValueError, "Должность не может быть пустой"),
+    Rule('salary', _negative, ValueError, "Зарплата не может быть отрицательной", _negative),
+)
+
+CUSTOMER_RULES = (
+    Rule('cust_id', _negative, ValueError, "ID клиента не может быть отрицательным", _negative),
+    Rule('name', _empty, ValueError, "Имя клиента не может быть пустым"),
+    Rule('email', _bad_email, ValueError, "Неверный формат email"),
+    Rule('phone', _empty, ValueError, "Телефон не может быть пустым"),
+)
+
+SALE_RULES = (
+    Rule('sale_id', _not_positive, ValueError, "ID продажи должен быть положительным", _not_positive),
+    Rule('book_id', _not_positive, ValueError, "ID книги должен быть положительным", _not_positive),
+    Rule('customer_id', _not_positive, ValueError, "ID клиента должен быть положительным", _not_positive),
+    Rule('employee_id', _not_positive, ValueError, "ID сотрудника должен быть положительным", _not_positive),
+    Rule('quantity', _not_positive, ValueError, "Количество должно быть положительным", _not_positive),
+    Rule('total_price', _not_positive, ValueError, "Общая цена должна быть положительной", _not_positive),
+)
+
+
+def rule_validator(rules: Sequence[Rule]) -> Callable[[Any], None]:
+    """Функция проверки объекта по правилам (первое нарушение возбуждает ошибку)"""
+    checks = tuple((attrgetter(rule.field), rule.invalid, rule.error, rule.message) for rule in rules)
+
+    def validate(entity: Any) -> None:
+        for get, invalid, error, message in checks:
+            if invalid(get(entity)):
+                raise error(message)
+    return validate
+
+
+def _first_invalid_scalar(rule: Rule, column: Sequence[Any]) -> Optional[int]:
+    """Номер первого нарушения правила; значение неверного типа - тоже нарушение"""
+    invalid = rule.invalid
+    for index, value in enumerate(column):
+        try:
+            if invalid(value):
+                return index
+        except Exception:
+            return index
+    return None
+
+
+def _first_invalid_vector(rule: Rule, column: Sequence[Any]) -> Optional[int]:
+    """Номер первого нарушения числового правила по массиву NumPy (-1, если колонка не числовая)"""
+    values = np.asarray(column)
+    if values.ndim != 1 or values.dtype.kind not in 'iuf':
+        return -1
+    invalid = np.flatnonzero(rule.vector(values))
+    return int(invalid[0]) if len(invalid) else None
+
+
+def first_invalid(rules: Sequence[Rule], columns: Mapping[str, Sequence[Any]]) -> Optional[int]:
+    """Номер первой записи, нарушающей хотя бы одно правило, или None
+
+    columns - значения полей по колонкам. Каждое правило проверяется сразу
+    по всей колонке: числовые - векторно через NumPy (если он установлен),
+    остальные - одним проходом.
+    """
+    first: Optional[int] = None
+    for rule in rules:
+        column = columns[rule.field]
+        if first is not None:
+            column = column[:first]
+        found = -1
+        if np is not None and rule.vector is not None:
+            found = _first_invalid_vector(rule, column)
+        if found == -1:
+            found = _first_invalid_scalar(rule, column)
+        if found is not None:
+            first = found
+    return first
+
+
+def entity_rule_columns(rules: Sequence[Rule], entities: Sequence[Any]) -> Dict[str, list]:
+    """Колонки полей, участвующих в правилах, для списка объектов"""
+    return {field: list(map(attrgetter(field), entities))
+            for field in dict.fromkeys(rule.field for rule in rules)}